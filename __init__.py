@@ -1,34 +1,54 @@
 from .nodes.text_to_speech import TextToSpeech
+from .nodes.batch_text_to_speech import BatchTextToSpeech
 from .nodes.voice_cloning import VoiceCloning
 from .nodes.voice_design import VoiceDesign
 from .nodes.load_audio import JM_LoadAudio
 from .nodes.video_generation import MiniMaxVideoGeneration
 from .nodes.check_video_status import CheckVideoStatus
+from .nodes.batch_video_status import BatchCheckVideoStatus
 from .nodes.download_video import DownloadVideo
+from .nodes.video_pipeline import MiniMaxVideoPipeline, BatchVideoPipeline
 from .nodes.music_generation import MusicGeneration
+from .nodes import routes
+from .nodes import task_journal
+from .nodes import video_callbacks
 
 NODE_CLASS_MAPPINGS = {
     "JM-MiniMax-API/text-to-speech": TextToSpeech,
+    "JM-MiniMax-API/batch-text-to-speech": BatchTextToSpeech,
     "JM-MiniMax-API/voice-cloning": VoiceCloning,
     "JM-MiniMax-API/voice-design": VoiceDesign,
     "JM-MiniMax-API/load-audio": JM_LoadAudio,
     "JM-MiniMax-API/video-generation": MiniMaxVideoGeneration,
     "JM-MiniMax-API/check-video-status": CheckVideoStatus,
+    "JM-MiniMax-API/batch-check-video-status": BatchCheckVideoStatus,
     "JM-MiniMax-API/download-video": DownloadVideo,
+    "JM-MiniMax-API/video-pipeline": MiniMaxVideoPipeline,
+    "JM-MiniMax-API/batch-video-pipeline": BatchVideoPipeline,
     "JM-MiniMax-API/music-generation": MusicGeneration
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "JM-MiniMax-API/text-to-speech": "MiniMax Text to Speech",
+    "JM-MiniMax-API/batch-text-to-speech": "MiniMax Batch Text to Speech",
     "JM-MiniMax-API/voice-cloning": "MiniMax Voice Cloning",
     "JM-MiniMax-API/voice-design": "MiniMax Voice Design",
     "JM-MiniMax-API/load-audio": "Load Audio",
     "JM-MiniMax-API/video-generation": "MiniMax Video Generation",
     "JM-MiniMax-API/check-video-status": "Check Video Status",
+    "JM-MiniMax-API/batch-check-video-status": "Batch Check Video Status",
     "JM-MiniMax-API/download-video": "Download Video",
+    "JM-MiniMax-API/video-pipeline": "MiniMax Video Pipeline",
+    "JM-MiniMax-API/batch-video-pipeline": "MiniMax Batch Video Pipeline",
     "JM-MiniMax-API/music-generation": "MiniMax Music Generation"
 }
 
+# Pick up video tasks that were still rendering when ComfyUI last stopped
+task_journal.resume_on_startup()
+
+# Receive video status callbacks on JM_MINIMAX_CALLBACK_PORT, if set
+video_callbacks.start_listener()
+
 # Tell ComfyUI where to find web extensions
 WEB_DIRECTORY = "./web"
 
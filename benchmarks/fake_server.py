@@ -0,0 +1,553 @@
+"""
+Local stand-in for the MiniMax API, for benchmarks and offline testing.
+
+Implements the endpoints used by the nodes (t2a_v2, video_generation,
+query/video_generation, files/retrieve, files/upload, voice_clone,
+voice_design, music_generation) plus a /files/<name> route that serves the
+generated audio, subtitle and video downloads with Range support, and the
+WebSocket t2a_v2 protocol on /ws/v1/t2a_v2 (connected_success, task_start,
+task_continue, task_finish; texts are answered in order). Video
+submissions with a callback_url get the callback protocol: a challenge
+that must be echoed, then a POST for every status the task reaches.
+
+Run standalone:
+    python benchmarks/fake_server.py --port 8765 --latency 0.2 --audio-bytes 500000
+then point a node's base_url at http://127.0.0.1:8765/v1.
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import base64
+import hashlib
+import random
+import struct
+import argparse
+import threading
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Magic value of the WebSocket opening handshake (RFC 6455)
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Status progression reported by query/video_generation for every task
+DEFAULT_TASK_STATES = ("Preparing", "Queueing", "Processing", "Success")
+
+
+class FakeConfig:
+    """
+    Behaviour of the fake server.
+      latency:         seconds before responding, either a number or a dict of
+                       endpoint -> seconds with an optional "default" entry
+      audio_bytes:     size of generated audio (t2a_v2, music, voice design)
+      video_bytes:     size of the video served for files/retrieve
+      subtitle_bytes:  size of the subtitle JSON file
+      errors:          endpoint -> {"rate": 0..1, "code": int}; codes below
+                       1000 are sent as HTTP status codes, others as base_resp
+      task_states:     statuses a video task moves through
+      polls_per_state: queries answered with each status before advancing
+      task_seconds:    when set, tasks move through their statuses by time
+                       instead, reaching the last one this many seconds after
+                       submission (a number or a list sampled per task)
+      chunk_delay:     seconds to sleep between 64KB chunks of file downloads
+                       and between streamed t2a_v2 events
+      stream_chunk_bytes: decoded audio bytes per streamed t2a_v2 event
+    """
+    def __init__(self, latency=0.0, audio_bytes=256 * 1024, video_bytes=8 * 1024 * 1024,
+                 subtitle_bytes=4 * 1024, errors=None, task_states=DEFAULT_TASK_STATES,
+                 polls_per_state=1, chunk_delay=0.0, stream_chunk_bytes=32 * 1024, seed=None, task_seconds=None):
+        self.latency = latency
+        self.audio_bytes = audio_bytes
+        self.video_bytes = video_bytes
+        self.subtitle_bytes = subtitle_bytes
+        self.errors = errors or {}
+        self.task_states = tuple(task_states)
+        self.polls_per_state = max(1, polls_per_state)
+        self.chunk_delay = chunk_delay
+        self.stream_chunk_bytes = stream_chunk_bytes
+        self.task_seconds = task_seconds
+        self.random = random.Random(seed)
+
+    def latency_for(self, endpoint):
+        if isinstance(self.latency, dict):
+            return float(self.latency.get(endpoint, self.latency.get("default", 0.0)))
+        return float(self.latency)
+
+    def task_duration(self):
+        if isinstance(self.task_seconds, (list, tuple)):
+            return float(self.random.choice(self.task_seconds))
+        return float(self.task_seconds)
+
+    def error_for(self, endpoint):
+        rule = self.errors.get(endpoint) or self.errors.get("default")
+        if rule and self.random.random() < rule.get("rate", 0.0):
+            return int(rule.get("code", 500))
+        return None
+
+
+# MPEG1 Layer III, 128kbps, 32kHz, mono: 576-byte frames of 36ms each
+_MP3_FRAME_HEADER = b"\xff\xfb\x98\xc4"
+_MP3_FRAME_LENGTH = 576
+
+
+def _mp3_bytes(size):
+    """
+    An ID3 tag, a LAME-style Info frame and silent MPEG frames, sized like an
+    MP3 response. Frame structure is valid so joining and duration code can
+    be exercised; the audio content is silence.
+    """
+    frame = _MP3_FRAME_HEADER + bytes(_MP3_FRAME_LENGTH - 4)
+    info = bytearray(frame)
+    info[21:25] = b"Info"
+    header = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(info)
+    count = max(1, (size - len(header)) // _MP3_FRAME_LENGTH)
+    return header + frame * count
+
+
+def _wav_bytes(size, sample_rate=32000):
+    """A real 16-bit mono WAV file containing a 440Hz tone"""
+    frames = max(0, (size - 44) // 2)
+    pcm = struct.pack(f"<{frames}h", *(int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate)) for i in range(frames)))
+    header = b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVE"
+    header += b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    header += b"data" + struct.pack("<I", len(pcm))
+    return header + pcm
+
+
+class FakeMiniMaxServer:
+    """Threaded HTTP server emulating the MiniMax API; use as a context manager"""
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeConfig()
+        self.tasks = {}
+        self.files = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+        self._payloads = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fake-minimax", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def payload(self, kind, size):
+        key = (kind, size)
+        data = self._payloads.get(key)
+        if data is None:
+            data = _wav_bytes(size) if kind == "wav" else _mp3_bytes(size)
+            self._payloads[key] = data
+        return data
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def register_file(self, name, data, content_type):
+        with self.lock:
+            self.files[name] = (data, content_type)
+        return f"{self.url}/files/{name}"
+
+    # Endpoint handlers return (http_status, json_body)
+
+    def t2a_v2(self, body, query):
+        audio_format = (body.get("audio_setting") or {}).get("format", "mp3")
+        audio = self.payload(audio_format, self.config.audio_bytes)
+        data = {"status": 2}
+        if body.get("output_format") == "url":
+            data["audio"] = self.register_file(f"tts_{uuid.uuid4().hex}.{audio_format}", audio, "audio/mpeg")
+        else:
+            data["audio"] = audio.hex()
+        if body.get("subtitle_enable"):
+            text = body.get("text", "")
+            subtitle = json.dumps([{"text": text, "time_begin": 0, "time_end": 1000}]).encode()
+            subtitle = subtitle.ljust(self.config.subtitle_bytes, b" ")
+            data["subtitle_file"] = self.register_file(f"subtitle_{uuid.uuid4().hex}.json", subtitle, "application/json")
+        return 200, {
+            "data": data,
+            "extra_info": {"audio_length": 1000, "audio_size": len(audio), "audio_format": audio_format,
+                           "usage_characters": len(body.get("text", ""))},
+            "trace_id": uuid.uuid4().hex,
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    def music_generation(self, body, query):
+        audio_format = (body.get("audio_setting") or {}).get("format", "mp3")
+        audio = self.payload(audio_format, self.config.audio_bytes)
+        if body.get("output_format") == "url":
+            audio_field = self.register_file(f"music_{uuid.uuid4().hex}.{audio_format}", audio, "audio/mpeg")
+        else:
+            audio_field = audio.hex()
+        return 200, {
+            "data": {"audio": audio_field, "status": 2},
+            "extra_info": {"music_duration": 30000, "music_sample_rate": 44100, "music_channel": 2,
+                           "bitrate": 256000, "music_size": len(audio)},
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    def voice_design(self, body, query):
+        audio = self.payload("mp3", self.config.audio_bytes)
+        return 200, {
+            "voice_id": body.get("voice_id", f"voice_{uuid.uuid4().hex[:8]}"),
+            "trial_audio": audio.hex() if body.get("preview_text") else "",
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    def voice_clone(self, body, query):
+        return 200, {"input_sensitive": False, "base_resp": {"status_code": 0, "status_msg": "success"}}
+
+    def files_upload(self, body, query):
+        return 200, {
+            "file": {"file_id": int(time.time() * 1000), "bytes": body.get("_size", 0), "purpose": "voice_clone"},
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    def video_generation(self, body, query):
+        task_id = str(int(time.time() * 1000)) + str(self.config.random.randint(1000, 9999))
+        with self.lock:
+            self.tasks[task_id] = {"polls": 0, "payload": body, "created": time.time(),
+                                   "seconds": self.config.task_duration() if self.config.task_seconds else None}
+        if body.get("callback_url"):
+            threading.Thread(target=self.push_callbacks, args=(task_id, body["callback_url"]),
+                             name="fake-minimax-callbacks", daemon=True).start()
+        return 200, {"task_id": task_id, "base_resp": {"status_code": 0, "status_msg": "success"}}
+
+    def query_video(self, body, query):
+        task_id = (query.get("task_id") or [""])[0]
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return 404, {"base_resp": {"status_code": 2013, "status_msg": "task not found"}}
+            last = len(self.config.task_states) - 1
+            if task["seconds"] is not None:
+                index = min(int((time.time() - task["created"]) / task["seconds"] * last), last)
+            else:
+                index = min(task["polls"] // self.config.polls_per_state, last)
+            task["polls"] += 1
+        status = self.config.task_states[index]
+        result = {"task_id": task_id, "status": status, "base_resp": {"status_code": 0, "status_msg": "success"}}
+        if status == "Success":
+            result.update({"file_id": f"file_{task_id}", "video_width": 1366, "video_height": 768})
+        return 200, result
+
+    def _post_json(self, url, body):
+        request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=3) as response:
+            return json.loads(response.read() or b"null")
+
+    def push_callbacks(self, task_id, url):
+        """Verify url with a challenge, then post each status of the task to it when reached"""
+        challenge = uuid.uuid4().hex
+        try:
+            verified = (self._post_json(url, {"challenge": challenge}) or {}).get("challenge") == challenge
+        except (OSError, ValueError):
+            verified = False
+        self.count("callback_verified" if verified else "callback_unverified")
+        if not verified:
+            return
+        with self.lock:
+            task = self.tasks[task_id]
+        last = max(len(self.config.task_states) - 1, 1)
+        for index, status in enumerate(self.config.task_states):
+            delay = task["created"] + (task["seconds"] or 0.0) * index / last - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            body = {"task_id": task_id, "status": status.lower(),
+                    "base_resp": {"status_code": 0, "status_msg": "success"}}
+            if status == "Success":
+                body["file_id"] = f"file_{task_id}"
+            try:
+                self._post_json(url, body)
+                self.count("callback")
+            except (OSError, ValueError):
+                self.count("callback_failed")
+
+    def files_retrieve(self, body, query):
+        file_id = (query.get("file_id") or [""])[0]
+        name = f"{file_id}.mp4"
+        with self.lock:
+            known = name in self.files
+        if not known:
+            self.register_file(name, self.payload("mp3", self.config.video_bytes), "video/mp4")
+        return 200, {
+            "file": {"file_id": file_id, "bytes": self.config.video_bytes, "filename": name,
+                     "download_url": f"{self.url}/files/{name}"},
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        }
+
+    def ws_utterance(self, start, text):
+        """Events answering one task_continue: hex audio chunks, the last one final"""
+        audio_format = (start.get("audio_setting") or {}).get("format", "mp3")
+        audio_hex = self.payload(audio_format, self.config.audio_bytes).hex()
+        step = self.config.stream_chunk_bytes * 2
+        chunks = [audio_hex[offset:offset + step] for offset in range(0, len(audio_hex), step)]
+        for index, chunk in enumerate(chunks):
+            event = {"event": "task_continued", "data": {"audio": chunk}, "is_final": False,
+                     "trace_id": uuid.uuid4().hex, "base_resp": {"status_code": 0, "status_msg": "success"}}
+            if index == len(chunks) - 1:
+                event["is_final"] = True
+                event["extra_info"] = {"audio_length": 1000, "audio_size": len(audio_hex) // 2,
+                                       "audio_format": audio_format, "usage_characters": len(text)}
+            yield event
+
+    def _handler_class(self):
+        server = self
+        routes = {
+            ("POST", "t2a_v2"): server.t2a_v2,
+            ("POST", "music_generation"): server.music_generation,
+            ("POST", "voice_design"): server.voice_design,
+            ("POST", "voice_clone"): server.voice_clone,
+            ("POST", "files/upload"): server.files_upload,
+            ("POST", "video_generation"): server.video_generation,
+            ("GET", "query/video_generation"): server.query_video,
+            ("GET", "files/retrieve"): server.files_retrieve,
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Type", "").startswith("application/json") and raw:
+                    return json.loads(raw)
+                return {"_size": len(raw)}
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                path = parsed.path
+                if path.startswith("/files/") and method == "GET":
+                    return self._serve_file(path[len("/files/"):])
+                if path == "/__stats":
+                    with server.lock:
+                        counts = dict(server.counts)
+                    return self._send(200, json.dumps(counts).encode())
+                endpoint = path.split("/v1/", 1)[-1].strip("/")
+                handler = routes.get((method, endpoint))
+                if handler is None:
+                    return self._send(404, b'{"base_resp": {"status_code": 404, "status_msg": "not found"}}')
+                body = self._read_body()
+                server.count(endpoint)
+                delay = server.config.latency_for(endpoint)
+                if delay:
+                    time.sleep(delay)
+                code = server.config.error_for(endpoint)
+                if code is not None and code < 1000:
+                    return self._send(code, json.dumps({"error": "injected"}).encode(), headers={"Retry-After": "0"})
+                if code is not None:
+                    result = {"base_resp": {"status_code": code, "status_msg": "injected error"}}
+                    return self._send(200, json.dumps(result).encode())
+                status, result = handler(body, parse_qs(parsed.query))
+                if endpoint == "t2a_v2" and body.get("stream") and status == 200:
+                    return self._send_stream(result)
+                self._send(status, json.dumps(result).encode())
+
+            def _send_stream(self, result):
+                """Replay a t2a_v2 result as server-sent events: hex chunks, then the complete audio"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                audio_hex = result["data"]["audio"]
+                step = server.config.stream_chunk_bytes * 2
+                for offset in range(0, len(audio_hex), step):
+                    event = {"data": {"audio": audio_hex[offset:offset + step], "status": 1},
+                             "base_resp": {"status_code": 0, "status_msg": ""}}
+                    self.wfile.write(b"data: " + json.dumps(event).encode() + b"\n\n")
+                    self.wfile.flush()
+                    if server.config.chunk_delay:
+                        time.sleep(server.config.chunk_delay)
+                self.wfile.write(b"data: " + json.dumps(result).encode() + b"\n\n")
+
+            def _ws_read(self):
+                """Read one (masked, client-sent) message; returns (opcode, payload)"""
+                message = b""
+                first = None
+                while True:
+                    head = self.rfile.read(2)
+                    if len(head) < 2:
+                        return 8, b""
+                    fin, opcode = head[0] & 0x80, head[0] & 0x0f
+                    length = head[1] & 0x7f
+                    if length == 126:
+                        length = struct.unpack(">H", self.rfile.read(2))[0]
+                    elif length == 127:
+                        length = struct.unpack(">Q", self.rfile.read(8))[0]
+                    mask = self.rfile.read(4) if head[1] & 0x80 else b""
+                    data = self.rfile.read(length)
+                    if mask:
+                        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+                    if opcode >= 8:
+                        return opcode, data
+                    message += data
+                    first = first if opcode == 0 else opcode
+                    if fin:
+                        return first, message
+
+            def _ws_write(self, opcode, data):
+                length = len(data)
+                if length < 126:
+                    head = struct.pack(">BB", 0x80 | opcode, length)
+                elif length < 1 << 16:
+                    head = struct.pack(">BBH", 0x80 | opcode, 126, length)
+                else:
+                    head = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+                self.wfile.write(head + data)
+                self.wfile.flush()
+
+            def _ws_send(self, event):
+                self._ws_write(1, json.dumps(event).encode())
+
+            def _serve_websocket(self):
+                """The t2a_v2 WebSocket protocol; one task per connection"""
+                server.count("ws_connect")
+                accept = base64.b64encode(hashlib.sha1(self.headers["Sec-WebSocket-Key"].encode() + _WS_GUID).digest())
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept.decode())
+                self.end_headers()
+                self.close_connection = True
+                ok = {"status_code": 0, "status_msg": "success"}
+                self._ws_send({"event": "connected_success", "session_id": uuid.uuid4().hex, "base_resp": ok})
+                start = None
+                while True:
+                    opcode, data = self._ws_read()
+                    if opcode == 8:
+                        self._ws_write(8, data[:2])
+                        return
+                    if opcode == 9:
+                        self._ws_write(10, data)
+                        continue
+                    if opcode != 1:
+                        continue
+                    message = json.loads(data)
+                    event = message.get("event")
+                    if event == "task_start":
+                        start = message
+                        self._ws_send({"event": "task_started", "session_id": uuid.uuid4().hex, "base_resp": ok})
+                    elif event == "task_continue" and start is not None:
+                        server.count("t2a_v2_ws")
+                        delay = server.config.latency_for("t2a_v2")
+                        if delay:
+                            time.sleep(delay)
+                        code = server.config.error_for("t2a_v2")
+                        if code is not None:
+                            self._ws_send({"event": "task_failed",
+                                           "base_resp": {"status_code": code, "status_msg": "injected error"}})
+                            self._ws_write(8, struct.pack(">H", 1000))
+                            return
+                        for reply in server.ws_utterance(start, message.get("text", "")):
+                            self._ws_send(reply)
+                            if server.config.chunk_delay:
+                                time.sleep(server.config.chunk_delay)
+                    elif event == "task_finish":
+                        self._ws_send({"event": "task_finished", "base_resp": ok})
+                        self._ws_write(8, struct.pack(">H", 1000))
+                        return
+                    else:
+                        self._ws_send({"event": "task_failed",
+                                       "base_resp": {"status_code": 2013, "status_msg": f"unexpected {event}"}})
+
+            def _serve_file(self, name):
+                server.count("download")
+                with server.lock:
+                    entry = server.files.get(name)
+                if entry is None:
+                    return self._send(404, b"not found", "text/plain")
+                data, content_type = entry
+                start = 0
+                status = 200
+                range_header = self.headers.get("Range", "")
+                if range_header.startswith("bytes="):
+                    start = int(range_header[len("bytes="):].split("-")[0] or 0)
+                    status = 206
+                body = data[start:]
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                self.end_headers()
+                chunk = 64 * 1024
+                for offset in range(0, len(body), chunk):
+                    self.wfile.write(body[offset:offset + chunk])
+                    if server.config.chunk_delay:
+                        time.sleep(server.config.chunk_delay)
+
+            def do_GET(self):
+                if urlparse(self.path).path == "/ws/v1/t2a_v2" and self.headers.get("Upgrade", "").lower() == "websocket":
+                    return self._serve_websocket()
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the MiniMax API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every API response")
+    parser.add_argument("--audio-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--video-bytes", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--polls-per-state", type=int, default=1)
+    parser.add_argument("--config", help="JSON file with FakeConfig keyword arguments (overrides flags)")
+    args = parser.parse_args(argv)
+
+    options = {"latency": args.latency, "audio_bytes": args.audio_bytes, "video_bytes": args.video_bytes,
+               "polls_per_state": args.polls_per_state}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            options.update(json.load(f))
+    server = FakeMiniMaxServer(FakeConfig(**options), host=args.host, port=args.port)
+    print(f"Fake MiniMax API listening on {server.base_url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""
+Throughput benchmarks for the MiniMax nodes against the local fake server.
+
+Every scenario runs in its own subprocess (so peak RSS is per scenario and
+excludes the fake server, which runs in a further subprocess) and calls the
+node class directly:
+
+    python benchmarks/run_benchmarks.py                      # all scenarios
+    python benchmarks/run_benchmarks.py tts_hex download_video -n 50 -c 8
+    python benchmarks/run_benchmarks.py --save results.json
+    python benchmarks/run_benchmarks.py --baseline results.json  # exit 1 on regression
+
+Reports throughput (calls/s), p50 / p99 latency and peak RSS.
+"""
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+SCENARIOS = {}
+
+
+def scenario(name, description, **server_options):
+    """Register fn(ctx, index) as a benchmark; server_options configure the fake server"""
+    def decorator(func):
+        SCENARIOS[name] = {"func": func, "description": description, "server": server_options}
+        return func
+    return decorator
+
+
+@scenario("tts_hex", "TextToSpeech, hex audio decoded and written to disk", audio_bytes=2 * 1024 * 1024)
+def bench_tts_hex(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis.", "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", False, f"bench_tts_{index}", index + 1, use_cache=False)
+
+
+@scenario("tts_stream", "TextToSpeech, streamed hex chunks appended to disk", audio_bytes=2 * 1024 * 1024)
+def bench_tts_stream(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis.", "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", True, f"bench_tts_stream_{index}", index + 1,
+        use_cache=False, stream=True)
+
+
+@scenario("tts_long", "TextToSpeech, long text split into chunks synthesized in parallel", audio_bytes=256 * 1024)
+def bench_tts_long(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis. " * 60, "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", True, f"bench_tts_long_{index}", index + 1,
+        use_cache=False, long_text_chunk_size=500, max_parallel_chunks=4)
+
+
+@scenario("tts_batch", "BatchTextToSpeech, 16 lines at concurrency 8", audio_bytes=256 * 1024)
+def bench_tts_batch(ctx, index):
+    lines = "\n".join(f"Benchmark line {line} for batch synthesis." for line in range(16))
+    ctx.node("batch_text_to_speech", "BatchTextToSpeech").generate_batch(
+        "bench-key", "bench-group", lines, "speech-02-hd", "male-qn-qingse", 1.0, 1.0, 0, "", False,
+        f"bench_tts_batch_{index}", 8, index + 1, use_cache=False)
+
+
+@scenario("tts_session", "TextToSpeech over the shared WebSocket session", audio_bytes=256 * 1024)
+def bench_tts_session(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis.", "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", False, f"bench_tts_session_{index}", index + 1,
+        use_cache=False, websocket_session=True)
+
+
+@scenario("tts_cached", "TextToSpeech, repeated request served from the result cache", audio_bytes=2 * 1024 * 1024)
+def bench_tts_cached(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis.", "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", True, f"bench_tts_cached_{index}", index + 1)
+
+
+@scenario("tts_url", "TextToSpeech, audio and subtitle fetched from URLs", audio_bytes=2 * 1024 * 1024)
+def bench_tts_url(ctx, index):
+    ctx.node("text_to_speech", "TextToSpeech").generate_speech(
+        "bench-key", "bench-group", "Benchmark sentence for speech synthesis.", "speech-02-hd",
+        "male-qn-qingse", 1.0, 1.0, 0, "", True, f"bench_tts_url_{index}", index + 1,
+        output_format="url", use_cache=False)
+
+
+@scenario("music_hex", "MusicGeneration, hex audio decoded and written to disk", audio_bytes=8 * 1024 * 1024)
+def bench_music_hex(ctx, index):
+    ctx.node("music_generation", "MusicGeneration").generate_music(
+        "bench-key", "An upbeat pop song for benchmarking", "[Verse]\nLa la la la la\nBenchmark all day",
+        "music-1.5", f"bench_music_{index}")
+
+
+@scenario("voice_design", "VoiceDesign with a hex trial audio", audio_bytes=512 * 1024)
+def bench_voice_design(ctx, index):
+    ctx.node("voice_design", "VoiceDesign").design_voice(
+        "bench-key", "A calm narrator voice", "Benchmark preview text.", custom_voice_id=f"bench_voice_{index}")
+
+
+@scenario("voice_clone", "VoiceCloning, multipart upload then clone")
+def bench_voice_clone(ctx, index):
+    path = ctx.input_file("clone_source.mp3", 1024 * 1024)
+    ctx.node("voice_cloning", "VoiceCloning").clone_voice(
+        "bench-key", "bench-group", path, f"Bench{index:04d}voice", False, False, "", "speech-02-hd", 0.7)
+
+
+@scenario("video_t2v", "MiniMaxVideoGeneration, text-to-video submission")
+def bench_video_t2v(ctx, index):
+    ctx.node("video_generation", "MiniMaxVideoGeneration").generate_video(
+        "bench-key", "MiniMax-Hailuo-02", f"Benchmark video {index}", True)
+
+
+@scenario("video_i2v", "MiniMaxVideoGeneration, first and last frame image encoding (requires torch)")
+def bench_video_i2v(ctx, index):
+    import torch
+    frames = ctx.cached("frames", lambda: (torch.rand(1, 1080, 1920, 3), torch.rand(1, 1080, 1920, 3)))
+    ctx.node("video_generation", "MiniMaxVideoGeneration").generate_video(
+        "bench-key", "MiniMax-Hailuo-02", f"Benchmark video {index}", True,
+        first_frame_image=frames[0], last_frame_image=frames[1], resolution="1080P")
+
+
+@scenario("video_status", "CheckVideoStatus, polling a task through its states", polls_per_state=2)
+def bench_video_status(ctx, index):
+    task_id = ctx.client().submit_video({"model": "MiniMax-Hailuo-02", "prompt": "benchmark"})["task_id"]
+    ctx.node("check_video_status", "CheckVideoStatus").check_status("bench-key", task_id, check_interval=0)
+
+
+@scenario("video_batch_status", "BatchCheckVideoStatus, 8 tasks polled together and downloaded as they finish",
+          polls_per_state=2, video_bytes=4 * 1024 * 1024)
+def bench_video_batch_status(ctx, index):
+    client = ctx.client()
+    task_ids = [client.submit_video({"model": "MiniMax-Hailuo-02", "prompt": "benchmark"})["task_id"] for _ in range(8)]
+    ctx.node("batch_video_status", "BatchCheckVideoStatus").check_batch(
+        "bench-key", "\n".join(task_ids), check_interval=0, download_videos=True,
+        filename_prefix=f"bench_batch_{index}")
+
+
+@scenario("video_callbacks", "CheckVideoStatus woken by status callbacks on the standalone listener",
+          task_seconds=0.5)
+def bench_video_callbacks(ctx, index):
+    from nodes import video_callbacks
+    video_callbacks.TOKEN = "bench-token"
+    url = ctx.cached("callback_url", lambda: video_callbacks.start_listener(0) + "?token=bench-token")
+    task_id = ctx.client().submit_video({"model": "MiniMax-Hailuo-02", "prompt": "benchmark", "callback_url": url})["task_id"]
+    ctx.node("check_video_status", "CheckVideoStatus").check_status("bench-key", task_id, 60, 300)
+
+
+@scenario("video_pipeline", "BatchVideoPipeline, 6 prompts submitted, polled and downloaded with overlapping stages",
+          task_seconds=[0.5, 1.0, 1.5], video_bytes=4 * 1024 * 1024)
+def bench_video_pipeline(ctx, index):
+    ctx.node("video_pipeline", "BatchVideoPipeline").generate_batch(
+        "bench-key", "T2V-01", "\n".join(f"benchmark {index} prompt {n}" for n in range(6)), True,
+        check_interval=0, filename_prefix=f"bench_pipeline_{index}", adaptive_polling=False)
+
+
+@scenario("download_video", "DownloadVideo, streamed file download", video_bytes=64 * 1024 * 1024)
+def bench_download_video(ctx, index):
+    ctx.node("download_video", "DownloadVideo").download_video("bench-key", f"bench{index}", f"bench_video_{index}")
+
+
+class Context:
+    """Per-scenario state shared by every iteration"""
+    def __init__(self, base_url, workdir):
+        self.base_url = base_url
+        self.workdir = workdir
+        self._cache = {}
+
+    def cached(self, key, factory):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def node(self, module, class_name):
+        import importlib
+        cls = getattr(importlib.import_module(f"nodes.{module}"), class_name)
+        instance = cls()
+        instance.base_url = self.base_url
+        return instance
+
+    def client(self):
+        from nodes.minimax_client import MiniMaxClient
+        return MiniMaxClient("bench-key", base_url=self.base_url)
+
+    def input_file(self, name, size):
+        def create():
+            path = os.path.join(self.workdir, name)
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            return path
+        return self.cached(("file", name), create)
+
+
+def _install_folder_paths(workdir):
+    """Outside ComfyUI, provide the two folder_paths functions the nodes use"""
+    try:
+        import folder_paths  # noqa: F401
+        folder_paths.get_output_directory = lambda: workdir
+        return
+    except ImportError:
+        pass
+    module = types.ModuleType("folder_paths")
+    module.get_output_directory = lambda: workdir
+    module.get_input_directory = lambda: workdir
+    module.get_temp_directory = lambda: workdir
+    sys.modules["folder_paths"] = module
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_child(name, iterations, concurrency, warmup, respect_rate_limits):
+    """Run one scenario in this process and return its result dict"""
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.setdefault("JM_MINIMAX_LOG_LEVEL", "WARNING")
+
+    spec = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix="jm-minimax-bench-") as workdir:
+        _install_folder_paths(workdir)
+        from nodes import rate_limiter
+        if not respect_rate_limits:
+            for endpoint in rate_limiter.ENDPOINTS:
+                rate_limiter.configure(endpoint, rpm=0, tpm=0, max_in_flight=0)
+
+        config_path = os.path.join(workdir, "fake_server.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(spec["server"], f)
+        server = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_server.py"), "--port", "0",
+                                   "--config", config_path], stdout=subprocess.PIPE, text=True)
+        try:
+            base_url = server.stdout.readline().strip().rsplit(" ", 1)[-1]
+            ctx = Context(base_url, workdir)
+            for i in range(warmup):
+                spec["func"](ctx, -1 - i)
+
+            def timed(index):
+                start = time.perf_counter()
+                spec["func"](ctx, index)
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed, range(iterations)))
+            wall = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        "scenario": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput": round(iterations / wall, 3),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_isolated(name, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", name,
+               "-n", str(args.iterations), "-c", str(args.concurrency), "--warmup", str(args.warmup)]
+    if args.respect_rate_limits:
+        command.append("--respect-rate-limits")
+    proc = subprocess.run(command, capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return {"scenario": name, "error": lines[-1] if lines else f"exit code {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages against a saved baseline"""
+    previous = {r["scenario"]: r for r in baseline.get("results", []) if "error" not in r}
+    regressions = []
+    for result in results:
+        old = previous.get(result["scenario"])
+        if old is None or "error" in result:
+            continue
+        if result["throughput"] < old["throughput"] * (1 - threshold):
+            regressions.append(f"{result['scenario']}: throughput {old['throughput']} -> {result['throughput']} calls/s")
+        for key in ("p50_ms", "p99_ms"):
+            if result[key] > old[key] * (1 + threshold):
+                regressions.append(f"{result['scenario']}: {key} {old[key]} -> {result[key]}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<16}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak RSS MB':>13}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['scenario']:<16}  skipped: {r['error']}")
+            continue
+        rss = r["peak_rss_mb"] if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{r['scenario']:<16}{r['throughput']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}{rss:>13}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MiniMax nodes against a local fake server")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="keep the default per-key rate limits instead of lifting them")
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with a JSON file written by --save")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, spec in SCENARIOS.items():
+            print(f"{name:<16}{spec['description']}")
+        return 0
+
+    if args.child:
+        result = run_child(args.child, args.iterations, args.concurrency, args.warmup, args.respect_rate_limits)
+        print(json.dumps(result))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = [run_isolated(name, args) for name in names]
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                       "iterations": args.iterations, "concurrency": args.concurrency, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import time
+import base64
+import binascii
+from . import metrics
+from . import tracing
+from .logger import get_logger
+
+log = get_logger("audio_decoder")
+
+# Characters decoded per slice. Multiple of both 2 (hex) and 4 (base64), so
+# every slice but the last decodes on its own.
+SLICE_CHARS = 1024 * 1024
+
+_HEX = re.compile(r"[0-9a-fA-F]*")
+_WHITESPACE = re.compile(r"\s")
+
+
+def detect_audio_format(audio_data, default="wav"):
+    """
+    Guess the container of audio data from its magic bytes (the first 12 are
+    enough). Returns an extension; default when the format is not recognised.
+    """
+    if not audio_data or len(audio_data) < 12:
+        return "bin"
+    header = bytes(audio_data[:12])
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "wav"
+    if header.startswith(b"ID3") or header.startswith(b"\xff\xfb"):
+        return "mp3"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    # ADTS frame header
+    if header[0] == 0xff and (header[1] & 0xf0) == 0xf0:
+        return "aac"
+    if b"ftyp" in header[:8]:
+        return "m4a"
+    log.warning("⚠️ Could not recognise the audio format, using .%s", default)
+    return default
+
+
+def detect_encoding(text):
+    """'hex' when text looks hex encoded, otherwise 'base64'"""
+    head = text[:SLICE_CHARS]
+    if len(text) % 2 == 0 and _HEX.fullmatch(head):
+        return "hex"
+    return "base64"
+
+
+def _normalise(text, encoding):
+    if encoding == "base64" and _WHITESPACE.search(text):
+        # Wrapped base64 would shift slice boundaries off the 4-character grid
+        return _WHITESPACE.sub("", text)
+    if encoding == "hex" and len(text) % 2:
+        raise ValueError(f"Hex audio data has an odd length ({len(text)} characters)")
+    return text
+
+
+def _decode_slice(piece, encoding, offset):
+    try:
+        if encoding == "hex":
+            return binascii.unhexlify(piece)
+        return base64.b64decode(piece, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid {encoding} audio data near character {offset}: {e}")
+
+
+def iter_decoded(text, encoding="hex", slice_chars=SLICE_CHARS):
+    """Yield the decoded bytes of a hex/base64 string one slice at a time"""
+    if encoding not in ("hex", "base64"):
+        raise ValueError(f"Unknown audio encoding: {encoding}")
+    text = _normalise(text, encoding)
+    for offset in range(0, len(text), slice_chars):
+        yield _decode_slice(text[offset:offset + slice_chars], encoding, offset)
+
+
+def decode_head(text, encoding="hex", size=16):
+    """Decode just the first size bytes, e.g. for detect_audio_format"""
+    if encoding == "hex":
+        return _decode_slice(text[:size * 2], encoding, 0)
+    head = _WHITESPACE.sub("", text[:size * 4])
+    return _decode_slice(head[:(size + 2) // 3 * 4], encoding, 0)[:size]
+
+
+def decode_bytes(text, encoding="hex", node=""):
+    """
+    Decode a hex or base64 audio string slice by slice into a bytearray,
+    validating as it goes. encoding may be "auto" to tell hex from base64.
+    """
+    if not text:
+        raise ValueError("No audio data to decode")
+    if encoding == "auto":
+        encoding = detect_encoding(text)
+    audio = bytearray()
+    with tracing.span(f"{encoding}_decode", size=len(text)), \
+            metrics.timer(metrics.DECODE_SECONDS, node=node, encoding=encoding):
+        for chunk in iter_decoded(text, encoding):
+            audio += chunk
+    log.debug("Decoded %d %s characters into %d bytes", len(text), encoding, len(audio))
+    return audio
+
+
+def decode_to_file(text, path, encoding="hex", keep=False, node=""):
+    """
+    Decode a hex or base64 audio string slice by slice straight into path
+    (via a .part file, so a failed decode leaves nothing behind). Returns the
+    decoded bytes as a bytearray when keep is set, otherwise None.
+    """
+    if not text:
+        raise ValueError("No audio data to decode")
+    if encoding == "auto":
+        encoding = detect_encoding(text)
+    audio = bytearray() if keep else None
+    tmp_path = path + ".part"
+    size = 0
+    try:
+        with tracing.span(f"{encoding}_decode", size=len(text)), \
+                metrics.timer(metrics.DECODE_SECONDS, node=node, encoding=encoding), \
+                open(tmp_path, "wb") as f:
+            for chunk in iter_decoded(text, encoding):
+                f.write(chunk)
+                size += len(chunk)
+                if keep:
+                    audio += chunk
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    log.debug("Decoded %d %s characters into %s (%d bytes)", len(text), encoding, path, size)
+    return audio
+
+
+class HexFieldDecoder:
+    """
+    Incremental reader for a JSON reply whose bulk is one hex string field
+    (the "audio" of t2a_v2 and music_generation). Fed the raw body as it
+    streams in, it decodes that field's value into path (when one is given)
+    and keeps only the rest of the body, so the hex text is never held in
+    memory whole. The decoded bytes are also collected in self.audio when
+    there is no path or keep is set; self.size counts them either way.
+    """
+    def __init__(self, path=None, field="audio", keep=False):
+        self.path = path
+        self.keep = keep or not path
+        self.tmp_path = path + ".part" if path else None
+        self.pattern = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+        self.body = bytearray()
+        self.scanned = 0
+        self.state = "before"
+        self.carry = b""
+        self.file = None
+        self.audio = bytearray()
+        self.size = 0
+        self.decode_seconds = 0.0
+        self.write_seconds = 0.0
+
+    def feed(self, chunk):
+        if self.state == "value":
+            self._feed_value(chunk)
+            return
+        self.body += chunk
+        if self.state != "before":
+            return
+        # Re-check a little of the previous data in case the key straddles chunks
+        match = self.pattern.search(self.body, max(0, self.scanned - 64))
+        if match is None:
+            self.scanned = len(self.body)
+            return
+        rest = bytes(self.body[match.end():])
+        del self.body[match.end():]
+        self.state = "value"
+        if self.path:
+            self.file = open(self.tmp_path, "wb")
+        self._feed_value(rest)
+
+    def _feed_value(self, chunk):
+        end = chunk.find(b'"')
+        data = self.carry + (chunk if end < 0 else chunk[:end])
+        if len(data) % 2:
+            self.carry = data[-1:]
+            data = data[:-1]
+        else:
+            self.carry = b""
+        if data:
+            decode_start = time.perf_counter()
+            try:
+                decoded = binascii.unhexlify(data)
+            except binascii.Error as e:
+                raise ValueError(f"Invalid hex audio data after {self.size} bytes: {e}")
+            self.size += len(decoded)
+            if self.keep:
+                self.audio += decoded
+            write_start = time.perf_counter()
+            if self.file is not None:
+                self.file.write(decoded)
+            self.write_seconds += time.perf_counter() - write_start
+            self.decode_seconds += write_start - decode_start
+        if end >= 0:
+            if self.carry:
+                raise ValueError("Hex audio data has an odd length")
+            if self.file is not None:
+                self.file.close()
+            self.state = "after"
+            self.body += chunk[end:]
+
+    def finish(self):
+        """Parse the rest of the body (the field's value reads as "") and move the file into place"""
+        if self.state == "value":
+            raise ValueError("Response ended inside the hex audio data")
+        try:
+            data = json.loads(bytes(self.body))
+        except ValueError:
+            log.debug("Raw response content: %r", bytes(self.body[:1024]))
+            raise RuntimeError("Failed to decode JSON response")
+        if self.size and self.file is not None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            self.abort()
+        return data
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
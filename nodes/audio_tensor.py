@@ -0,0 +1,156 @@
+import io
+import struct
+import numpy as np
+from .audio_decoder import detect_audio_format
+from .logger import get_logger
+
+log = get_logger("audio_tensor")
+
+_warned = set()
+
+# Full-scale value of each integer PCM sample width
+_INT_SCALE = {1: 128.0, 2: 32768.0, 3: 8388608.0, 4: 2147483648.0}
+
+
+def _to_audio(samples, sample_rate):
+    """ComfyUI AUDIO dict from a float32 (channels, samples) array"""
+    import torch
+    waveform = torch.from_numpy(np.ascontiguousarray(samples)).unsqueeze(0)
+    return {"waveform": waveform, "sample_rate": int(sample_rate)}
+
+
+def pcm_to_audio(data, sample_rate, channels=1, sample_width=2, is_float=False, offset=0, size=None):
+    """
+    Interleaved little-endian PCM to a ComfyUI AUDIO dict. The samples are
+    read in place from data; the only new buffer is the float32 waveform.
+    """
+    frame_size = sample_width * channels
+    available = len(data) - offset if size is None else min(size, len(data) - offset)
+    frames = max(0, available) // frame_size
+    count = frames * channels
+
+    if is_float:
+        dtype = "<f4" if sample_width == 4 else "<f8"
+        samples = np.frombuffer(data, dtype=dtype, count=count, offset=offset).astype(np.float32)
+    elif sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset).astype(np.float32)
+        samples -= 128.0
+        samples /= _INT_SCALE[1]
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8, count=count * 3, offset=offset).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values[values >= 1 << 23] -= 1 << 24
+        samples = values.astype(np.float32) / _INT_SCALE[3]
+    elif sample_width in (2, 4):
+        dtype = "<i2" if sample_width == 2 else "<i4"
+        samples = np.frombuffer(data, dtype=dtype, count=count, offset=offset).astype(np.float32)
+        samples /= _INT_SCALE[sample_width]
+    else:
+        raise ValueError(f"Unsupported PCM sample width: {sample_width} bytes")
+    return _to_audio(samples.reshape(frames, channels).T, sample_rate)
+
+
+def wav_to_audio(data):
+    """Parse a RIFF/WAVE file held in memory into a ComfyUI AUDIO dict"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+            bits = struct.unpack_from("<H", data, body + 14)[0]
+            if format_tag == 0xFFFE and chunk_size >= 26:
+                # WAVE_FORMAT_EXTENSIBLE: the real format is the start of the sub-format GUID
+                format_tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk comes before its fmt chunk")
+            format_tag, channels, sample_rate, bits = fmt
+            if format_tag not in (1, 3):
+                raise ValueError(f"Unsupported WAV encoding (format tag {format_tag})")
+            # Streamed WAVs may carry a placeholder size; pcm_to_audio clamps to what is there
+            return pcm_to_audio(data, sample_rate, channels, bits // 8, is_float=format_tag == 3,
+                                offset=body, size=chunk_size)
+        offset = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+def _decode_with_av(data):
+    import av
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        sample_rate = stream.codec_context.sample_rate
+        channels = stream.codec_context.channels
+        parts = []
+        for frame in container.decode(stream):
+            array = frame.to_ndarray()
+            if not frame.format.is_planar:
+                # Packed formats come back as (1, samples * channels)
+                array = array.reshape(-1, len(frame.layout.channels)).T
+            if array.dtype.kind in "iu":
+                scale = _INT_SCALE[array.dtype.itemsize]
+                array = array.astype(np.float32)
+                if frame.format.name.startswith("u8"):
+                    array -= 128.0
+                array /= scale
+            parts.append(array.astype(np.float32, copy=False))
+    samples = np.concatenate(parts, axis=1) if parts else np.zeros((channels, 0), dtype=np.float32)
+    return _to_audio(samples, sample_rate)
+
+
+def _decode_with_torchaudio(data):
+    import torchaudio
+    waveform, sample_rate = torchaudio.load(io.BytesIO(data))
+    return {"waveform": waveform.unsqueeze(0), "sample_rate": int(sample_rate)}
+
+
+def decode_audio(data, audio_format=None, sample_rate=None, channels=1):
+    """
+    Decode audio bytes into a ComfyUI AUDIO dict ({"waveform": [1, channels,
+    samples] float tensor, "sample_rate": int}). WAV and raw PCM are mapped
+    directly; compressed formats (mp3, flac ...) are decoded with PyAV, or
+    torchaudio when PyAV is not installed. PCM needs sample_rate.
+    """
+    audio_format = audio_format or detect_audio_format(data)
+    if audio_format == "pcm":
+        if not sample_rate:
+            raise ValueError("Raw PCM audio needs a sample rate")
+        return pcm_to_audio(data, sample_rate, channels)
+    if audio_format == "wav":
+        return wav_to_audio(data)
+    try:
+        return _decode_with_av(data)
+    except ImportError:
+        pass
+    try:
+        return _decode_with_torchaudio(data)
+    except ImportError:
+        raise RuntimeError(f"Decoding {audio_format} audio needs PyAV or torchaudio to be installed")
+
+
+def read_file(path):
+    """Whole file as bytes (for AUDIO outputs of results served from disk)"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def audio_output(data, audio_format=None, required=False, sample_rate=None, channels=1):
+    """
+    Build a node's AUDIO output from the decoded bytes. When the audio was
+    also saved to disk (required=False) a decoding problem, such as no
+    decoder being installed, is logged once and None is returned instead.
+    """
+    try:
+        return decode_audio(data, audio_format, sample_rate, channels)
+    except Exception as e:
+        if required:
+            raise RuntimeError(f"Could not decode audio for the AUDIO output: {e}")
+        if str(e) not in _warned:
+            _warned.add(str(e))
+            log.warning("⚠️ AUDIO output unavailable (%s); use the saved file path instead", e)
+        return None
@@ -0,0 +1,278 @@
+import os
+import io
+import csv
+import json
+import time
+import contextvars
+import concurrent.futures
+import folder_paths
+from . import tracing
+from .progress import Progress
+from .text_to_speech import TextToSpeech
+from .logger import get_logger
+
+log = get_logger("tts_batch")
+
+# Per-line fields that override the node's defaults
+LINE_FIELDS = ("text", "voice_id", "emotion", "speed", "filename")
+
+
+def _detect_format(content, file_path=""):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in (".jsonl", ".json"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    if ext == ".txt":
+        return "text"
+    first = next((line.strip() for line in content.splitlines() if line.strip()), "")
+    if first.startswith("{"):
+        return "jsonl"
+    header = next(csv.reader([first]), [])
+    if "text" in [column.strip().lower() for column in header]:
+        return "csv"
+    return "text"
+
+
+def parse_lines(content, input_format="auto", file_path=""):
+    """
+    Parse batch input into a list of dicts with a "line" number and any of
+    LINE_FIELDS. jsonl: one object per line; csv: a header row naming the
+    columns (text is required); text: every non-blank line is a text.
+    """
+    if input_format == "auto":
+        input_format = _detect_format(content, file_path)
+
+    items = []
+    if input_format == "jsonl":
+        for number, raw in enumerate(content.splitlines(), 1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: invalid JSON: {e}")
+            if isinstance(record, str):
+                record = {"text": record}
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {number}: expected a JSON object")
+            items.append(dict(record, line=number))
+    elif input_format == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or "text" not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ValueError("CSV input needs a header row with a 'text' column")
+        for row in reader:
+            record = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+            if any(record.values()):
+                items.append(dict(record, line=reader.line_num))
+    elif input_format == "text":
+        for number, raw in enumerate(content.splitlines(), 1):
+            if raw.strip():
+                items.append({"text": raw.strip(), "line": number})
+    else:
+        raise ValueError(f"Unknown input format: {input_format}")
+    return items
+
+
+class BatchTextToSpeech:
+    """
+    MiniMax batch Text to Speech node for ComfyUI
+    Synthesizes many lines in one node with bounded concurrency and writes a
+    manifest JSON describing every result
+    """
+    def __init__(self):
+        self.base_url = "https://api.minimaxi.chat/v1"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "api_key": ("STRING", {"multiline": False}),
+                "group_id": ("STRING", {"multiline": False}),
+                "lines": ("STRING", {
+                    "multiline": True,
+                    "placeholder": "One line per item: JSONL ({\"text\": ..., \"voice_id\": ..., \"emotion\": ..., \"speed\": ..., \"filename\": ...}), CSV with a header row, or plain text",
+                }),
+                "model": (["speech-2.5-hd-preview", "speech-02-hd", "speech-02-turbo", "speech-01-hd", "speech-01-turbo"], {"default": "speech-2.5-hd-preview"}),
+                "voice_id": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "Default voice ID for lines without one"
+                }),
+                "speed": ("FLOAT", {"default": 1.0, "min": 0.5, "max": 2.0, "step": 0.1}),
+                "volume": ("FLOAT", {"default": 1.0, "min": 0.1, "max": 10.0, "step": 0.1}),
+                "pitch": ("INT", {"default": 0, "min": -12, "max": 12, "step": 1}),
+                "emotion": (["", "happy", "sad", "angry", "fearful", "disgusted", "surprised", "neutral"], {"default": ""}),
+                "subtitle_enable": ("BOOLEAN", {"default": False}),
+                "filename_prefix": ("STRING", {"default": "tts_batch", "multiline": False}),
+                "max_concurrency": ("INT", {
+                    "default": 4, "min": 1, "max": 32, "step": 1,
+                    "tooltip": "How many lines are synthesized at the same time (the rate limiter still applies)"
+                }),
+                "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff, "step": 1}),
+            },
+            "optional": {
+                "file_path": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "Read lines from this file instead (relative paths are in the ComfyUI input folder)"
+                }),
+                "input_format": (["auto", "jsonl", "csv", "text"], {"default": "auto"}),
+                "language_boost": (["auto", "Chinese", "Chinese,Yue", "English", "Arabic", "Russian", "Spanish",
+                                  "French", "Portuguese", "German", "Turkish", "Dutch", "Ukrainian", "Vietnamese",
+                                  "Indonesian", "Japanese", "Italian", "Korean", "Thai", "Polish", "Romanian",
+                                  "Greek", "Czech", "Finnish", "Hindi"], {"default": "auto"}),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Reuse audio from identical earlier requests instead of synthesizing and paying again"
+                }),
+                "continue_on_error": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Keep going when a line fails and record the error in the manifest; off fails the node if any line fails"
+                }),
+                "websocket_session": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Send lines over one persistent WebSocket connection per voice instead of an HTTP request per line (no subtitles)"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("manifest_path", "audio_paths")
+    FUNCTION = "generate_batch"
+    CATEGORY = "JM-MiniMax-API/Speech"
+
+    def _read_input(self, lines, file_path):
+        if not file_path or not file_path.strip():
+            return lines
+        path = file_path.strip()
+        if not os.path.isabs(path):
+            path = os.path.join(folder_paths.get_input_directory(), path)
+        if not os.path.exists(path):
+            raise ValueError(f"Batch input file not found: {path}")
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return f.read()
+
+    def _synthesize(self, tts, item, defaults):
+        """Run one line through TextToSpeech and return its manifest entry"""
+        entry = {
+            "index": item["index"],
+            "line": item["line"],
+            "text": item["text"],
+            "voice_id": item["voice_id"],
+            "emotion": item["emotion"],
+            "speed": item["speed"],
+            "filename": item["filename"],
+        }
+        start = time.perf_counter()
+        try:
+            audio_path, subtitle_path, _, _ = tts.generate_speech(
+                defaults["api_key"], defaults["group_id"], item["text"], defaults["model"], item["voice_id"],
+                item["speed"], defaults["volume"], defaults["pitch"], item["emotion"], defaults["subtitle_enable"],
+                item["filename"], defaults["seed"], language_boost=defaults["language_boost"],
+                use_cache=defaults["use_cache"], websocket_session=defaults["websocket_session"], audio_output=False)
+            entry.update(status="ok", audio_path=audio_path, subtitle_path=subtitle_path)
+        except Exception as e:
+            log.warning("⚠️ Batch line %d failed: %s", item["line"], e)
+            entry.update(status="error", audio_path="", subtitle_path="", error=str(e))
+        entry["latency_seconds"] = round(time.perf_counter() - start, 3)
+        return entry
+
+    @tracing.traced("BatchTextToSpeech")
+    def generate_batch(self, api_key, group_id, lines, model, voice_id, speed, volume, pitch, emotion,
+                       subtitle_enable, filename_prefix, max_concurrency, seed, file_path="", input_format="auto",
+                       language_boost="auto", use_cache=True, continue_on_error=True, websocket_session=False):
+        """
+        Synthesize every line of a JSONL/CSV/text batch and write a manifest.
+        Returns the manifest path and the audio paths of successful lines,
+        newline-separated in input order.
+        """
+        with tracing.span("validation"):
+            if not api_key or not group_id:
+                raise ValueError("API Key and Group ID must be provided")
+            if websocket_session and subtitle_enable:
+                raise ValueError("WebSocket sessions do not return subtitles; turn off subtitle_enable")
+
+            content = self._read_input(lines, file_path)
+            records = parse_lines(content, input_format, file_path.strip() if file_path else "")
+            if not records:
+                raise ValueError("No lines to synthesize")
+
+            clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_')) or "tts_batch"
+            items = []
+            used_names = set()
+            for index, record in enumerate(records):
+                text = str(record.get("text") or "").strip()
+                if not text:
+                    raise ValueError(f"Line {record['line']}: text is empty")
+                try:
+                    line_speed = float(record.get("speed") or speed)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Line {record['line']}: invalid speed {record.get('speed')!r}")
+                if not 0.5 <= line_speed <= 2.0:
+                    raise ValueError(f"Line {record['line']}: speed must be between 0.5 and 2.0")
+                # Every line needs its own filename prefix; output names only carry a per-second timestamp
+                name = str(record.get("filename") or "").strip() or f"{clean_prefix}_{index + 1:04d}"
+                if name in used_names:
+                    name = f"{name}_{index + 1:04d}"
+                used_names.add(name)
+                items.append({
+                    "index": index,
+                    "line": record["line"],
+                    "text": text,
+                    "voice_id": str(record.get("voice_id") or voice_id),
+                    "emotion": str(record.get("emotion") if record.get("emotion") is not None else emotion),
+                    "speed": line_speed,
+                    "filename": name,
+                })
+
+        defaults = {
+            "api_key": api_key, "group_id": group_id, "model": model, "volume": volume, "pitch": pitch,
+            "subtitle_enable": subtitle_enable, "seed": seed, "language_boost": language_boost,
+            "use_cache": use_cache, "websocket_session": websocket_session,
+        }
+        tts = TextToSpeech()
+        tts.base_url = self.base_url
+        progress = Progress(len(items))
+        entries = [None] * len(items)
+        log.info("🗂️ Synthesizing %d lines with up to %d in parallel", len(items), max_concurrency)
+        start = time.perf_counter()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="jm-minimax-batch") as pool:
+            # Each line runs in a copy of this context so its spans nest under the batch span
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._synthesize, tts, item, defaults): item["index"]
+                for item in items
+            }
+            for future in concurrent.futures.as_completed(futures):
+                entries[futures[future]] = future.result()
+                progress.advance()
+
+        elapsed = time.perf_counter() - start
+        failed = [entry for entry in entries if entry["status"] != "ok"]
+        manifest = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": model,
+            "total": len(entries),
+            "succeeded": len(entries) - len(failed),
+            "failed": len(failed),
+            "elapsed_seconds": round(elapsed, 3),
+            "items": entries,
+        }
+
+        output_dir = folder_paths.get_output_directory()
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, f"{clean_prefix}_manifest_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with tracing.span("file_write"):
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+        log.info("🗂️ Batch finished: %d/%d lines in %.1fs, manifest: %s",
+                 manifest["succeeded"], manifest["total"], elapsed, manifest_path)
+
+        if failed and (not continue_on_error or len(failed) == len(entries)):
+            raise RuntimeError(f"{len(failed)} of {len(entries)} batch lines failed "
+                               f"(first: line {failed[0]['line']}: {failed[0]['error']}); see {manifest_path}")
+
+        audio_paths = "\n".join(entry["audio_path"] for entry in entries if entry["status"] == "ok")
+        return (os.path.abspath(manifest_path), audio_paths)
@@ -0,0 +1,130 @@
+import json
+import time
+import contextvars
+import concurrent.futures
+from . import tracing
+from . import poll_scheduler
+from .progress import Progress
+from .poll_scheduler import parse_task_ids
+from .download_video import DownloadVideo
+from .logger import get_logger
+
+log = get_logger("video_batch")
+
+
+class BatchCheckVideoStatus:
+    """
+    MiniMax batch video status node for ComfyUI
+    Waits for many video generation tasks at once through the shared poll
+    scheduler and reports them in the order they finish, optionally
+    downloading each video as soon as it is ready
+    """
+    def __init__(self):
+        self.base_url = "https://api.minimaxi.chat/v1"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "api_key": ("STRING", {"multiline": False}),
+                "task_ids": ("STRING", {
+                    "multiline": True,
+                    "placeholder": "Task IDs from video generation, one per line (commas also work)"
+                }),
+                "check_interval": ("INT", {"default": 30, "min": 10, "max": 300, "step": 5, "tooltip": "Check interval in seconds"}),
+                "max_wait_time": ("INT", {"default": 1800, "min": 300, "max": 7200, "step": 300, "tooltip": "Maximum wait time in seconds for the whole batch"}),
+            },
+            "optional": {
+                "download_videos": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Download every finished video right away, while the rest are still rendering"
+                }),
+                "filename_prefix": ("STRING", {"default": "minimax_video", "multiline": False}),
+                "max_parallel_downloads": ("INT", {"default": 4, "min": 1, "max": 16, "step": 1}),
+                "adaptive_polling": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Poll around the expected finish time learned from earlier videos instead of every check_interval seconds"
+                }),
+                "continue_on_error": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Report failed tasks in the results and keep going; off fails the node if any task fails"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("task_ids", "statuses", "file_ids", "video_paths", "results_json")
+    FUNCTION = "check_batch"
+    CATEGORY = "JM-MiniMax-API/Video"
+
+    def _download(self, api_key, entry, prefix):
+        start = time.perf_counter()
+        try:
+            downloader = DownloadVideo()
+            downloader.base_url = self.base_url
+            entry["video_path"] = downloader.download_video(api_key, entry["file_id"], f"{prefix}_{entry['task_id']}")[0]
+        except Exception as e:
+            log.warning("⚠️ Download of task %s failed: %s", entry["task_id"], e)
+            entry["error"] = str(e)
+        entry["download_seconds"] = round(time.perf_counter() - start, 3)
+        return entry
+
+    @tracing.traced("BatchCheckVideoStatus")
+    def check_batch(self, api_key, task_ids, check_interval=30, max_wait_time=1800, download_videos=False,
+                    filename_prefix="minimax_video", max_parallel_downloads=4, adaptive_polling=True,
+                    continue_on_error=True):
+        """
+        Wait for every task and return newline-joined task_ids, statuses,
+        file_ids and video_paths in completion order, plus a JSON list with
+        one entry per task.
+        """
+        ids = parse_task_ids(task_ids)
+        if not api_key or not ids:
+            raise ValueError("API Key and at least one Task ID must be provided")
+        clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_')) or "minimax_video"
+
+        scheduler = poll_scheduler.get_scheduler()
+        tasks = [scheduler.watch(api_key, self.base_url, task_id, interval=check_interval,
+                                 max_wait=max_wait_time, adaptive=adaptive_polling) for task_id in ids]
+        log.info("🎬 Waiting for %d video tasks", len(tasks))
+        progress = Progress(len(tasks))
+        entries = []
+        downloads = []
+        start = time.monotonic()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel_downloads,
+                                                   thread_name_prefix="jm-minimax-video-dl") as pool:
+            for task in poll_scheduler.as_completed(tasks, timeout=max_wait_time + 60):
+                entry = {"task_id": task.task_id, "status": task.status, "file_id": "", "video_path": "",
+                         "error": "", "elapsed_seconds": round(time.monotonic() - start, 1)}
+                error = task.future.exception()
+                if error is not None:
+                    entry["error"] = str(error)
+                    if task.status.lower() not in poll_scheduler.TERMINAL_STATUSES:
+                        entry["status"] = "Error"
+                    log.warning("⚠️ Video task %s failed: %s", task.task_id, error)
+                else:
+                    entry["status"] = task.result.get("status", task.status)
+                    entry["file_id"] = str(task.result.get("file_id") or "")
+                    log.info("✅ Video task %s finished (%d/%d)", task.task_id, len(entries) + 1, len(tasks))
+                    if download_videos and entry["file_id"]:
+                        downloads.append(pool.submit(contextvars.copy_context().run,
+                                                     self._download, api_key, entry, clean_prefix))
+                entries.append(entry)
+                progress.advance()
+            concurrent.futures.wait(downloads)
+
+        failed = [entry for entry in entries if entry["error"]]
+        if failed and (not continue_on_error or len(failed) == len(entries)):
+            raise RuntimeError(f"{len(failed)} of {len(entries)} video tasks failed "
+                               f"(first: {failed[0]['task_id']}: {failed[0]['error']})")
+        log.info("🎬 Batch finished: %d/%d tasks succeeded in %.0fs",
+                 len(entries) - len(failed), len(entries), time.monotonic() - start)
+
+        return (
+            "\n".join(entry["task_id"] for entry in entries),
+            "\n".join(entry["status"] for entry in entries),
+            "\n".join(entry["file_id"] for entry in entries),
+            "\n".join(entry["video_path"] for entry in entries),
+            json.dumps(entries, ensure_ascii=False, indent=2),
+        )
@@ -1,140 +1,95 @@
-import os
-import json
-import time
 import requests
-import folder_paths
+from . import tracing
+from . import poll_scheduler
+from .logger import get_logger
+
+log = get_logger("video_status")
 
 class CheckVideoStatus:
     """
     MiniMax Check Video Generation Status node for ComfyUI
     """
     def __init__(self):
-        self.api_base = "https://api.minimaxi.chat/v1/query/video_generation"
+        self.base_url = "https://api.minimaxi.chat/v1"
         
     @classmethod
     def INPUT_TYPES(cls):
         return {
             "required": {
                 "api_key": ("STRING", {"multiline": False}),
-                "task_id": ("STRING", {"multiline": False, "placeholder": "Task ID from video generation"}),
+                "task_id": ("STRING", {"multiline": False, "placeholder": "Task ID from video generation", "tooltip": "A single task ID; use Batch Check Video Status for the task_id output of a batch"}),
                 "check_interval": ("INT", {"default": 30, "min": 10, "max": 300, "step": 5, "tooltip": "Check interval in seconds"}),
                 "max_wait_time": ("INT", {"default": 1800, "min": 300, "max": 7200, "step": 300, "tooltip": "Maximum wait time in seconds (default: 30 minutes)"}),
+            },
+            "optional": {
+                "wait_mode": (["wait", "handle"], {
+                    "default": "wait",
+                    "tooltip": "wait: block until the video is ready. handle: return at once with the current status and a task_handle; the task keeps being polled in the background and Download Video can wait for it"
+                }),
+                "adaptive_polling": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Learn how long videos of this model, resolution and duration usually take: query rarely early on and more often near the expected finish. Off polls every check_interval seconds"
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING")
-    RETURN_NAMES = ("status", "file_id", "video_url", "cover_image_url")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("status", "file_id", "video_url", "cover_image_url", "task_handle")
     FUNCTION = "check_status"
     CATEGORY = "JM-MiniMax-API/Video"
 
-    def check_status(self, api_key, task_id, check_interval=30, max_wait_time=1800):
+    @tracing.traced("CheckVideoStatus")
+    def check_status(self, api_key, task_id, check_interval=30, max_wait_time=1800, wait_mode="wait", adaptive_polling=True):
+        task_id = poll_scheduler.single_task_id(task_id)
         if not api_key or not task_id:
             raise ValueError("API Key and Task ID must be provided")
 
         try:
-            # Build URL with task_id as query parameter (as per official API)
-            url = f"{self.api_base}?task_id={task_id}"
+            log.info("Starting status check for task_id: %s", task_id)
+            log.debug("Check interval: %s seconds", check_interval)
+            log.debug("Maximum wait time: %s seconds (%s minutes)", max_wait_time, max_wait_time//60)
             
-            # Prepare API request headers
-            headers = {
-                'authorization': f'Bearer {api_key}',
-                'content-type': 'application/json',
-            }
+            # The background scheduler owns the polling; this thread only waits for the outcome
+            task = poll_scheduler.get_scheduler().watch(api_key, self.base_url, task_id,
+                                                        interval=check_interval, max_wait=max_wait_time,
+                                                        adaptive=adaptive_polling)
+            if wait_mode == "handle" and not task.done:
+                log.info("Task %s is polled in the background (status: %s)", task_id, task.status)
+                return (task.status, "", "", "", task_id)
+            
+            response_data = poll_scheduler.wait(task)
+            
+            # Extract task information
+            status = response_data.get("status", "unknown")
+            file_id = response_data.get("file_id", "")
+            video_url = response_data.get("video_url", "")
+            cover_image_url = response_data.get("cover_image_url", "")
+            
+            # Additional information for logging
+            if "video_width" in response_data and "video_height" in response_data:
+                video_width = response_data['video_width']
+                video_height = response_data['video_height']
+                if video_width > 0 and video_height > 0:
+                    log.debug("Video dimensions: %sx%s", video_width, video_height)
             
-            print(f"Starting status check for task_id: {task_id}")
-            print(f"Check interval: {check_interval} seconds")
-            print(f"Maximum wait time: {max_wait_time} seconds ({max_wait_time//60} minutes)")
-            print(f"Request URL: {url}")
+            if "video_length" in response_data and response_data['video_length']:
+                log.debug("Video length: %ss", response_data['video_length'])
             
-            start_time = time.time()
-            attempt = 0
+            if file_id:
+                log.debug("File ID: %s", file_id)
+            if video_url:
+                log.debug("Video URL: %s", video_url)
+            if cover_image_url:
+                log.debug("Cover Image URL: %s", cover_image_url)
             
-            while True:
-                attempt += 1
-                elapsed_time = time.time() - start_time
-                
-                print(f"\n--- Attempt {attempt} (Elapsed: {elapsed_time:.0f}s) ---")
-                
-                # Check if we've exceeded the maximum wait time
-                if elapsed_time > max_wait_time:
-                    raise RuntimeError(f"Maximum wait time ({max_wait_time} seconds) exceeded. Video generation may still be in progress.")
-                
-                # Make API request using GET method (as per official API)
-                response = requests.get(url, headers=headers, timeout=30)
-                
-                print(f"Response status code: {response.status_code}")
-                
-                if response.status_code == 404:
-                    raise RuntimeError("Video generation task not found. Please check your task_id.")
-                
-                try:
-                    response_data = response.json()
-                    print(f"Response data: {json.dumps(response_data, indent=2)}")
-                except json.JSONDecodeError:
-                    print(f"Raw response content: {response.content}")
-                    raise RuntimeError("Failed to decode JSON response")
-                
-                # Check for API errors
-                base_resp = response_data.get("base_resp", {})
-                status_code = base_resp.get("status_code")
-                status_msg = base_resp.get("status_msg", "Unknown error")
-                
-                if status_code is not None and status_code != 0:
-                    error_messages = {
-                        1002: "Rate limit exceeded, please try again later",
-                        1004: "Authentication failed, please check your API key",
-                        1008: "Insufficient account balance",
-                        2013: "Invalid parameters, please check your input",
-                        2049: "Invalid API key, please check your API key"
-                    }
-                    error_msg = error_messages.get(status_code, f"API Error {status_code}: {status_msg}")
-                    raise RuntimeError(error_msg)
-                
-                # Extract task information
-                status = response_data.get("status", "unknown")
-                file_id = response_data.get("file_id", "")
-                video_url = response_data.get("video_url", "")
-                cover_image_url = response_data.get("cover_image_url", "")
-                
-                # Additional information for logging
-                if "video_width" in response_data and "video_height" in response_data:
-                    video_width = response_data['video_width']
-                    video_height = response_data['video_height']
-                    if video_width > 0 and video_height > 0:
-                        print(f"Video dimensions: {video_width}x{video_height}")
-                
-                if "video_length" in response_data and response_data['video_length']:
-                    print(f"Video length: {response_data['video_length']}s")
-                
-                print(f"Status: {status}")
-                if file_id:
-                    print(f"File ID: {file_id}")
-                if video_url:
-                    print(f"Video URL: {video_url}")
-                if cover_image_url:
-                    print(f"Cover Image URL: {cover_image_url}")
-                
-                # Check if the task is completed
-                if status.lower() == "success":
-                    print(f"\n🎉 Video generation completed successfully!")
-                    print(f"Total time: {elapsed_time:.0f} seconds ({elapsed_time/60:.1f} minutes)")
-                    return (status, file_id, video_url, cover_image_url)
-                elif status.lower() == "failed":
-                    print(f"\n❌ Video generation failed!")
-                    raise RuntimeError(f"Video generation failed with status: {status}")
-                else:
-                    # Status is still processing/preparing, wait and try again
-                    print(f"Status: {status} - Waiting {check_interval} seconds before next check...")
-                    
-                    # Show progress
-                    remaining_time = max(0, max_wait_time - elapsed_time)
-                    print(f"Remaining wait time: {remaining_time:.0f} seconds ({remaining_time/60:.1f} minutes)")
-                    
-                    time.sleep(check_interval)
+            return (status, file_id, video_url, cover_image_url, task_id)
 
+        except poll_scheduler.UNWRAPPED_ERRORS:
+            # A user cancel or an API error code is reported as is
+            raise
         except requests.exceptions.RequestException as e:
-            print(f"Request error: {str(e)}")
+            log.error("Request error: %s", e)
             raise RuntimeError(f"Failed to connect to MiniMax API: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            log.error("Unexpected error: %s", e)
             raise RuntimeError(f"Status check failed: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from .logger import get_logger
+
+log = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Default breaker settings, overridable per endpoint with JM_MINIMAX_BREAKER, e.g.
+#   JM_MINIMAX_BREAKER='{"query": {"slow_call_seconds": 5}, "*": {"open_seconds": 60}}'
+#   window_seconds: rolling window the error/slow rates are computed over
+#   min_calls: calls needed in the window before the breaker can trip
+#   failure_rate: fraction of failed calls that trips the breaker
+#   slow_call_seconds / slow_rate: latency threshold and fraction of slow calls that trips it
+#   open_seconds: initial fail-fast period, doubled on every failed probe up to max_open_seconds
+DEFAULT_SETTINGS = {
+    "window_seconds": 60,
+    "min_calls": 6,
+    "failure_rate": 0.5,
+    "slow_call_seconds": None,
+    "slow_rate": 0.8,
+    "open_seconds": 30,
+    "max_open_seconds": 300,
+}
+
+ENDPOINT_SETTINGS = {
+    "query": {"slow_call_seconds": 10},
+    "files": {"slow_call_seconds": 15},
+    "t2a_v2": {"slow_call_seconds": 90},
+}
+
+
+def _load_settings():
+    settings = {endpoint: dict(values) for endpoint, values in ENDPOINT_SETTINGS.items()}
+    override = os.environ.get("JM_MINIMAX_BREAKER", "").strip()
+    if override:
+        try:
+            for endpoint, values in json.loads(override).items():
+                settings.setdefault(endpoint, {}).update(values)
+        except (ValueError, AttributeError) as e:
+            log.warning("⚠️ Ignoring invalid JM_MINIMAX_BREAKER: %s", e)
+    return settings
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without contacting the server while a circuit is open"""
+    def __init__(self, name, retry_in, probing=False):
+        self.retry_in = retry_in
+        if probing:
+            # The wait depends on the probe: none if it succeeds, a new open period if not
+            super().__init__(f"MiniMax {name} is being probed after failures; requests are paused "
+                             f"for up to {retry_in:.0f}s")
+        else:
+            super().__init__(f"MiniMax {name} is failing or too slow; requests are paused for another {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+    closed -> open when the failure or slow-call rate crosses its threshold;
+    open -> half_open once open_seconds have passed, letting a single probe through;
+    half_open -> closed if the probe succeeds, back to open (with a longer wait) if not.
+    """
+    def __init__(self, name, **settings):
+        config = dict(DEFAULT_SETTINGS)
+        config.update(settings)
+        self.name = name
+        self.window_seconds = config["window_seconds"]
+        self.min_calls = config["min_calls"]
+        self.failure_rate = config["failure_rate"]
+        self.slow_call_seconds = config["slow_call_seconds"]
+        self.slow_rate = config["slow_rate"]
+        self.open_seconds = config["open_seconds"]
+        self.max_open_seconds = config["max_open_seconds"]
+
+        self.state = CLOSED
+        self.calls = deque()  # (timestamp, failed, slow)
+        self.opened_at = 0.0
+        self.current_open_seconds = self.open_seconds
+        self.probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def _prune(self, now):
+        while self.calls and now - self.calls[0][0] > self.window_seconds:
+            self.calls.popleft()
+
+    def check_open(self):
+        """Raise CircuitOpenError if the circuit is open, without starting a probe"""
+        with self.lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.current_open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be sent; returns True for half-open probes"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.opened_at + self.current_open_seconds - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == HALF_OPEN:
+                if self.probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, min(self.current_open_seconds * 2, self.max_open_seconds),
+                                           probing=True)
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Let another call probe the circuit when a probe ended without a result (e.g. it was interrupted)"""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record(self, failed, latency, probe=False):
+        slow = self.slow_call_seconds is not None and latency >= self.slow_call_seconds
+        with self.lock:
+            now = time.monotonic()
+            if probe:
+                self.probe_in_flight = False
+                if failed or slow:
+                    self._open(now, backoff=True)
+                else:
+                    log.info("✅ Circuit for %s closed again", self.name)
+                    self.state = CLOSED
+                    self.calls.clear()
+                    self.current_open_seconds = self.open_seconds
+                return
+            if self.state != CLOSED:
+                # Result of a call sent before the circuit opened
+                return
+            self.calls.append((now, failed, slow))
+            self._prune(now)
+            total = len(self.calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for c in self.calls if c[1])
+            slow_calls = sum(1 for c in self.calls if c[2])
+            if failures / total >= self.failure_rate or slow_calls / total >= self.slow_rate:
+                self._open(now, backoff=False)
+
+    def _open(self, now, backoff):
+        if backoff:
+            self.current_open_seconds = min(self.current_open_seconds * 2, self.max_open_seconds)
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+        self.calls.clear()
+        log.warning("⛔ Circuit for %s opened for %.0fs", self.name, self.current_open_seconds)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            self._prune(now)
+            total = len(self.calls)
+            return {
+                "state": self.state,
+                "calls_in_window": total,
+                "failure_rate": round(sum(1 for c in self.calls if c[1]) / total, 3) if total else 0.0,
+                "slow_rate": round(sum(1 for c in self.calls if c[2]) / total, 3) if total else 0.0,
+                "open_for_seconds": round(max(0.0, self.opened_at + self.current_open_seconds - now), 1)
+                if self.state == OPEN else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+_settings = _load_settings()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host, endpoint):
+    key = (host, endpoint or "*")
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                settings = dict(_settings.get("*", {}))
+                settings.update(_settings.get(endpoint, {}))
+                breaker = CircuitBreaker(f"{host}/{endpoint or '*'}", **settings)
+                _breakers[key] = breaker
+    return breaker
+
+
+def snapshot():
+    return {breaker.name: breaker.snapshot() for breaker in list(_breakers.values())}
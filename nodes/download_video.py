@@ -1,16 +1,86 @@
 import os
+import asyncio
 import requests
 import time
-import json
 import folder_paths
 from urllib.parse import urlparse
+from . import tracing
+from . import poll_scheduler
+from . import task_journal
+from .minimax_client import AsyncMiniMaxClient, run_sync
+from .errors import check_base_resp
+from .logger import get_logger, lazy_json
+
+log = get_logger("download")
+
+VIDEO_EXTENSIONS = ['mp4', 'avi', 'mov', 'mkv', 'webm']
+
+
+def output_video_path(filename_prefix, download_url):
+    """Output path <prefix>_<timestamp>.<ext>, with the extension taken from the download URL"""
+    output_dir = folder_paths.get_output_directory()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Clean filename prefix (remove any invalid characters)
+    clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_'))
+    if not clean_prefix:
+        clean_prefix = "minimax_video"
+    
+    # Try to get file extension from URL or default to mp4
+    url_path = urlparse(download_url).path
+    file_extension = url_path.split('.')[-1].lower() if url_path and '.' in url_path else 'mp4'
+    if file_extension not in VIDEO_EXTENSIONS:
+        file_extension = 'mp4'
+    
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(output_dir, f"{clean_prefix}_{timestamp}.{file_extension}")
+
+
+async def fetch_video(api_key, base_url, file_id, filename_prefix, task_id=None):
+    """
+    Look up the download URL of file_id and stream the video into the output
+    folder, on the shared event loop. Returns the absolute path.
+    """
+    client = AsyncMiniMaxClient(api_key, base_url=base_url)
+    with tracing.span("video_fetch", file_id=file_id):
+        log.debug("Retrieving download URL for file_id: %s", file_id)
+        try:
+            retrieve_data = await client.retrieve_file(file_id)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else "unknown"
+            raise RuntimeError(f"Failed to retrieve file info. Status code: {status}")
+        log.debug("Retrieve response data: %s", lazy_json(retrieve_data))
+        check_base_resp(retrieve_data, overrides={2013: "Invalid parameters, please check your file_id"})
+        download_url = (retrieve_data.get("file") or {}).get("download_url", "")
+        parsed_url = urlparse(download_url)
+        if not parsed_url.scheme or not parsed_url.netloc:
+            raise RuntimeError("No valid download URL found in API response")
+        path = output_video_path(filename_prefix, download_url)
+        log.debug("Downloading %s to: %s", download_url, path)
+
+        progress_state = {"next_report": 1024 * 1024}
+
+        def report_progress(downloaded_size, total_size):
+            # Print progress every 1MB
+            if downloaded_size >= progress_state["next_report"]:
+                progress_state["next_report"] += 1024 * 1024
+                if total_size:
+                    log.debug("Download progress: %.1f%%", downloaded_size / total_size * 100)
+
+        await client.download(download_url, path, timeout=(10, 120), progress=report_progress)
+    path = os.path.abspath(path)
+    log.info("Video downloaded to: %s (%.1f MB)", path, os.path.getsize(path) / (1024*1024))
+    await asyncio.wrap_future(task_journal.write_later(
+        lambda: task_journal.get_journal().record_download(file_id, path, task_id=task_id or None)))
+    return path
+
 
 class DownloadVideo:
     """
     Download Video using file_id from MiniMax API
     """
     def __init__(self):
-        self.retrieve_api = "https://api.minimaxi.chat/v1/files/retrieve"
+        self.base_url = "https://api.minimaxi.chat/v1"
         
     @classmethod
     def INPUT_TYPES(cls):
@@ -19,6 +89,15 @@ class DownloadVideo:
                 "api_key": ("STRING", {"multiline": False}),
                 "file_id": ("STRING", {"multiline": False, "placeholder": "File ID from video status check"}),
                 "filename_prefix": ("STRING", {"default": "minimax_video", "multiline": False}),
+            },
+            "optional": {
+                "task_id": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "Task ID or task_handle (used when file_id is empty)",
+                    "tooltip": "Wait for this video generation task in the background poll scheduler and download its file"
+                }),
+                "max_wait_time": ("INT", {"default": 1800, "min": 300, "max": 7200, "step": 300, "tooltip": "Maximum wait time for task_id in seconds"}),
             }
         }
 
@@ -27,133 +106,33 @@ class DownloadVideo:
     FUNCTION = "download_video"
     CATEGORY = "JM-MiniMax-API/Video"
 
-    def download_video(self, api_key, file_id, filename_prefix):
-        if not api_key or not file_id:
-            raise ValueError("API Key and File ID must be provided")
+    @tracing.traced("DownloadVideo")
+    def download_video(self, api_key, file_id, filename_prefix, task_id="", max_wait_time=1800):
+        file_id = (file_id or "").strip()
+        task_id = poll_scheduler.single_task_id(task_id)
+        if not api_key or not (file_id or task_id):
+            raise ValueError("API Key and File ID (or Task ID) must be provided")
         
-        file_id = file_id.strip()
+        if not file_id:
+            # Join (or start) the background polling of the task and wait for its file
+            log.info("Waiting for video task %s before downloading", task_id)
+            task = poll_scheduler.get_scheduler().watch(api_key, self.base_url, task_id, max_wait=max_wait_time)
+            try:
+                file_id = str(poll_scheduler.wait(task).get("file_id") or "")
+            except poll_scheduler.UNWRAPPED_ERRORS:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Video task {task_id} did not complete: {e}")
+            if not file_id:
+                raise RuntimeError(f"Video task {task_id} finished without a file_id")
         
         try:
-            print(f"Step 1: Retrieving download URL for file_id: {file_id}")
-            
-            # Step 1: Get download URL using file_id
-            retrieve_url = f"{self.retrieve_api}?file_id={file_id}"
-            headers = {
-                'authorization': f'Bearer {api_key}',
-            }
-            
-            print(f"Retrieve URL: {retrieve_url}")
-            
-            response = requests.get(retrieve_url, headers=headers, timeout=30)
-            
-            print(f"Retrieve response status code: {response.status_code}")
-            
-            if response.status_code != 200:
-                raise RuntimeError(f"Failed to retrieve file info. Status code: {response.status_code}")
-            
-            try:
-                retrieve_data = response.json()
-                print(f"Retrieve response data: {json.dumps(retrieve_data, indent=2)}")
-            except json.JSONDecodeError:
-                print(f"Raw retrieve response content: {response.content}")
-                raise RuntimeError("Failed to decode JSON response from file retrieve API")
-            
-            # Check for API errors
-            base_resp = retrieve_data.get("base_resp", {})
-            status_code = base_resp.get("status_code")
-            status_msg = base_resp.get("status_msg", "Unknown error")
-            
-            if status_code is not None and status_code != 0:
-                error_messages = {
-                    1002: "Rate limit exceeded, please try again later",
-                    1004: "Authentication failed, please check your API key",
-                    1008: "Insufficient account balance",
-                    2013: "Invalid parameters, please check your file_id",
-                    2049: "Invalid API key, please check your API key"
-                }
-                error_msg = error_messages.get(status_code, f"API Error {status_code}: {status_msg}")
-                raise RuntimeError(error_msg)
-            
-            # Extract download URL
-            file_info = retrieve_data.get("file", {})
-            download_url = file_info.get("download_url", "")
-            
-            if not download_url:
-                raise RuntimeError("No download URL found in API response")
-            
-            print(f"Download URL retrieved: {download_url}")
-            
-            # Step 2: Download the video file
-            print(f"Step 2: Downloading video from URL")
-            
-            # Validate download URL
-            parsed_url = urlparse(download_url)
-            if not parsed_url.scheme or not parsed_url.netloc:
-                raise ValueError("Invalid download URL received from API")
-            
-            # Create output directory
-            output_dir = folder_paths.get_output_directory()
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Generate timestamp for filename
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            
-            # Clean filename prefix (remove any invalid characters)
-            clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_'))
-            if not clean_prefix:
-                clean_prefix = "minimax_video"
-            
-            # Try to get file extension from URL or default to mp4
-            url_path = parsed_url.path
-            if url_path and '.' in url_path:
-                file_extension = url_path.split('.')[-1].lower()
-                # Validate extension
-                if file_extension not in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
-                    file_extension = 'mp4'
-            else:
-                file_extension = 'mp4'
-            
-            # Generate filename
-            video_filename = f"{clean_prefix}_{timestamp}.{file_extension}"
-            video_filepath = os.path.join(output_dir, video_filename)
-            
-            # Download video with progress tracking
-            print(f"Downloading to: {video_filepath}")
-            
-            with requests.get(download_url, stream=True, timeout=120) as download_response:
-                download_response.raise_for_status()
-                
-                # Get content length for progress tracking
-                content_length = download_response.headers.get('content-length')
-                if content_length:
-                    total_size = int(content_length)
-                    print(f"Video file size: {total_size / (1024*1024):.1f} MB")
-                else:
-                    total_size = None
-                    print("Video file size: Unknown")
-                
-                downloaded_size = 0
-                with open(video_filepath, 'wb') as f:
-                    for chunk in download_response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded_size += len(chunk)
-                            
-                            # Print progress every 1MB
-                            if total_size and downloaded_size % (1024*1024) == 0:
-                                progress = (downloaded_size / total_size) * 100
-                                print(f"Download progress: {progress:.1f}%")
-            
-            final_size = os.path.getsize(video_filepath)
-            print(f"Video downloaded successfully!")
-            print(f"File path: {video_filepath}")
-            print(f"Final file size: {final_size / (1024*1024):.1f} MB")
-            
-            return (os.path.abspath(video_filepath),)
-
+            return (run_sync(fetch_video(api_key, self.base_url, file_id, filename_prefix, task_id=task_id or None)),)
+        except poll_scheduler.UNWRAPPED_ERRORS:
+            raise
         except requests.exceptions.RequestException as e:
-            print(f"Request error: {str(e)}")
+            log.error("Request error: %s", e)
             raise RuntimeError(f"Failed to download video: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            log.error("Unexpected error: %s", e)
             raise RuntimeError(f"Video download failed: {str(e)}") 
\ No newline at end of file
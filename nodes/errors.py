@@ -0,0 +1,49 @@
+# MiniMax base_resp status codes shared by every node
+ERROR_MESSAGES = {
+    1000: "Unknown server error, please try again later",
+    1001: "Request timed out on the server, please try again later",
+    1002: "Rate limit exceeded, please try again later",
+    1004: "Authentication failed, please check your API key",
+    1008: "Insufficient account balance",
+    1013: "Internal service error, please try again later",
+    1026: "Input contains sensitive content, please adjust",
+    1027: "Output contains sensitive content, please adjust",
+    1039: "Token rate limit exceeded, please try again later",
+    2013: "Invalid parameters, please check your input",
+    2049: "Invalid API key, please check your API key"
+}
+
+# Codes where the request was rejected before any work was done, so sending it
+# again is safe even for billed calls
+REJECTED_CODES = {1002, 1039}
+
+# Codes for transient server-side failures; the request may have been
+# processed, so only idempotent calls are sent again
+TRANSIENT_CODES = {1000, 1001, 1013}
+
+
+class MiniMaxAPIError(RuntimeError):
+    """Non-zero base_resp status returned by the MiniMax API"""
+    def __init__(self, status_code, status_msg, message=None):
+        self.status_code = status_code
+        self.status_msg = status_msg
+        super().__init__(message or error_message(status_code, status_msg))
+
+
+def base_resp_code(data):
+    """Return (status_code, status_msg) from a response body"""
+    base_resp = (data or {}).get("base_resp") or {}
+    return base_resp.get("status_code"), base_resp.get("status_msg", "Unknown error")
+
+
+def error_message(status_code, status_msg, overrides=None):
+    if overrides and status_code in overrides:
+        return overrides[status_code]
+    return ERROR_MESSAGES.get(status_code, f"API Error {status_code}: {status_msg}")
+
+
+def check_base_resp(data, overrides=None):
+    """Raise MiniMaxAPIError if the response carries a non-zero status code"""
+    status_code, status_msg = base_resp_code(data)
+    if status_code is not None and status_code != 0:
+        raise MiniMaxAPIError(status_code, status_msg, error_message(status_code, status_msg, overrides))
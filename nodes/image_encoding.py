@@ -0,0 +1,137 @@
+import io
+import base64
+import contextvars
+import concurrent.futures
+import numpy as np
+from PIL import Image
+from . import tracing
+from .logger import get_logger
+
+log = get_logger("image_encoding")
+
+# The API rejects image files above this size
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Short side of the rendered video per resolution; 01 series models render 720P.
+# Larger frames carry nothing the video can show, so they are downscaled first.
+TARGET_SHORT_SIDE = {"512P": 512, "768P": 768, "1080P": 1080}
+DEFAULT_SHORT_SIDE = 720
+
+# JPEG qualities tried in turn until the file fits MAX_IMAGE_BYTES; past the
+# last one the frame is shrunk by SHRINK_FACTOR (down to MIN_SHORT_SIDE)
+JPEG_QUALITIES = (95, 90, 85, 75, 65)
+SHRINK_FACTOR = 0.75
+
+MIN_SHORT_SIDE = 300
+
+# Rows converted at a time by to_uint8
+ROW_BLOCK = 256
+
+
+def to_uint8(image_tensor):
+    """
+    HWC uint8 array of an image tensor (the first image of a batch), with
+    values in 0-1 scaled, clamped and cast in one pass over blocks of rows,
+    so the float temporaries stay small. Torch tensors are converted on their
+    own device and only the uint8 result is copied to the CPU.
+    """
+    tensor = image_tensor[0] if len(image_tensor.shape) == 4 else image_tensor
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    is_torch = torch is not None and isinstance(tensor, torch.Tensor)
+    if not is_torch:
+        tensor = np.asarray(tensor)
+    out = np.empty(tuple(tensor.shape), dtype=np.uint8)
+    for start in range(0, out.shape[0], ROW_BLOCK):
+        block = tensor[start:start + ROW_BLOCK]
+        if is_torch:
+            out[start:start + ROW_BLOCK] = block.detach().mul(255).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+        else:
+            block = np.multiply(block, 255, dtype=np.float32)
+            np.clip(block, 0, 255, out=block)
+            out[start:start + ROW_BLOCK] = block
+    return out
+
+
+def _jpeg(pil_image, quality):
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format='JPEG', quality=quality)
+    return buffer
+
+
+def _resize(pil_image, short_side):
+    width, height = pil_image.size
+    scale = short_side / min(width, height)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # reducing_gap lets Pillow box-reduce by whole factors before resampling, which is much faster for 4K frames
+    return pil_image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+
+def encode_image(image_tensor, image_name, resolution=None):
+    """
+    Encode an image tensor as a JPEG data URL for the video API. The aspect
+    ratio and size limits are checked on the source frame; frames larger
+    than the target resolution are downscaled, and the JPEG quality is
+    lowered step by step if the file would exceed MAX_IMAGE_BYTES.
+    """
+    image_np = to_uint8(image_tensor)
+    if image_np.ndim == 3 and image_np.shape[2] == 1:
+        image_np = image_np[:, :, 0]
+    pil_image = Image.fromarray(image_np)
+
+    # Validate image dimensions
+    width, height = pil_image.size
+    aspect_ratio = width / height
+    if aspect_ratio <= 2/5 or aspect_ratio >= 5/2:
+        raise ValueError(f"{image_name} aspect ratio ({aspect_ratio:.2f}) must be between 2:5 and 5:2")
+    min_dimension = min(width, height)
+    if min_dimension < MIN_SHORT_SIDE:
+        raise ValueError(f"{image_name} short side ({min_dimension}px) must be at least {MIN_SHORT_SIDE}px")
+
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+
+    target = TARGET_SHORT_SIDE.get(resolution, DEFAULT_SHORT_SIDE)
+    if min_dimension > target:
+        pil_image = _resize(pil_image, target)
+        log.debug("%s downscaled from %sx%s to %sx%s", image_name, width, height, *pil_image.size)
+
+    qualities = list(JPEG_QUALITIES)
+    while True:
+        quality = qualities.pop(0) if qualities else JPEG_QUALITIES[-1]
+        buffer = _jpeg(pil_image, quality)
+        file_size = buffer.getbuffer().nbytes
+        if file_size <= MAX_IMAGE_BYTES:
+            break
+        log.debug("%s is %.1fMB at %sx%s, JPEG quality %d - reducing", image_name, file_size/1024/1024,
+                  *pil_image.size, quality)
+        short_side = min(pil_image.size)
+        if not qualities:
+            if short_side <= MIN_SHORT_SIDE:
+                raise ValueError(f"{image_name} file size ({file_size/1024/1024:.1f}MB) exceeds "
+                                 f"{MAX_IMAGE_BYTES // (1024 * 1024)}MB limit")
+            pil_image = _resize(pil_image, max(MIN_SHORT_SIDE, int(short_side * SHRINK_FACTOR)))
+
+    image_base64 = base64.b64encode(buffer.getbuffer()).decode('ascii')
+    log.debug("%s encoded: %sx%s, quality %d, %s base64 characters", image_name, *pil_image.size, quality, len(image_base64))
+    return f"data:image/jpeg;base64,{image_base64}"
+
+
+def encode_images(images, resolution=None):
+    """
+    Encode several (image_tensor, image_name, span_label) frames at once,
+    in threads (the conversion and JPEG encoding release the GIL). Returns
+    the data URLs in order.
+    """
+    if len(images) <= 1:
+        return [_encode_traced(*image, resolution) for image in images]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(images), thread_name_prefix="jm-minimax-encode") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _encode_traced, *image, resolution) for image in images]
+        return [future.result() for future in futures]
+
+
+def _encode_traced(image_tensor, image_name, label, resolution):
+    with tracing.span("image_encode", image=label):
+        return encode_image(image_tensor, image_name, resolution)
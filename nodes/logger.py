@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import logging
+
+LOGGER_NAME = "JM-MiniMax-API"
+
+# Strings longer than this are cut down in logged payloads (hex audio, base64 images ...)
+MAX_FIELD_LENGTH = 200
+
+# Keys whose values are never logged
+SECRET_KEYS = {"authorization", "api_key", "apikey", "token", "access_token", "group_id", "groupid"}
+
+_configured = False
+
+
+def _configure():
+    global _configured
+    if _configured:
+        return
+    root = logging.getLogger(LOGGER_NAME)
+    level = os.environ.get("JM_MINIMAX_LOG_LEVEL", "INFO").upper()
+    root.setLevel(getattr(logging, level, logging.INFO))
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[MiniMax] %(message)s"))
+    root.addHandler(handler)
+    # ComfyUI installs its own root handler; don't print every line twice
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name):
+    """
+    Return a logger under the shared JM-MiniMax-API logger.
+    The level comes from JM_MINIMAX_LOG_LEVEL (default INFO); at INFO each API
+    call is logged as a single line, DEBUG adds redacted payloads and responses.
+    """
+    _configure()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def env_number(name, default, cast=float):
+    """
+    Numeric setting from the environment variable name. A missing or
+    malformed value falls back to default (logged), so a typo in one setting
+    never stops the nodes from loading.
+    """
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        get_logger("settings").warning("⚠️ Ignoring %s=%r (not a number), using %s", name, value, default)
+        return default
+
+
+def _truncate(value, max_length):
+    if len(value) <= max_length:
+        return value
+    return f"{value[:32]}...<{len(value)} chars>"
+
+
+def redact(obj, max_length=MAX_FIELD_LENGTH):
+    """Copy of obj with secret values masked and long strings truncated"""
+    if isinstance(obj, dict):
+        return {
+            key: "***" if str(key).lower() in SECRET_KEYS else redact(value, max_length)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [redact(value, max_length) for value in obj]
+    if isinstance(obj, str):
+        return _truncate(obj, max_length)
+    if isinstance(obj, (bytes, bytearray)):
+        return f"<{len(obj)} bytes>"
+    return obj
+
+
+class Lazy:
+    """Defer building a log string until the record is actually emitted"""
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+
+def _dump(obj, max_length):
+    return json.dumps(redact(obj, max_length), ensure_ascii=False, default=str)
+
+
+def lazy_json(obj, max_length=MAX_FIELD_LENGTH):
+    """Redacted, truncated JSON of obj, rendered only if the log level is enabled"""
+    return Lazy(_dump, obj, max_length)
+
+
+def format_bytes(size):
+    if size is None:
+        return "?"
+    if size < 1024:
+        return f"{size}B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size / (1024 * 1024):.1f}MB"
@@ -0,0 +1,170 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from fast status queries up to long music renders
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels"""
+    type_name = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+    def snapshot(self):
+        with self.lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value}
+                    for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus semantics)"""
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # key -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for key, state in sorted(self.values.items()):
+                for i, bound in enumerate(self.buckets):
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {state[i]}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+    def snapshot(self):
+        with self.lock:
+            return [{
+                "labels": dict(zip(self.labelnames, key)),
+                "count": state[-1],
+                "sum": round(state[-2], 6),
+                "avg": round(state[-2] / state[-1], 6) if state[-1] else 0.0,
+                "buckets": {str(bound): state[i] for i, bound in enumerate(self.buckets)},
+            } for key, state in sorted(self.values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {metric.name: {"type": metric.type_name, "help": metric.help, "series": metric.snapshot()}
+                for metric in self.metrics}
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "jm_minimax_request_seconds", "Request latency until the response body was read (headers only for streams)",
+    ("endpoint", "method", "status"))
+TTFB_SECONDS = REGISTRY.histogram(
+    "jm_minimax_time_to_first_byte_seconds", "Time from sending the request until response headers arrived",
+    ("endpoint",))
+QUEUE_SECONDS = REGISTRY.histogram(
+    "jm_minimax_queue_seconds", "Time spent waiting in the rate limiter before sending",
+    ("endpoint",))
+BYTES_UPLOADED = REGISTRY.counter(
+    "jm_minimax_bytes_uploaded_total", "Request body bytes sent", ("endpoint",))
+BYTES_DOWNLOADED = REGISTRY.counter(
+    "jm_minimax_bytes_downloaded_total", "Response body bytes received", ("endpoint",))
+RETRIES = REGISTRY.counter(
+    "jm_minimax_retries_total", "Requests sent again by the retry engine", ("endpoint", "reason"))
+API_ERRORS = REGISTRY.counter(
+    "jm_minimax_api_errors_total", "Non-zero base_resp status codes returned by the API", ("endpoint", "code"))
+REQUEST_FAILURES = REGISTRY.counter(
+    "jm_minimax_request_failures_total", "Requests that failed without a response (timeouts, connection errors)",
+    ("endpoint", "error"))
+DECODE_SECONDS = REGISTRY.histogram(
+    "jm_minimax_decode_seconds", "Time spent decoding hex/base64 audio payloads", ("node", "encoding"))
+FILE_WRITE_SECONDS = REGISTRY.histogram(
+    "jm_minimax_file_write_seconds", "Time spent writing output files", ("node",))
+TTS_CACHE = REGISTRY.counter(
+    "jm_minimax_tts_cache_total", "TextToSpeech cache lookups", ("result",))
+VIDEO_CALLBACKS = REGISTRY.counter(
+    "jm_minimax_video_callbacks_total", "Requests received on the video callback route", ("kind",))
+
+
+@contextmanager
+def timer(histogram, **labels):
+    """Observe the duration of the block in histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
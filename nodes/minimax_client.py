@@ -0,0 +1,484 @@
+import json
+import time
+import asyncio
+import threading
+import functools
+import contextlib
+import contextvars
+import requests
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from . import transport
+from . import retry
+from . import rate_limiter
+from . import metrics
+from . import tracing
+from . import audio_decoder
+from . import task_journal
+from .errors import base_resp_code, REJECTED_CODES
+from .logger import get_logger
+
+log = get_logger("client")
+
+DEFAULT_BASE_URL = "https://api.minimaxi.chat/v1"
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+# Blocking HTTP work is handed to this executor so the event loop itself never
+# blocks. It is sized to the transport pool so every worker can hold a
+# keep-alive connection.
+_executor = ThreadPoolExecutor(max_workers=transport.POOL_MAXSIZE, thread_name_prefix="jm-minimax-io")
+
+# Successful video submissions by (API key fingerprint, payload hash, dedupe
+# key): a later call with the same key, payload and account returns the
+# recorded task instead of paying again.
+# Entries are (recorded_at, data), oldest first; the oldest are dropped past
+# DEDUPE_MAX_ENTRIES and any older than DEDUPE_TTL seconds are ignored.
+_dedupe_results = {}
+_dedupe_lock = threading.Lock()
+DEDUPE_MAX_ENTRIES = 1000
+DEDUPE_TTL = 24 * 3600
+
+
+def get_event_loop():
+    """
+    Return the background event loop shared by all MiniMax nodes.
+    The loop runs in a daemon thread so that ComfyUI's execution thread can
+    submit coroutines to it and many requests can be in flight at once.
+    """
+    global _loop, _loop_thread
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="jm-minimax-loop", daemon=True)
+                thread.start()
+                _loop_thread = thread
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block until it returns"""
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the MiniMax event loop thread")
+    # Carry the caller's trace span over to the loop thread
+    coro = tracing.bind(tracing.current_span(), coro)
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def submit(coro):
+    """Schedule a coroutine on the shared loop and return a concurrent.futures.Future"""
+    coro = tracing.bind(tracing.current_span(), coro)
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def _parse_json(response):
+    try:
+        with tracing.span("json_parse", size=len(response.content)):
+            return response.json()
+    except json.JSONDecodeError:
+        log.debug("Raw response content: %r", response.content[:1024])
+        raise RuntimeError("Failed to decode JSON response")
+
+
+def _release(response):
+    """
+    Read the (small) body of a failed response, so it stays available to the
+    caller's error handling, and close it; a stream=True response would
+    otherwise hold on to its pooled connection.
+    """
+    try:
+        response.content
+    except (requests.exceptions.RequestException, RuntimeError):
+        # Dropped mid-body, or already consumed by parse
+        pass
+    finally:
+        response.close()
+
+
+def _iter_lines(response, chunk_size=64 * 1024):
+    """
+    Split a streamed body into lines. Unlike Response.iter_lines this does not
+    re-scan the pending data for every chunk, which matters for the
+    multi-megabyte lines a TTS stream ends with.
+    """
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        scanned = len(buffer)
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", max(start, scanned))
+            if end < 0:
+                break
+            yield bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+        if start:
+            del buffer[:start]
+    if buffer:
+        yield bytes(buffer)
+
+
+class AsyncMiniMaxClient:
+    """
+    Asyncio client for the MiniMax REST API.
+    All calls go through the shared pooled transport; blocking socket work runs
+    in a worker thread so the calling event loop stays free. Transient failures
+    are retried according to retry_policy; non-idempotent (billed) calls are
+    only sent again when the server provably did not process them.
+    """
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, group_id=None, retry_policy=None):
+        if not api_key:
+            raise ValueError("API Key must be provided")
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.group_id = group_id
+        self.retry_policy = retry_policy or retry.DEFAULT_POLICY
+
+    def _url(self, path):
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _headers(self, content_type="application/json"):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        return headers
+
+    def _params(self, params):
+        params = dict(params or {})
+        if self.group_id and "GroupId" not in params:
+            params["GroupId"] = self.group_id
+        return params
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def request(self, method, path, **kwargs):
+        """Send a single raw request and return the requests.Response"""
+        return await self._run(transport.request, method, self._url(path), **kwargs)
+
+    async def _send_with_retry(self, send, url, idempotent, parse=None):
+        """
+        Call send() (a blocking function returning a Response) until it yields a
+        JSON body that is not a retryable error, or the retry policy gives up.
+        parse(response), if given, reads the body in a worker thread instead of
+        the default JSON decoding (for streamed responses).
+        """
+        policy = self.retry_policy
+        endpoint = transport.endpoint_for(url) or url
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            try:
+                response = await self._run(send)
+                response.raise_for_status()
+                data = await self._run(parse, response) if parse else _parse_json(response)
+            except requests.exceptions.RequestException as e:
+                if response is not None:
+                    await self._run(_release, response)
+                decision = retry.classify_exception(e)
+                if not policy.should_retry(decision, attempt, idempotent):
+                    raise
+                reason = str(e)
+                retry_after = retry.retry_after(getattr(e, "response", None))
+            else:
+                status_code, status_msg = base_resp_code(data)
+                if status_code not in (None, 0):
+                    metrics.API_ERRORS.inc(endpoint=endpoint, code=status_code)
+                decision = retry.classify_code(status_code)
+                if not policy.should_retry(decision, attempt, idempotent):
+                    return data
+                reason = f"API Error {status_code}: {status_msg}"
+                retry_after = retry.retry_after(response)
+                if status_code in REJECTED_CODES:
+                    # Hold back every queued request for this key/endpoint, not just this one
+                    governor_endpoint = transport.endpoint_for(url)
+                    if governor_endpoint:
+                        delay_hint = retry_after or policy.backoff(attempt)
+                        rate_limiter.get_governor(self.api_key, governor_endpoint).throttle(delay_hint)
+            delay = policy.backoff(attempt, retry_after)
+            metrics.RETRIES.inc(endpoint=endpoint, reason=decision)
+            log.warning("🔁 %s: %s - retrying in %.1fs (attempt %d/%d)", endpoint, reason, delay, attempt + 1, policy.max_attempts)
+            await asyncio.sleep(delay)
+
+    async def request_json(self, method, path, params=None, timeout=None, idempotent=None, **kwargs):
+        """
+        Send a request and return the decoded JSON body, retrying transient
+        failures. Raises on HTTP errors once retries are exhausted; a non-zero
+        base_resp is returned to the caller after the last attempt.
+        idempotent defaults to True for GET and False otherwise.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        url = self._url(path)
+        headers = kwargs.pop("headers", None) or self._headers()
+        send = functools.partial(transport.request, method, url, params=self._params(params),
+                                 headers=headers, timeout=timeout, **kwargs)
+        return await self._send_with_retry(send, url, idempotent)
+
+    async def post_json(self, path, payload, params=None, timeout=None, rate_tokens=1, idempotent=False):
+        return await self.request_json("POST", path, params=params, timeout=timeout, json=payload,
+                                       rate_tokens=rate_tokens, idempotent=idempotent)
+
+    async def post_json_audio(self, path, payload, dest_path=None, field="audio", params=None, timeout=None,
+                              rate_tokens=1, idempotent=False, node=None, keep_audio=True):
+        """
+        POST a request whose JSON reply carries hex audio in data[field] and
+        decode that field while the body streams in (also into dest_path if
+        given), without ever holding the hex text in memory. Retried like
+        post_json.
+        Returns (data, audio); data is the reply with the field's value
+        replaced by "" (a non-zero base_resp is returned, not raised) and
+        audio is the decoded bytearray. With dest_path and keep_audio=False
+        the bytes only go to the file and audio is None (still an empty
+        bytearray when the reply held no audio).
+        node labels the decode/write metrics (defaults to the endpoint).
+        """
+        url = self._url(path)
+        endpoint = transport.endpoint_for(url) or url
+        node = node or endpoint
+        result = {"audio": bytearray()}
+
+        def send():
+            return transport.post(url, params=self._params(params), headers=self._headers(), json=payload,
+                                  stream=True, timeout=timeout, rate_tokens=rate_tokens)
+
+        def parse(response):
+            decoder = audio_decoder.HexFieldDecoder(dest_path, field, keep=keep_audio)
+            try:
+                with response, tracing.span("hex_decode_stream", endpoint=endpoint) as span:
+                    for chunk in response.iter_content(chunk_size=256 * 1024):
+                        metrics.BYTES_DOWNLOADED.inc(len(chunk), endpoint=endpoint)
+                        decoder.feed(chunk)
+                    data = decoder.finish()
+                    span.set(bytes=decoder.size)
+            except BaseException:
+                decoder.abort()
+                raise
+            metrics.DECODE_SECONDS.observe(decoder.decode_seconds, node=node, encoding="hex_stream")
+            if dest_path:
+                metrics.FILE_WRITE_SECONDS.observe(decoder.write_seconds, node=node)
+            result["audio"] = decoder.audio if decoder.keep or not decoder.size else None
+            return data
+
+        data = await self._send_with_retry(send, url, idempotent, parse=parse)
+        return data, result["audio"]
+
+    async def get_json(self, path, params=None, timeout=None):
+        return await self.request_json("GET", path, params=params, timeout=timeout)
+
+    async def post_stream(self, path, payload, on_event, params=None, timeout=None, rate_tokens=1):
+        """
+        POST a request with stream=true and call on_event(dict) for every
+        server-sent event, from a worker thread, as it arrives. A plain JSON
+        body (the API's error reply) is delivered as a single event.
+        The request is only retried while no event has been delivered.
+        Returns the number of events.
+        """
+        policy = self.retry_policy
+        url = self._url(path)
+        endpoint = transport.endpoint_for(url) or url
+        delivered = [0]
+
+        def _stream():
+            with transport.post(url, params=self._params(params), headers=self._headers(), json=payload,
+                                stream=True, timeout=timeout, rate_tokens=rate_tokens) as response:
+                response.raise_for_status()
+                for line in _iter_lines(response):
+                    if not line:
+                        continue
+                    metrics.BYTES_DOWNLOADED.inc(len(line), endpoint=endpoint)
+                    if line.startswith(b"data:"):
+                        line = line[len(b"data:"):]
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        log.debug("Skipping undecodable stream line: %r", line[:200])
+                        continue
+                    delivered[0] += 1
+                    on_event(event)
+            return delivered[0]
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._run(_stream)
+            except requests.exceptions.RequestException as e:
+                decision = retry.classify_exception(e)
+                if delivered[0] or not policy.should_retry(decision, attempt, False):
+                    raise
+                delay = policy.backoff(attempt, retry.retry_after(getattr(e, "response", None)))
+                metrics.RETRIES.inc(endpoint=endpoint, reason=decision)
+                log.warning("🔁 %s stream: %s - retrying in %.1fs (attempt %d/%d)", endpoint, e, delay, attempt + 1, policy.max_attempts)
+                await asyncio.sleep(delay)
+
+    async def submit_video(self, payload, dedupe_key=None):
+        """
+        Create a video generation task (POST /video_generation).
+        Submissions are billed and the API takes no idempotency key, so
+        ambiguous failures (timeouts, 5xx) are never retried: the task may
+        have been created. With a dedupe_key, a successful result for the
+        same key, payload and API key is reused instead of submitting again.
+        """
+        key = None
+        if dedupe_key:
+            key = (rate_limiter.key_fingerprint(self.api_key), task_journal.payload_hash(payload), dedupe_key)
+            with _dedupe_lock:
+                entry = _dedupe_results.get(key)
+                if entry is not None and time.monotonic() - entry[0] > DEDUPE_TTL:
+                    del _dedupe_results[key]
+                    entry = None
+            cached = entry[1] if entry is not None else None
+            if cached is not None:
+                log.info("♻️ Reusing video task %s for dedupe key %s", cached.get("task_id"), dedupe_key)
+                return cached
+        data = await self.post_json("video_generation", payload, timeout=(10, 60), idempotent=False)
+        if key and data.get("task_id") and base_resp_code(data)[0] in (None, 0):
+            with _dedupe_lock:
+                _dedupe_results.pop(key, None)
+                _dedupe_results[key] = (time.monotonic(), data)
+                while len(_dedupe_results) > DEDUPE_MAX_ENTRIES:
+                    del _dedupe_results[next(iter(_dedupe_results))]
+        return data
+
+    async def query_video(self, task_id):
+        """Query a video generation task (GET /query/video_generation)"""
+        return await self.get_json("query/video_generation", params={"task_id": task_id}, timeout=30)
+
+    async def retrieve_file(self, file_id):
+        """Look up file metadata including download_url (GET /files/retrieve)"""
+        return await self.get_json("files/retrieve", params={"file_id": file_id}, timeout=30)
+
+    async def upload_file(self, file_path, purpose):
+        """Upload a local file (POST /files/upload)"""
+        url = self._url("files/upload")
+
+        def _upload():
+            # Reopen the file on every attempt so retries send the full body
+            with open(file_path, "rb") as fp:
+                return transport.post(
+                    url,
+                    params=self._params(None),
+                    headers=self._headers(content_type=None),
+                    data={"purpose": purpose},
+                    files={"file": fp},
+                )
+        return await self._send_with_retry(_upload, url, idempotent=False)
+
+    async def download(self, url, dest_path, chunk_size=1024 * 1024, timeout=None, progress=None):
+        """
+        Stream a URL to dest_path without buffering the body in memory.
+        dest_path may also be a seekable binary file object (e.g. BytesIO)
+        for bodies that are wanted in memory.
+        Connection drops mid-stream are resumed with a Range request from the
+        last byte written (or restarted if the server ignores Range).
+        Returns the number of bytes written.
+        """
+        policy = self.retry_policy
+
+        def _download(offset):
+            headers = {"Range": f"bytes={offset}-"} if offset else None
+            with transport.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    offset = 0
+                total = response.headers.get("content-length")
+                total = int(total) + offset if total else None
+                written = offset
+                if isinstance(dest_path, str):
+                    target = open(dest_path, "ab" if offset else "wb")
+                else:
+                    dest_path.seek(offset)
+                    dest_path.truncate()
+                    target = contextlib.nullcontext(dest_path)
+                with tracing.span("download", url_host=urlparse(url).netloc, offset=offset), target as f:
+                    try:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                written += len(chunk)
+                                metrics.BYTES_DOWNLOADED.inc(len(chunk), endpoint="download")
+                                if progress:
+                                    progress(written, total)
+                    except requests.exceptions.RequestException as e:
+                        e.bytes_written = written
+                        raise
+            return written
+
+        attempt = 0
+        offset = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._run(_download, offset)
+            except requests.exceptions.RequestException as e:
+                if not policy.should_retry(retry.classify_exception(e), attempt, True):
+                    raise
+                offset = getattr(e, "bytes_written", offset)
+                metrics.RETRIES.inc(endpoint="download", reason="resume")
+                delay = policy.backoff(attempt, retry.retry_after(getattr(e, "response", None)))
+                log.warning("🔁 Download interrupted at %d bytes (%s) - resuming in %.1fs", offset, e, delay)
+                await asyncio.sleep(delay)
+
+    async def download_many(self, downloads, timeout=None):
+        """
+        Run several downloads concurrently over the shared connection pool.
+        downloads is a list of (url, dest) pairs as taken by download().
+        Returns the bytes written for each, in order.
+        """
+        return await asyncio.gather(*(self.download(url, dest, timeout=timeout) for url, dest in downloads))
+
+
+class MiniMaxClient:
+    """
+    Synchronous facade over AsyncMiniMaxClient for use inside ComfyUI nodes.
+    Every method runs the matching coroutine on the shared background loop.
+    """
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, group_id=None, retry_policy=None):
+        self.aio = AsyncMiniMaxClient(api_key, base_url=base_url, group_id=group_id, retry_policy=retry_policy)
+
+    def post_json(self, path, payload, params=None, timeout=None, rate_tokens=1, idempotent=False):
+        return run_sync(self.aio.post_json(path, payload, params=params, timeout=timeout,
+                                           rate_tokens=rate_tokens, idempotent=idempotent))
+
+    def post_json_audio(self, path, payload, dest_path=None, field="audio", params=None, timeout=None,
+                        rate_tokens=1, idempotent=False, node=None, keep_audio=True):
+        return run_sync(self.aio.post_json_audio(path, payload, dest_path=dest_path, field=field, params=params,
+                                                 timeout=timeout, rate_tokens=rate_tokens, idempotent=idempotent,
+                                                 node=node, keep_audio=keep_audio))
+
+    def get_json(self, path, params=None, timeout=None):
+        return run_sync(self.aio.get_json(path, params=params, timeout=timeout))
+
+    def post_stream(self, path, payload, on_event, params=None, timeout=None, rate_tokens=1):
+        return run_sync(self.aio.post_stream(path, payload, on_event, params=params, timeout=timeout,
+                                             rate_tokens=rate_tokens))
+
+    def submit_video(self, payload, dedupe_key=None):
+        return run_sync(self.aio.submit_video(payload, dedupe_key=dedupe_key))
+
+    def query_video(self, task_id):
+        return run_sync(self.aio.query_video(task_id))
+
+    def retrieve_file(self, file_id):
+        return run_sync(self.aio.retrieve_file(file_id))
+
+    def upload_file(self, file_path, purpose):
+        return run_sync(self.aio.upload_file(file_path, purpose))
+
+    def download(self, url, dest_path, chunk_size=1024 * 1024, timeout=None, progress=None):
+        return run_sync(self.aio.download(url, dest_path, chunk_size=chunk_size, timeout=timeout, progress=progress))
+
+    def download_many(self, downloads, timeout=None):
+        return run_sync(self.aio.download_many(downloads, timeout=timeout))
@@ -0,0 +1,116 @@
+# Minimal MPEG audio frame parsing, enough to join MP3 files without re-encoding
+
+# Bitrates in kbps by [version is MPEG1][layer index], indexed by the 4-bit field
+_BITRATES = {
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),     # MPEG1 Layer III
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),    # MPEG1 Layer II
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),  # MPEG1 Layer I
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),        # MPEG2/2.5 Layer III
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),        # MPEG2/2.5 Layer II
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),   # MPEG2/2.5 Layer I
+}
+
+# Sample rates by version bits (3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def id3v2_size(data):
+    """Length of a leading ID3v2 tag (0 if there is none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_frame_header(data, offset):
+    """
+    Decode the 4-byte frame header at offset.
+    Returns dict(length, samples, sample_rate, mpeg1, layer, mono) or None.
+    """
+    if offset + 4 > len(data) or data[offset] != 0xff or (data[offset + 1] & 0xe0) != 0xe0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = 4 - ((data[offset + 1] >> 1) & 0x03)
+    bitrate_index = (data[offset + 2] >> 4) & 0x0f
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (data[offset + 2] >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and not mpeg1:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+    else:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    mono = (data[offset + 3] >> 6) == 3
+    return {"length": length, "samples": samples, "sample_rate": sample_rate,
+            "mpeg1": mpeg1, "layer": layer, "mono": mono}
+
+
+def _is_info_frame(data, offset, frame):
+    """True for the Xing/Info/VBRI header frame encoders put before the audio"""
+    if frame["layer"] != 3:
+        return False
+    if frame["mpeg1"]:
+        side_info = 17 if frame["mono"] else 32
+    else:
+        side_info = 9 if frame["mono"] else 17
+    tag = data[offset + 4 + side_info:offset + 8 + side_info]
+    return tag in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+
+
+def audio_frames(data):
+    """
+    Return (start, end, frame_count, duration_seconds) of the MPEG audio frames
+    in data, skipping ID3v2/ID3v1 tags and the Xing/Info/VBRI header frame.
+    """
+    tag_end = id3v2_size(data)
+    end = len(data)
+    if end - tag_end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    # Resync to the first valid frame header
+    start = tag_end
+    while True:
+        start = data.find(b"\xff", start, end)
+        if start < 0 or parse_frame_header(data, start) is not None:
+            break
+        start += 1
+    first = parse_frame_header(data, start) if start >= 0 else None
+    if first is None:
+        # Not MPEG audio we understand; pass everything after the tag through
+        return tag_end, end, 0, 0.0
+    if _is_info_frame(data, start, first):
+        start += first["length"]
+
+    count = 0
+    duration = 0.0
+    offset = start
+    while offset < end:
+        frame = parse_frame_header(data, offset)
+        if frame is None:
+            break
+        count += 1
+        duration += frame["samples"] / frame["sample_rate"]
+        offset += frame["length"]
+    return start, min(offset, end) if count else end, count, duration
+
+
+def concat(parts, out):
+    """
+    Write the audio frames of several MP3 byte strings to the binary file out,
+    dropping per-file tags and VBR header frames so the result plays as one
+    continuous stream. Returns the duration in seconds of every part.
+    """
+    durations = []
+    for data in parts:
+        start, end, count, duration = audio_frames(data)
+        out.write(memoryview(data)[start:end])
+        durations.append(duration)
+    return durations
@@ -1,9 +1,16 @@
+import io
 import os
-import json
 import time
 import binascii
 import requests
 import folder_paths
+from . import tracing
+from . import audio_tensor
+from .minimax_client import MiniMaxClient
+from .errors import check_base_resp
+from .logger import get_logger, lazy_json
+
+log = get_logger("music")
 
 class MusicGeneration:
     """
@@ -11,7 +18,7 @@ class MusicGeneration:
     Generates music based on prompt description and lyrics using MiniMax API
     """
     def __init__(self):
-        self.api_base = "https://api.minimax.io/v1/music_generation"
+        self.base_url = "https://api.minimax.io/v1"
         
     @classmethod
     def INPUT_TYPES(cls):
@@ -41,16 +48,22 @@ class MusicGeneration:
                 "bitrate": ([32000, 64000, 128000, 256000], {"default": 256000}),
                 "format": (["mp3", "wav", "pcm"], {"default": "mp3"}),
                 "aigc_watermark": ("BOOLEAN", {"default": False, "tooltip": "是否在音频末尾添加水印"}),
+                "save_to_disk": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Also write the audio to the output folder. Off keeps it in memory and only the AUDIO output carries it"
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING")
-    RETURN_NAMES = ("audio_path", "audio_url")
+    RETURN_TYPES = ("STRING", "STRING", "AUDIO")
+    RETURN_NAMES = ("audio_path", "audio_url", "audio")
     FUNCTION = "generate_music"
     CATEGORY = "JM-MiniMax-API/Music"
 
+    @tracing.traced("MusicGeneration")
     def generate_music(self, api_key, prompt, lyrics, model, filename_prefix, stream=False, output_format="hex", 
-                     sample_rate=44100, bitrate=256000, format="mp3", aigc_watermark=False):
+                     sample_rate=44100, bitrate=256000, format="mp3", aigc_watermark=False,
+                     save_to_disk=True):
         """
         Generate music using MiniMax API
         
@@ -66,85 +79,54 @@ class MusicGeneration:
             bitrate: Audio bitrate
             format: Audio format (mp3, wav, pcm)
             aigc_watermark: Whether to add watermark
+            save_to_disk: Whether to write the audio file (the AUDIO output is always returned)
         """
-        if not api_key:
-            raise ValueError("API Key must be provided")
+        with tracing.span("validation"):
+            if not api_key:
+                raise ValueError("API Key must be provided")
         
-        # Validate prompt length (10-300 characters)
-        if not prompt or len(prompt.strip()) < 10:
-            raise ValueError("Prompt must be at least 10 characters long")
-        if len(prompt) > 300:
-            raise ValueError("Prompt must not exceed 300 characters")
+            # Validate prompt length (10-300 characters)
+            if not prompt or len(prompt.strip()) < 10:
+                raise ValueError("Prompt must be at least 10 characters long")
+            if len(prompt) > 300:
+                raise ValueError("Prompt must not exceed 300 characters")
         
-        # Validate lyrics length (10-600 characters)
-        if not lyrics or len(lyrics.strip()) < 10:
-            raise ValueError("Lyrics must be at least 10 characters long")
-        if len(lyrics) > 600:
-            raise ValueError("Lyrics must not exceed 600 characters")
+            # Validate lyrics length (10-600 characters)
+            if not lyrics or len(lyrics.strip()) < 10:
+                raise ValueError("Lyrics must be at least 10 characters long")
+            if len(lyrics) > 600:
+                raise ValueError("Lyrics must not exceed 600 characters")
         
-        # Validate stream and output_format combination
-        if stream and output_format == "url":
-            raise ValueError("When stream is true, only hex format is supported")
+            # Validate stream and output_format combination
+            if stream and output_format == "url":
+                raise ValueError("When stream is true, only hex format is supported")
         
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+        client = MiniMaxClient(api_key, base_url=self.base_url)
 
-        # Build audio_setting
-        audio_setting = {
-            "sample_rate": sample_rate,
-            "bitrate": bitrate,
-            "format": format
-        }
+        with tracing.span("payload_build"):
+            # Build audio_setting
+            audio_setting = {
+                "sample_rate": sample_rate,
+                "bitrate": bitrate,
+                "format": format
+            }
 
-        payload = {
-            "model": model,
-            "prompt": prompt.strip(),
-            "lyrics": lyrics.strip(),
-            "stream": stream,
-            "output_format": output_format,
-            "audio_setting": audio_setting,
-            "aigc_watermark": aigc_watermark
-        }
+            payload = {
+                "model": model,
+                "prompt": prompt.strip(),
+                "lyrics": lyrics.strip(),
+                "stream": stream,
+                "output_format": output_format,
+                "audio_setting": audio_setting,
+                "aigc_watermark": aigc_watermark
+            }
 
         try:
-            print(f"🎵 Generating music with MiniMax API...")
-            print(f"📝 Prompt: {prompt[:50]}...")
-            print(f"🎶 Lyrics preview: {lyrics[:50]}...")
-            print(f"⚙️ Audio settings: {audio_setting}")
-            print(f"📤 Output format: {output_format}")
-            
-            print(f"🌐 API URL: {self.api_base}")
-            response = requests.post(self.api_base, headers=headers, json=payload)
-            print(f"Response status code: {response.status_code}")
-            
-            if response.status_code != 200:
-                print(f"Error response: {response.text}")
-                response.raise_for_status()
-            
-            resp_data = response.json()
-            print(f"Response data keys: {list(resp_data.keys())}")
-            
-            # Check for API error response
-            base_resp = resp_data.get("base_resp", {})
-            status_code = base_resp.get("status_code")
-            status_msg = base_resp.get("status_msg", "Unknown error")
-            
-            if status_code is not None and status_code != 0:
-                raise RuntimeError(f"API Error {status_code}: {status_msg}")
-            
-            data = resp_data.get("data", {})
-            if not data:
-                print(f"Full response: {json.dumps(resp_data, indent=2)}")
-                raise RuntimeError("No data returned from API")
-            
-            # Check music generation status
-            status = data.get("status")
-            if status == 1:
-                print("⚠️ Music is still being generated, but API returned partial data")
-            elif status == 2:
-                print("✅ Music generation completed")
+            log.debug("🎵 Generating music with MiniMax API...")
+            log.debug("📝 Prompt: %s...", prompt[:50])
+            log.debug("🎶 Lyrics preview: %s...", lyrics[:50])
+            log.debug("⚙️ Audio settings: %s", audio_setting)
+            log.debug("📤 Output format: %s", output_format)
             
             # Create output directory
             output_dir = folder_paths.get_output_directory()
@@ -163,6 +145,32 @@ class MusicGeneration:
             audio_filepath = os.path.join(output_dir, audio_filename)
             processed_audio_url = ""  # Initialize audio_url variable
             
+            log.debug("🌐 API URL: %s/music_generation", self.base_url)
+            # Music synthesis finishes server-side before the response is sent, so allow a long read
+            if output_format == "hex":
+                # The hex audio is decoded (into audio_filepath) while the response streams in
+                resp_data, audio_data = client.post_json_audio("music_generation", payload,
+                                                               audio_filepath if save_to_disk else None,
+                                                               timeout=(10, 600), node="music")
+            else:
+                resp_data = client.post_json("music_generation", payload, timeout=(10, 600))
+            log.debug("Response data keys: %s", list(resp_data.keys()))
+            
+            # Check for API error response
+            check_base_resp(resp_data)
+            
+            data = resp_data.get("data", {})
+            if not data:
+                log.debug("Full response: %s", lazy_json(resp_data))
+                raise RuntimeError("No data returned from API")
+            
+            # Check music generation status
+            status = data.get("status")
+            if status == 1:
+                log.warning("⚠️ Music is still being generated, but API returned partial data")
+            elif status == 2:
+                log.debug("✅ Music generation completed")
+            
             if output_format == "url":
                 # Handle URL format response
                 audio_url = data.get("audio", "")
@@ -170,58 +178,60 @@ class MusicGeneration:
                     raise RuntimeError("No audio URL returned")
                 
                 processed_audio_url = audio_url
-                print(f"Audio download URL: {processed_audio_url}")
-                
-                # Download audio from URL
-                print(f"Downloading audio from URL...")
-                audio_response = requests.get(processed_audio_url)
-                audio_response.raise_for_status()
+                log.debug("Audio download URL: %s", processed_audio_url)
                 
-                with open(audio_filepath, "wb") as f:
-                    f.write(audio_response.content)
-                print(f"Downloaded and saved audio file to: {audio_filepath}")
+                # Stream the audio to disk (or memory) over the shared connection pool
+                log.debug("Downloading audio from URL...")
+                audio_buffer = None if save_to_disk else io.BytesIO()
+                with tracing.span("audio_download"):
+                    client.download(processed_audio_url, audio_filepath if save_to_disk else audio_buffer)
+                audio_data = audio_buffer.getbuffer() if audio_buffer is not None else None
+                if save_to_disk:
+                    log.info("Downloaded and saved audio file to: %s", audio_filepath)
                 
             else:
-                # Handle hex format response
-                audio_hex = data.get("audio", "")
-                if not audio_hex:
+                # Handle hex format response (already decoded while it was received)
+                if not audio_data:
                     raise RuntimeError("No audio data returned")
-                
-                print(f"Received audio hex data length: {len(audio_hex)}")
-                try:
-                    audio_data = binascii.unhexlify(audio_hex)
-                    print(f"Decoded audio data length: {len(audio_data)}")
-                    
-                    with open(audio_filepath, "wb") as f:
-                        f.write(audio_data)
-                    print(f"Saved audio file to: {audio_filepath}")
-                except binascii.Error as e:
-                    raise RuntimeError(f"Failed to decode hex audio data: {str(e)}")
+                log.debug("Decoded audio data length: %s", len(audio_data))
+                if save_to_disk:
+                    log.info("Saved audio file to: %s", audio_filepath)
             
             # Log extra info if available
             extra_info = resp_data.get("extra_info", {})
             if extra_info:
-                print(f"📊 Music info:")
-                print(f"   Duration: {extra_info.get('music_duration', 'N/A')} ms")
-                print(f"   Sample rate: {extra_info.get('music_sample_rate', 'N/A')} Hz")
-                print(f"   Channels: {extra_info.get('music_channel', 'N/A')}")
-                print(f"   Bitrate: {extra_info.get('bitrate', 'N/A')} bps")
-                print(f"   File size: {extra_info.get('music_size', 'N/A')} bytes")
+                log.debug("📊 Music info:")
+                log.debug("   Duration: %s ms", extra_info.get('music_duration', 'N/A'))
+                log.debug("   Sample rate: %s Hz", extra_info.get('music_sample_rate', 'N/A'))
+                log.debug("   Channels: %s", extra_info.get('music_channel', 'N/A'))
+                log.debug("   Bitrate: %s bps", extra_info.get('bitrate', 'N/A'))
+                log.debug("   File size: %s bytes", extra_info.get('music_size', 'N/A'))
+            
+            # Build the AUDIO output straight from the decoded bytes
+            with tracing.span("audio_tensor"):
+                if audio_data is None:
+                    # url-mode audio went straight to disk
+                    audio_data = audio_tensor.read_file(audio_filepath)
+                audio = audio_tensor.audio_output(
+                    audio_data, format, required=not save_to_disk,
+                    sample_rate=extra_info.get("music_sample_rate") or sample_rate,
+                    channels=int(extra_info.get("music_channel") or 2))
             
             return (
-                os.path.abspath(audio_filepath),
-                processed_audio_url
+                os.path.abspath(audio_filepath) if save_to_disk else "",
+                processed_audio_url,
+                audio
             )
 
         except requests.exceptions.RequestException as e:
-            print(f"Request error: {str(e)}")
+            log.error("Request error: %s", e)
             if hasattr(e, 'response') and e.response is not None:
-                print(f"Error response status code: {e.response.status_code}")
-                print(f"Error response content: {e.response.text}")
+                log.debug("Error response status code: %s", e.response.status_code)
+                log.debug("Error response content: %s", e.response.text[:1024])
             raise RuntimeError(f"Error calling MiniMax API: {str(e)}")
         except (ValueError, binascii.Error) as e:
-            print(f"Data processing error: {str(e)}")
+            log.error("Data processing error: %s", e)
             raise RuntimeError(f"Error processing API response: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            log.error("Unexpected error: %s", e)
             raise RuntimeError(f"Unexpected error: {str(e)}")
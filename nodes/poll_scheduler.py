@@ -0,0 +1,360 @@
+import re
+import time
+import asyncio
+import threading
+import concurrent.futures
+import requests
+from . import tracing
+from . import rate_limiter
+from . import video_eta
+from . import task_journal
+from .progress import wait_future
+from .minimax_client import AsyncMiniMaxClient, get_event_loop
+from .errors import check_base_resp, MiniMaxAPIError, REJECTED_CODES
+from .logger import get_logger, lazy_json
+
+log = get_logger("poll_scheduler")
+
+# ComfyUI raises this from a waiting node when the user cancels the run
+try:
+    from comfy.model_management import InterruptProcessingException
+except ImportError:
+    InterruptProcessingException = None
+
+# Errors nodes pass through unchanged instead of wrapping them as "status check failed"
+UNWRAPPED_ERRORS = tuple(e for e in (InterruptProcessingException, MiniMaxAPIError) if e is not None)
+
+# Finished tasks are remembered this long, so a later node (DownloadVideo with
+# a task handle) can pick up the result without querying again
+RESULT_TTL = 3600
+
+TERMINAL_STATUSES = ("success", "fail", "failed")
+
+# Once a callback has arrived for a task, pushes are trusted to report its
+# progress and polling drops to this safety-net interval
+CALLBACK_FALLBACK_INTERVAL = 120
+
+# Pushed statuses kept for tasks nobody is watching yet
+MAX_PUSHED = 1000
+
+
+class VideoTask:
+    """One watched video generation task and the future its waiters block on"""
+    def __init__(self, api_key, base_url, task_id, interval, max_wait, adaptive=True):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.task_id = task_id
+        self.interval = interval
+        self.adaptive = adaptive
+        self.started = time.monotonic()
+        self.deadline = self.started + max_wait
+        self.next_poll = self.started
+        self.status = "Pending"
+        self.polls = 0
+        self.pushes = 0
+        self.backoff = 0.0
+        # Age and expected completion come from the recorded submission, when there is one
+        self.submitted = None
+        self.estimate = None
+        if adaptive:
+            submission = video_eta.get_stats().submission(task_id)
+            if submission:
+                self.submitted = submission["submitted"]
+                self.estimate = video_eta.get_stats().estimate(submission["profile"])
+        self.result = None
+        self.finished_at = None
+        self.future = concurrent.futures.Future()
+
+    @property
+    def done(self):
+        return self.future.done()
+
+    def snapshot(self):
+        return {
+            "task_id": self.task_id,
+            "status": self.status,
+            "polls": self.polls,
+            "pushes": self.pushes,
+            "elapsed_seconds": round((self.finished_at or time.monotonic()) - self.started, 1),
+            "done": self.done,
+        }
+
+
+class PollScheduler:
+    """
+    Owns every outstanding video task_id and polls them from a single
+    coroutine on the shared event loop, so no node thread sleeps between
+    queries. Nodes register a task and either wait on its future or return
+    at once and collect the result later; waiters of the same task share one
+    poll sequence.
+    """
+    def __init__(self):
+        self.tasks = {}
+        self.pushed = {}
+        self.lock = threading.Lock()
+        self.wakeup = None
+        self.runner = None
+
+    def watch(self, api_key, base_url, task_id, interval=30, max_wait=1800, adaptive=True):
+        """Register task_id (or join its existing registration) and return its VideoTask"""
+        key = (rate_limiter.key_fingerprint(api_key), task_id)
+        pushed = None
+        with self.lock:
+            self._prune()
+            task = self.tasks.get(key)
+            if task is None or (task.done and task.future.exception() is not None):
+                # Failed or timed-out tasks are watched afresh when registered again
+                task = VideoTask(api_key, base_url, task_id, interval, max_wait, adaptive)
+                self.tasks[key] = task
+                pushed = self.pushed.get(task_id)
+                log.info("👀 Watching video task %s", task_id)
+            elif not task.done:
+                task.interval = min(task.interval, interval)
+                task.deadline = max(task.deadline, time.monotonic() + max_wait)
+        if not task.done:
+            loop = get_event_loop()
+            if pushed is not None:
+                # A callback arrived before anyone asked for the task
+                loop.call_soon_threadsafe(self._apply_push, [task], pushed[1])
+            loop.call_soon_threadsafe(self._kick)
+        # The first use of a key also picks up its tasks that a restart interrupted
+        task_journal.resume(api_key)
+        return task
+
+    def get(self, api_key, task_id):
+        return self.tasks.get((rate_limiter.key_fingerprint(api_key), task_id))
+
+    def push(self, task_id, data):
+        """
+        Apply a status pushed by a MiniMax callback to every watcher of
+        task_id, or keep it for the first one. Returns the number of watched
+        tasks it reached. Callbacks are not authenticated by the API, so a
+        pushed success or failure only triggers an immediate status query,
+        whose reply decides the outcome.
+        """
+        with self.lock:
+            self.pushed[task_id] = (time.monotonic(), data)
+            while len(self.pushed) > MAX_PUSHED:
+                del self.pushed[next(iter(self.pushed))]
+            tasks = [t for t in self.tasks.values() if t.task_id == task_id and not t.done]
+        if not tasks:
+            return 0
+        get_event_loop().call_soon_threadsafe(self._apply_push, tasks, data)
+        return len(tasks)
+
+    def _apply_push(self, tasks, data):
+        # Runs on the loop thread
+        data = dict(data, status=_push_status(data))
+        for task in tasks:
+            if task.done:
+                continue
+            task.pushes += 1
+            if data["status"].lower() in TERMINAL_STATUSES:
+                task.next_poll = time.monotonic()
+                continue
+            try:
+                self._apply_status(task, data)
+            except Exception as e:
+                log.warning("⚠️ Could not apply the pushed status of task %s: %s", task.task_id, e)
+                self._finish(task, error=e)
+        self._kick()
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, t in self.tasks.items() if t.done and now - t.finished_at > RESULT_TTL]:
+            del self.tasks[key]
+        for task_id in [k for k, (at, _) in self.pushed.items() if now - at > RESULT_TTL]:
+            del self.pushed[task_id]
+
+    def _kick(self):
+        # Runs on the loop thread
+        if self.wakeup is None:
+            self.wakeup = asyncio.Event()
+        self.wakeup.set()
+        if self.runner is None or self.runner.done():
+            self.runner = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            with self.lock:
+                active = [t for t in self.tasks.values() if not t.done]
+            if not active:
+                return
+            now = time.monotonic()
+            due = [t for t in active if t.next_poll <= now or t.deadline <= now]
+            if due:
+                await asyncio.gather(*(self._poll_guarded(t) for t in due))
+                continue
+            self.wakeup.clear()
+            delay = min(min(t.next_poll, t.deadline) for t in active) - now
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finish(self, task, result=None, error=None):
+        if task.done:
+            # A callback finished the task while a query was in flight
+            return
+        task.finished_at = time.monotonic()
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.result = result
+            task.future.set_result(result)
+
+    async def _poll_guarded(self, task):
+        # A failure must only end its own task, never the runner every other waiter depends on
+        try:
+            await self._poll(task)
+        except Exception as e:
+            log.warning("⚠️ Polling task %s failed: %s", task.task_id, e)
+            self._finish(task, error=e)
+
+    async def _poll(self, task):
+        if time.monotonic() >= task.deadline:
+            self._finish(task, error=RuntimeError(
+                f"Maximum wait time exceeded for task {task.task_id}. Video generation may still be in progress."))
+            return
+        client = AsyncMiniMaxClient(task.api_key, base_url=task.base_url)
+        task.polls += 1
+        try:
+            with tracing.span("video_poll", task_id=task.task_id, attempt=task.polls):
+                data = await client.query_video(task.task_id)
+            log.debug("Response data: %s", lazy_json(data))
+            check_base_resp(data)
+        except (MiniMaxAPIError, requests.exceptions.HTTPError) as e:
+            if self._rate_limited(e):
+                # Still throttled after the client's own retries: poll this task less often
+                task.backoff = min(video_eta.MAX_INTERVAL, max(task.interval, task.backoff * 2, 1.0))
+                task.next_poll = time.monotonic() + task.backoff
+                log.warning("⏳ Status queries for task %s are rate limited - next check in %.0fs", task.task_id, task.backoff)
+                return
+            if getattr(e, "response", None) is not None and e.response.status_code == 404:
+                e = RuntimeError("Video generation task not found. Please check your task_id.")
+                task_journal.write_later(task_journal.note_status, task.task_id, "Error", error=str(e))
+            self._finish(task, error=e)
+            return
+        except Exception as e:
+            self._finish(task, error=e)
+            return
+
+        task.backoff = 0.0
+        if not task.done:
+            self._apply_status(task, data)
+
+    def _apply_status(self, task, data):
+        """Act on a status reply, whether polled or pushed"""
+        status = str(data.get("status") or "unknown")
+        if status != task.status:
+            log.info("🎬 Task %s: %s", task.task_id, status)
+            task_journal.write_later(task_journal.note_status, task.task_id, status, file_id=data.get("file_id"))
+        task.status = status
+        if status.lower() == "success":
+            elapsed = time.monotonic() - task.started
+            log.info("🎉 Video task %s completed in %.0f seconds (%d queries, %d callbacks)",
+                     task.task_id, elapsed, task.polls, task.pushes)
+            task_journal.write_later(lambda: video_eta.get_stats().record_completion(task.task_id))
+            self._finish(task, result=data)
+        elif status.lower() in TERMINAL_STATUSES:
+            log.error("❌ Video generation failed!")
+            self._finish(task, error=RuntimeError(f"Video generation failed with status: {status}"))
+        else:
+            interval = self._interval(task)
+            log.debug("Task %s: %s - next check in %.0fs", task.task_id, status, interval)
+            task.next_poll = time.monotonic() + interval
+
+    def _rate_limited(self, error):
+        if isinstance(error, MiniMaxAPIError):
+            return error.status_code in REJECTED_CODES
+        return error.response is not None and error.response.status_code == 429
+
+    def _interval(self, task):
+        if task.pushes:
+            return max(task.interval, CALLBACK_FALLBACK_INTERVAL)
+        if not task.adaptive:
+            return task.interval
+        if task.submitted is not None:
+            elapsed = time.time() - task.submitted
+        else:
+            elapsed = time.monotonic() - task.started
+        return video_eta.next_interval(task.interval, elapsed, task.status, task.estimate)
+
+    def snapshot(self):
+        with self.lock:
+            return [task.snapshot() for task in self.tasks.values()]
+
+
+def _push_status(data):
+    # Callbacks spell statuses in lower case ("processing", "success"); queries capitalize them
+    status = str(data.get("status") or "unknown")
+    return status[:1].upper() + status[1:]
+
+
+_scheduler = PollScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def parse_task_ids(text):
+    """Task IDs separated by newlines, commas or whitespace, duplicates dropped, order kept"""
+    task_ids = []
+    for task_id in re.split(r"[\s,]+", text or ""):
+        if task_id and task_id not in task_ids:
+            task_ids.append(task_id)
+    return task_ids
+
+
+def single_task_id(text):
+    """
+    The one task ID of a node input ("" when empty). Several IDs, such as the
+    task_id output of a batch Video Generation run, raise a ValueError.
+    """
+    task_ids = parse_task_ids(text)
+    if len(task_ids) > 1:
+        raise ValueError(f"Got {len(task_ids)} task IDs ({', '.join(task_ids[:3])}{', ...' if len(task_ids) > 3 else ''}); "
+                         "this node takes a single task ID, use Batch Check Video Status for a batch")
+    return task_ids[0] if task_ids else ""
+
+
+def wait(task, timeout=None):
+    """
+    Block until the task finishes and return the final query_video reply.
+    Checks for a ComfyUI interrupt while waiting; an interrupted wait stops
+    here while the task keeps being polled in the background.
+    """
+    with tracing.span("poll_wait", task_id=task.task_id):
+        return wait_future(task.future, timeout or None, f"task {task.task_id}")
+
+
+def as_completed(tasks, timeout=None):
+    """
+    Yield tasks as they finish (successfully or not), in completion order.
+    Like wait(), checks for a ComfyUI interrupt while waiting.
+    """
+    by_future = {task.future: task for task in tasks}
+    pending = set(by_future)
+    end = time.monotonic() + timeout if timeout else None
+    while pending:
+        remaining = None if end is None else max(0.0, end - time.monotonic())
+        wait_future(_first_done(pending), remaining, f"{len(pending)} video tasks")
+        done = {future for future in pending if future.done()}
+        pending -= done
+        for future in sorted(done, key=lambda f: by_future[f].finished_at):
+            yield by_future[future]
+
+
+def _first_done(futures):
+    """A future that completes as soon as any of futures does"""
+    first = concurrent.futures.Future()
+
+    def done(_):
+        try:
+            first.set_result(None)
+        except concurrent.futures.InvalidStateError:
+            pass
+    for future in futures:
+        future.add_done_callback(done)
+    return first
@@ -0,0 +1,67 @@
+import time
+import concurrent.futures
+from .logger import get_logger
+
+log = get_logger("progress")
+
+# Seconds between checks for a ComfyUI interrupt while a node waits
+WAIT_SLICE = 1.0
+
+
+class Progress:
+    """
+    Progress reporting for long node runs. Drives ComfyUI's progress bar when
+    running inside ComfyUI and is a no-op otherwise.
+    """
+    def __init__(self, total):
+        self.total = max(1, int(total))
+        self.value = 0
+        try:
+            import comfy.utils
+            self.bar = comfy.utils.ProgressBar(self.total)
+        except ImportError:
+            self.bar = None
+
+    def update(self, value):
+        """Move to an absolute position (clamped to the total)"""
+        self.value = min(self.total, max(0, int(value)))
+        if self.bar is not None:
+            try:
+                self.bar.update_absolute(self.value, self.total)
+            except Exception as e:
+                log.debug("Progress update failed: %s", e)
+                self.bar = None
+
+    def advance(self, amount=1):
+        self.update(self.value + amount)
+
+    def finish(self):
+        self.update(self.total)
+
+
+def check_interrupted():
+    """Raise ComfyUI's interrupt exception if the user cancelled the run"""
+    try:
+        import comfy.model_management
+    except ImportError:
+        return
+    comfy.model_management.throw_exception_if_processing_interrupted()
+
+
+def wait_future(future, timeout=None, what="the result"):
+    """
+    Block on a concurrent future and return its result, checking for a
+    ComfyUI interrupt every WAIT_SLICE seconds. Raises RuntimeError naming
+    what was awaited after timeout seconds (None waits indefinitely). The
+    future itself is left running either way.
+    """
+    end = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        check_interrupted()
+        remaining = WAIT_SLICE if end is None else min(WAIT_SLICE, end - time.monotonic())
+        if remaining <= 0:
+            raise RuntimeError(f"Timed out waiting for {what}")
+        try:
+            return future.result(remaining)
+        except concurrent.futures.TimeoutError:
+            continue
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from . import metrics
+from . import tracing
+from .logger import get_logger
+
+log = get_logger("rate_limiter")
+
+# Default per-endpoint limits, applied separately for every API key.
+#   rpm: requests per minute
+#   tpm: tokens per minute (characters of input text for t2a_v2)
+#   max_in_flight: concurrent requests allowed to be waiting on the server
+# Override with the JM_MINIMAX_RATE_LIMITS environment variable, e.g.
+#   JM_MINIMAX_RATE_LIMITS='{"t2a_v2": {"rpm": 120, "tpm": 40000}, "query": {"rpm": 300}}'
+DEFAULT_LIMITS = {
+    "t2a_v2": {"rpm": 60, "tpm": 20000, "max_in_flight": 8},
+    "video_generation": {"rpm": 10, "max_in_flight": 4},
+    "query": {"rpm": 120, "max_in_flight": 8},
+    "files": {"rpm": 60, "max_in_flight": 8},
+    "music_generation": {"rpm": 20, "max_in_flight": 2},
+    "voice_clone": {"rpm": 20, "max_in_flight": 2},
+    "voice_design": {"rpm": 20, "max_in_flight": 2},
+}
+
+ENDPOINTS = tuple(DEFAULT_LIMITS.keys())
+
+
+def _load_limits():
+    limits = {endpoint: dict(values) for endpoint, values in DEFAULT_LIMITS.items()}
+    override = os.environ.get("JM_MINIMAX_RATE_LIMITS", "").strip()
+    if override:
+        try:
+            for endpoint, values in json.loads(override).items():
+                limits.setdefault(endpoint, {}).update(values)
+        except (ValueError, AttributeError) as e:
+            log.warning("⚠️ Ignoring invalid JM_MINIMAX_RATE_LIMITS: %s", e)
+    return limits
+
+
+def key_fingerprint(api_key):
+    """Short, non-reversible identifier for an API key (safe to log and expose)"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute / 60 tokens per second.
+    reserve() never fails: it takes the tokens (allowing the balance to go
+    negative) and returns how long the caller must wait before using them, so
+    waiting callers are served in arrival order.
+    """
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def drain(self, seconds):
+        """Push the bucket into debt so nothing is released for `seconds`"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def available(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+class EndpointGovernor:
+    """
+    Rate and concurrency governor for one (api_key, endpoint) pair.
+    Callers queue here instead of being rejected by the server.
+    """
+    def __init__(self, endpoint, rpm=None, tpm=None, max_in_flight=None):
+        self.endpoint = endpoint
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.requests = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, tokens=1):
+        """Block until the request may be sent. Returns the time spent queued."""
+        start = time.monotonic()
+        with self.cond:
+            self.waiting += 1
+        try:
+            delay = 0.0
+            if self.rpm:
+                delay = max(delay, self.rpm.reserve(1))
+            if self.tpm and tokens:
+                delay = max(delay, self.tpm.reserve(tokens))
+            if delay > 0:
+                time.sleep(delay)
+            with self.cond:
+                while self.max_in_flight and self.in_flight >= self.max_in_flight:
+                    self.cond.wait()
+                self.in_flight += 1
+        finally:
+            with self.cond:
+                self.waiting -= 1
+        waited = time.monotonic() - start
+        with self.cond:
+            self.requests += 1
+            self.total_wait += waited
+        return waited
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify()
+
+    def throttle(self, seconds):
+        """Hold back further requests, e.g. after the server reported a rate limit"""
+        if self.rpm:
+            self.rpm.drain(seconds)
+
+    def snapshot(self):
+        with self.cond:
+            return {
+                "endpoint": self.endpoint,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "max_in_flight": self.max_in_flight,
+                "rpm_tokens": round(self.rpm.available(), 2) if self.rpm else None,
+                "tpm_tokens": round(self.tpm.available(), 2) if self.tpm else None,
+                "requests": self.requests,
+                "avg_queue_seconds": round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+_limits = _load_limits()
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def configure(endpoint, **limits):
+    """
+    Change the limits for an endpoint (rpm, tpm, max_in_flight).
+    Governors created from now on use the new values; existing ones are replaced.
+    """
+    with _governors_lock:
+        _limits.setdefault(endpoint, {}).update(limits)
+        for key in [k for k in _governors if k[1] == endpoint]:
+            del _governors[key]
+
+
+def get_governor(api_key, endpoint):
+    key = (key_fingerprint(api_key), endpoint)
+    governor = _governors.get(key)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.get(key)
+            if governor is None:
+                governor = EndpointGovernor(endpoint, **_limits.get(endpoint, {}))
+                _governors[key] = governor
+    return governor
+
+
+@contextmanager
+def limit(api_key, endpoint, tokens=1):
+    """Hold a rate/concurrency slot for the duration of the block"""
+    governor = get_governor(api_key, endpoint)
+    with tracing.span("rate_limit_wait", endpoint=endpoint):
+        waited = governor.acquire(tokens)
+    metrics.QUEUE_SECONDS.observe(waited, endpoint=endpoint)
+    if waited >= 1.0:
+        log.info("⏳ Rate limiter: %s request queued for %.1fs (queue depth %d)", endpoint, waited, governor.waiting)
+    try:
+        yield governor
+    finally:
+        governor.release()
+
+
+def snapshot():
+    """Queue depth and bucket levels for every governor, keyed by API key fingerprint"""
+    result = {}
+    for (fingerprint, endpoint), governor in list(_governors.items()):
+        result.setdefault(fingerprint, {})[endpoint] = governor.snapshot()
+    return result
@@ -0,0 +1,93 @@
+import time
+import random
+import requests
+from email.utils import parsedate_to_datetime
+from .errors import REJECTED_CODES, TRANSIENT_CODES
+from .logger import env_number
+
+# Retry decisions
+FATAL = "fatal"
+# The server did not process the request (connect failure, 429, 1002 ...);
+# safe to send again even for billed, non-idempotent calls
+RETRY_SAFE = "retry_safe"
+# The request may have reached the server; only idempotent calls are sent again
+RETRY_IDEMPOTENT = "retry_idempotent"
+
+RETRYABLE_HTTP_STATUS = {500, 502, 503, 504}
+
+
+def classify_exception(exc):
+    """Classify a requests exception into a retry decision"""
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        if status == 429:
+            return RETRY_SAFE
+        if status in RETRYABLE_HTTP_STATUS:
+            return RETRY_IDEMPOTENT
+        return FATAL
+    if isinstance(exc, (requests.exceptions.ConnectTimeout, requests.exceptions.SSLError)):
+        # The connection was never established, nothing was sent
+        return RETRY_SAFE
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError)):
+        return RETRY_IDEMPOTENT
+    return FATAL
+
+
+def classify_code(status_code):
+    """Classify a base_resp status code; None means the call succeeded"""
+    if status_code is None or status_code == 0:
+        return None
+    if status_code in REJECTED_CODES:
+        return RETRY_SAFE
+    if status_code in TRANSIENT_CODES:
+        return RETRY_IDEMPOTENT
+    return FATAL
+
+
+def retry_after(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date)"""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+    The delay before attempt n+1 is uniform in [0, min(max_delay, base_delay * 2**(n-1))],
+    raised to the server's Retry-After value when one is given.
+    """
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, decision, attempt, may_resubmit):
+        if attempt >= self.max_attempts or decision in (None, FATAL):
+            return False
+        return decision == RETRY_SAFE or may_resubmit
+
+    def backoff(self, attempt, retry_after_seconds=None):
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after_seconds is not None:
+            delay = max(delay, min(retry_after_seconds, self.max_delay * 4))
+        return delay
+
+
+DEFAULT_POLICY = RetryPolicy(
+    max_attempts=env_number("JM_MINIMAX_RETRY_ATTEMPTS", 4, int),
+    base_delay=env_number("JM_MINIMAX_RETRY_BASE_DELAY", 1.0),
+    max_delay=env_number("JM_MINIMAX_RETRY_MAX_DELAY", 30.0),
+)
@@ -0,0 +1,62 @@
+import asyncio
+from . import rate_limiter
+from . import circuit_breaker
+from . import metrics
+from . import tts_session
+from . import poll_scheduler
+from . import video_eta
+from . import task_journal
+from . import video_callbacks
+
+# HTTP routes exposed on the ComfyUI server for monitoring the MiniMax nodes.
+# PromptServer only exists when running inside ComfyUI, so registration is
+# skipped when the package is imported standalone.
+try:
+    from aiohttp import web
+    from server import PromptServer
+    routes = PromptServer.instance.routes
+except (ImportError, AttributeError):
+    routes = None
+
+
+def _journal_summary():
+    return task_journal.get_journal().summary()
+
+
+if routes is not None:
+    @routes.get("/jm-minimax/rate-limits")
+    async def get_rate_limits(request):
+        return web.json_response(rate_limiter.snapshot())
+
+    @routes.get("/jm-minimax/status")
+    async def get_status(request):
+        # The journal is a SQLite file; query it off the server's event loop
+        journal = await asyncio.get_running_loop().run_in_executor(None, _journal_summary)
+        return web.json_response({
+            "circuit_breakers": circuit_breaker.snapshot(),
+            "rate_limits": rate_limiter.snapshot(),
+            "tts_sessions": tts_session.snapshot(),
+            "video_tasks": poll_scheduler.get_scheduler().snapshot(),
+            "video_eta": video_eta.get_stats().summary(),
+            "video_journal": journal,
+            "video_callbacks": video_callbacks.snapshot(),
+        })
+
+    @routes.post(video_callbacks.CALLBACK_PATH)
+    async def post_video_callback(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+        status, result = video_callbacks.handle(body, request.query.get("token"))
+        return web.json_response(result, status=status)
+
+    @routes.get("/jm-minimax/metrics")
+    async def get_metrics(request):
+        return web.Response(text=metrics.REGISTRY.render_prometheus(),
+                            content_type="text/plain", charset="utf-8",
+                            headers={"X-Prometheus-Format": "0.0.4"})
+
+    @routes.get("/jm-minimax/metrics.json")
+    async def get_metrics_json(request):
+        return web.json_response(metrics.REGISTRY.snapshot())
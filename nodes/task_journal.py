@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import folder_paths
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from . import rate_limiter
+from .logger import get_logger, env_number
+
+log = get_logger("task_journal")
+
+# Location of the journal (default <ComfyUI output>/minimax_tasks.sqlite3)
+JOURNAL_PATH = os.environ.get("JM_MINIMAX_TASK_JOURNAL", "")
+
+# Unfinished tasks older than this are not resumed, and finished tasks older
+# than this are not reused for identical submissions
+RESUME_MAX_AGE = env_number("JM_MINIMAX_TASK_RESUME_HOURS", 24.0) * 3600
+
+# Used for resuming at startup, before any node has supplied an API key
+STARTUP_API_KEY_ENV = "JM_MINIMAX_API_KEY"
+
+# Payload fields that do not change the rendered video
+_IGNORED_FIELDS = {"callback_url"}
+
+_FAILED_STATUSES = ("fail", "failed", "error", "expired")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    payload_hash TEXT NOT NULL,
+    api_key_hash TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    model TEXT,
+    status TEXT NOT NULL,
+    file_id TEXT,
+    download_path TEXT,
+    error TEXT,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    downloaded_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_payload ON tasks (payload_hash, api_key_hash, submitted_at);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (api_key_hash, status);
+CREATE INDEX IF NOT EXISTS tasks_by_file ON tasks (file_id);
+CREATE TABLE IF NOT EXISTS transitions (
+    task_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_by_task ON transitions (task_id, at);
+"""
+
+# Journal (and completion-history) writes made from the shared event loop are
+# queued to this one thread, in order, so the loop never waits on the disk or
+# on a node thread holding the journal lock
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jm-minimax-journal")
+
+# Tasks submitted before this process started are the ones a restart interrupted
+PROCESS_START = time.time()
+
+
+def payload_hash(payload):
+    """Content hash of a video_generation payload (images included, callback_url ignored)"""
+    canonical = {k: v for k, v in payload.items() if k not in _IGNORED_FIELDS}
+    encoded = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class TaskJournal:
+    """
+    Durable record of video generation tasks in SQLite (WAL mode): the
+    submission's payload hash, status transitions, file_id, download path
+    and timings. API keys are only stored as fingerprints.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def record_submission(self, task_id, payload_digest, api_key, base_url, model=None):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO tasks (task_id, payload_hash, api_key_hash, base_url, model, status, "
+                "submitted_at, updated_at) VALUES (?, ?, ?, ?, ?, 'Submitted', ?, ?)",
+                (str(task_id), payload_digest, rate_limiter.key_fingerprint(api_key), base_url, model, now, now))
+            db.execute("INSERT INTO transitions (task_id, status, at) VALUES (?, 'Submitted', ?)",
+                       (str(task_id), now))
+
+    def record_status(self, task_id, status, file_id=None, error=None):
+        """Record a status seen for a journaled task (unknown task_ids are ignored)"""
+        now = time.time()
+        finished = status.lower() == "success" or status.lower() in _FAILED_STATUSES
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM tasks WHERE task_id = ?", (str(task_id),)).fetchone()
+            if row is None:
+                return
+            db.execute(
+                "UPDATE tasks SET status = ?, file_id = COALESCE(?, file_id), error = COALESCE(?, error), "
+                "updated_at = ?, finished_at = CASE WHEN ? THEN COALESCE(finished_at, ?) ELSE finished_at END "
+                "WHERE task_id = ?",
+                (status, file_id or None, error, now, finished, now, str(task_id)))
+            if row["status"] != status:
+                db.execute("INSERT INTO transitions (task_id, status, at) VALUES (?, ?, ?)",
+                           (str(task_id), status, now))
+
+    def record_download(self, file_id, path, task_id=None):
+        now = time.time()
+        if task_id:
+            self._execute("UPDATE tasks SET download_path = ?, downloaded_at = ?, updated_at = ? WHERE task_id = ?",
+                          (path, now, now, str(task_id)))
+        else:
+            self._execute("UPDATE tasks SET download_path = ?, downloaded_at = ?, updated_at = ? WHERE file_id = ?",
+                          (path, now, now, str(file_id)))
+
+    def find_reusable(self, payload_digest, api_key, max_age=RESUME_MAX_AGE):
+        """The newest task for an identical payload and key that has not failed, or None"""
+        placeholders = ", ".join("?" for _ in _FAILED_STATUSES)
+        rows = self._execute(
+            f"SELECT * FROM tasks WHERE payload_hash = ? AND api_key_hash = ? AND submitted_at >= ? "
+            f"AND lower(status) NOT IN ({placeholders}) ORDER BY submitted_at DESC LIMIT 1",
+            (payload_digest, rate_limiter.key_fingerprint(api_key), time.time() - max_age) + _FAILED_STATUSES)
+        return dict(rows[0]) if rows else None
+
+    def unfinished(self, api_key, before=None, max_age=RESUME_MAX_AGE):
+        """Tasks of a key that are still rendering, or succeeded but were never downloaded"""
+        before = PROCESS_START if before is None else before
+        rows = self._execute(
+            "SELECT * FROM tasks WHERE api_key_hash = ? AND submitted_at >= ? AND submitted_at < ? "
+            "AND (finished_at IS NULL OR (lower(status) = 'success' AND download_path IS NULL)) "
+            "ORDER BY submitted_at",
+            (rate_limiter.key_fingerprint(api_key), time.time() - max_age, before))
+        return [dict(row) for row in rows]
+
+    def get(self, task_id):
+        rows = self._execute("SELECT * FROM tasks WHERE task_id = ?", (str(task_id),))
+        return dict(rows[0]) if rows else None
+
+    def transitions(self, task_id):
+        rows = self._execute("SELECT status, at FROM transitions WHERE task_id = ? ORDER BY at", (str(task_id),))
+        return [(row["status"], row["at"]) for row in rows]
+
+    def summary(self):
+        rows = self._execute("SELECT status, COUNT(*) AS count FROM tasks GROUP BY status")
+        return {row["status"]: row["count"] for row in rows}
+
+
+_journal = None
+_journal_lock = threading.Lock()
+_resumed = set()
+
+
+def get_journal():
+    """Return the shared task journal"""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                path = JOURNAL_PATH or os.path.join(folder_paths.get_output_directory(), "minimax_tasks.sqlite3")
+                _journal = TaskJournal(path)
+    return _journal
+
+
+def resume(api_key, base_url=None):
+    """
+    Pick up the tasks of api_key that a restart interrupted (once per key and
+    process): unfinished ones are polled again in the background, and
+    finished videos that were never downloaded are downloaded into the output
+    folder. Returns the number of tasks resumed.
+    """
+    fingerprint = rate_limiter.key_fingerprint(api_key)
+    with _journal_lock:
+        if fingerprint in _resumed:
+            return 0
+        _resumed.add(fingerprint)
+    try:
+        rows = get_journal().unfinished(api_key)
+    except (sqlite3.Error, OSError) as e:
+        log.warning("⚠️ Could not read the task journal: %s", e)
+        return 0
+    if not rows:
+        return 0
+    from . import poll_scheduler
+    from .minimax_client import submit
+    log.info("♻️ Resuming %d video task(s) interrupted by a restart", len(rows))
+    for row in rows:
+        url = base_url or row["base_url"]
+        task = poll_scheduler.get_scheduler().watch(api_key, url, row["task_id"], max_wait=RESUME_MAX_AGE)
+
+        def on_done(future, row=row, url=url):
+            if future.exception() is None:
+                submit(_download(api_key, url, row["task_id"], future.result().get("file_id")))
+        task.future.add_done_callback(on_done)
+    return len(rows)
+
+
+def resume_on_startup():
+    """Resume with the key in JM_MINIMAX_API_KEY, if set (called when the package loads)"""
+    api_key = os.environ.get(STARTUP_API_KEY_ENV, "").strip()
+    if not api_key:
+        return 0
+    try:
+        return resume(api_key)
+    except Exception as e:
+        log.warning("⚠️ Could not resume video tasks: %s", e)
+        return 0
+
+
+async def _download(api_key, base_url, task_id, file_id):
+    """Download a resumed task's video next to the other outputs"""
+    from .download_video import fetch_video
+    if not file_id:
+        return
+    try:
+        path = await fetch_video(api_key, base_url, file_id, f"minimax_video_{task_id}", task_id=task_id)
+        log.info("♻️ Resumed video task %s downloaded to: %s", task_id, path)
+    except Exception as e:
+        log.warning("⚠️ Could not download resumed video task %s: %s", task_id, e)
+
+
+def write_later(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on the journal writer thread and return a
+    concurrent.futures.Future for it (await it with asyncio.wrap_future).
+    Journal errors are logged, not raised.
+    """
+    def write():
+        try:
+            return func(*args, **kwargs)
+        except (sqlite3.Error, OSError) as e:
+            log.warning("⚠️ Could not update the task journal: %s", e)
+    return _writer.submit(write)
+
+
+def flush(timeout=None):
+    """Block until the writes queued so far are done"""
+    _writer.submit(lambda: None).result(timeout)
+
+
+def note_status(task_id, status, file_id=None, error=None):
+    """record_status for callers that must not fail because of the journal"""
+    try:
+        get_journal().record_status(task_id, status, file_id=file_id, error=error)
+    except (sqlite3.Error, OSError) as e:
+        log.warning("⚠️ Could not update the task journal: %s", e)
@@ -0,0 +1,106 @@
+import re
+
+# Sentence endings (Chinese and Western). A Western full stop only ends a
+# sentence when followed by whitespace, so "3.5" and "e.g." stay intact.
+_SENTENCE_END = re.compile(r"[。！？!?；;…]+[”’」』）)\"']*|\.(?=\s)|\n+")
+
+# Weaker boundaries used to break up a single over-long sentence
+_CLAUSE_END = re.compile(r"[，,、：:]+")
+
+# MiniMax pause markers such as <#0.5#> must not be cut in half
+_PAUSE_MARKER = re.compile(r"<#[\d.]+#>")
+
+
+def _pieces(text, pattern):
+    """Split text after every match of pattern, keeping the delimiters"""
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _hard_split(text, max_chars):
+    parts = []
+    while len(text) > max_chars:
+        cut = max_chars
+        for marker in _PAUSE_MARKER.finditer(text):
+            if marker.start() < cut < marker.end():
+                cut = marker.start() or marker.end()
+                break
+        parts.append(text[:cut])
+        text = text[cut:]
+    if text:
+        parts.append(text)
+    return parts
+
+
+def _units(text, max_chars):
+    """Sentence-sized pieces, each at most max_chars long"""
+    units = []
+    for sentence in _pieces(text, _SENTENCE_END):
+        if len(sentence) <= max_chars:
+            units.append(sentence)
+            continue
+        for clause in _pieces(sentence, _CLAUSE_END):
+            units.extend([clause] if len(clause) <= max_chars else _hard_split(clause, max_chars))
+    return units
+
+
+def split_text(text, max_chars):
+    """
+    Split text into chunks of at most max_chars characters, breaking at
+    sentence boundaries where possible, then at clause punctuation, and only
+    as a last resort mid-clause.
+    Returns a list of (offset, chunk) where offset is the position of the
+    chunk in text; chunks are stripped and blank ones dropped.
+    """
+    chunks = []
+    current = ""
+    offset = 0
+    position = 0
+    for unit in _units(text, max_chars):
+        if current and len(current) + len(unit) > max_chars:
+            chunks.append((offset, current))
+            current = ""
+        if not current:
+            offset = position
+        current += unit
+        position += len(unit)
+    if current:
+        chunks.append((offset, current))
+
+    result = []
+    for offset, chunk in chunks:
+        stripped = chunk.strip()
+        if stripped:
+            result.append((offset + len(chunk) - len(chunk.lstrip()), stripped))
+    return result
+
+
+_TIME_KEYS = ("time_begin", "time_end")
+_TEXT_KEYS = ("text_begin", "text_end")
+
+
+def shift_subtitles(value, time_offset, text_offset):
+    """
+    Return a copy of a subtitle structure with every time_begin/time_end moved
+    by time_offset (ms) and every text_begin/text_end moved by text_offset
+    (characters), at any nesting depth (segments, timestamped words ...).
+    """
+    if isinstance(value, list):
+        return [shift_subtitles(item, time_offset, text_offset) for item in value]
+    if isinstance(value, dict):
+        shifted = {}
+        for key, item in value.items():
+            if key in _TIME_KEYS and isinstance(item, (int, float)):
+                shifted[key] = item + time_offset
+            elif key in _TEXT_KEYS and isinstance(item, (int, float)):
+                shifted[key] = item + text_offset
+            else:
+                shifted[key] = shift_subtitles(item, time_offset, text_offset)
+        return shifted
+    return value
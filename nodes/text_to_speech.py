@@ -1,17 +1,37 @@
 import os
 import json
 import time
+import io
+import asyncio
+import contextlib
 import binascii
 import requests
 import folder_paths
-import urllib.parse
+from . import metrics
+from . import tracing
+from . import audio_decoder
+from . import audio_tensor
+from . import tts_cache
+from . import tts_session
+from . import mp3_utils
+from .text_splitter import split_text, shift_subtitles
+from .progress import Progress
+from .minimax_client import MiniMaxClient, run_sync
+from .errors import check_base_resp
+from .logger import get_logger, lazy_json
+
+log = get_logger("tts")
+
+# Rough size of streamed audio per input character (128kbps mp3, ~0.15s of
+# speech per character), used only to scale the progress bar
+STREAM_BYTES_PER_CHAR = 2400
 
 class TextToSpeech:
     """
     MiniMax Text to Speech node for ComfyUI
     """
     def __init__(self):
-        self.api_base = "https://api.minimaxi.chat/v1/t2a_v2"
+        self.base_url = "https://api.minimaxi.chat/v1"
         
     @classmethod
     def INPUT_TYPES(cls):
@@ -48,129 +68,353 @@ class TextToSpeech:
                     "default": "hex", 
                     "tooltip": "hex: 返回十六进制编码的音频数据; url: 返回音频下载链接(有效期24小时)"
                 }),
+                "stream": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Stream audio chunks and write them to disk as they arrive (hex output only). Lowers time to first audio and memory use for long texts"
+                }),
+                "long_text_chunk_size": ("INT", {
+                    "default": 0, "min": 0, "max": 10000, "step": 100,
+                    "tooltip": "Texts longer than this many characters are split at sentence boundaries, synthesized in parallel and joined into one mp3. 0 disables splitting"
+                }),
+                "max_parallel_chunks": ("INT", {
+                    "default": 4, "min": 1, "max": 16, "step": 1,
+                    "tooltip": "How many chunks of a long text are synthesized at the same time"
+                }),
+                "use_cache": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Reuse audio from an identical earlier request (the seed is ignored) instead of synthesizing and paying again"
+                }),
+                "save_to_disk": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "Also write the audio to the output folder. Off keeps it in memory and only the AUDIO output carries it"
+                }),
+                "websocket_session": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Send the text over a persistent WebSocket connection shared by every run with the same API key and voice settings, instead of one HTTP request per run (hex output, no subtitles)"
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("audio_path", "subtitle_path", "audio_url")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "AUDIO")
+    RETURN_NAMES = ("audio_path", "subtitle_path", "audio_url", "audio")
     FUNCTION = "generate_speech"
     CATEGORY = "JM-MiniMax-API/Speech"
 
-    def generate_speech(self, api_key, group_id, text, model, voice_id, speed, volume, pitch, emotion, subtitle_enable, filename_prefix, seed, custom_voice_id="", language_boost="auto", output_format="hex"):
-        if not api_key or not group_id:
-            raise ValueError("API Key and Group ID must be provided")
-        
-        # Handle seed parameter type conversion and validation
-        try:
-            if seed is None or seed == "" or seed == "":
-                seed = 0  # Default to 0 for random seed
-            else:
-                seed = int(seed)  # Ensure it's an integer
-        except (ValueError, TypeError):
-            print(f"⚠️ 无效的seed值: {seed}，使用默认值 0")
-            seed = 0
+    def _output_names(self, filename_prefix):
+        """(output_dir, clean_prefix, timestamp) for this run's output files"""
+        # Create output directory
+        output_dir = folder_paths.get_output_directory()
+        os.makedirs(output_dir, exist_ok=True)
         
-        # Log seed for execution tracking (seed is not sent to API, just for ComfyUI execution control)
-        print(f"🎲 执行种子 (Seed): {seed}")
+        # Generate timestamp for filenames
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
         
-        # Generate random seed if seed is 0
-        if seed == 0:
-            import random
-            actual_seed = random.randint(1, 0xffffffffffffffff)
-            print(f"🎯 自动生成随机种子: {actual_seed}")
+        # Clean filename prefix (remove any invalid characters)
+        clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_'))
+        if not clean_prefix:
+            clean_prefix = "tts_output"
+        return output_dir, clean_prefix, timestamp
+
+    def _from_cache(self, cached, filename_prefix, save_to_disk, audio_output):
+        """Outputs for a cache hit, with the files placed in the output folder like a fresh result"""
+        audio_filepath = ""
+        subtitle_filepath = ""
+        if save_to_disk:
+            output_dir, clean_prefix, timestamp = self._output_names(filename_prefix)
+            with tracing.span("cache_copy"):
+                audio_filepath = tts_cache.place_file(
+                    cached["audio_path"], os.path.join(output_dir, f"{clean_prefix}_{timestamp}.mp3"))
+                if cached["subtitle_path"]:
+                    subtitle_filepath = tts_cache.place_file(
+                        cached["subtitle_path"], os.path.join(output_dir, f"{clean_prefix}_subtitle_{timestamp}.json"))
+            log.info("Saved audio file to: %s", audio_filepath)
+        audio = None
+        if audio_output:
+            with tracing.span("audio_tensor"):
+                audio = audio_tensor.audio_output(audio_tensor.read_file(cached["audio_path"]), "mp3")
+        return (
+            os.path.abspath(audio_filepath) if audio_filepath else "",
+            os.path.abspath(subtitle_filepath) if subtitle_filepath else "",
+            cached["audio_url"],
+            audio
+        )
+
+    def _stream_speech(self, client, payload, audio_filepath, text_length):
+        """
+        Synthesize with stream=true, decoding each hex chunk as it arrives and
+        appending it to audio_filepath (when given). Returns the data of the
+        closing event (subtitle_file etc) and the decoded audio.
+        """
+        payload = dict(payload, stream=True)
+        progress = Progress(text_length * STREAM_BYTES_PER_CHAR)
+        state = {"chunks": 0, "decode": 0.0, "final": {}}
+        audio = bytearray()
+        start = time.perf_counter()
+
+        with (open(audio_filepath, "wb") if audio_filepath else contextlib.nullcontext()) as f:
+            def append(audio_hex):
+                for part in audio_decoder.iter_decoded(audio_hex, "hex"):
+                    audio.extend(part)
+                    if f is not None:
+                        f.write(part)
+
+            def on_event(event):
+                check_base_resp(event)
+                data = event.get("data") or {}
+                if data.get("status") == 2:
+                    # The closing event repeats the complete audio; only its metadata is needed
+                    state["final"] = data
+                    return
+                audio_hex = data.get("audio")
+                if not audio_hex:
+                    return
+                decode_start = time.perf_counter()
+                append(audio_hex)
+                state["decode"] += time.perf_counter() - decode_start
+                state["chunks"] += 1
+                if state["chunks"] == 1:
+                    log.info("🔊 First audio chunk after %.2fs", time.perf_counter() - start)
+                # Keep the bar short of 100% until the stream has ended
+                progress.update(min(len(audio), progress.total - 1))
+
+            with tracing.span("stream_receive") as span:
+                client.post_stream("t2a_v2", payload, on_event, rate_tokens=text_length)
+                span.set(chunks=state["chunks"], bytes=len(audio))
+
+            if not audio and state["final"].get("audio"):
+                # No incremental chunks were sent; fall back to the complete audio
+                with tracing.span("hex_decode", size=len(state["final"]["audio"])):
+                    append(state["final"]["audio"])
+
+        if not audio:
+            raise RuntimeError("No audio data returned")
+        metrics.DECODE_SECONDS.observe(state["decode"], node="tts", encoding="hex_stream")
+        progress.finish()
+        log.info("Received streamed audio (%d chunks, %d bytes)%s", state["chunks"], len(audio),
+                 f", saved to: {audio_filepath}" if audio_filepath else "")
+        return state["final"], audio
+
+    def _synthesize_chunked(self, client, payload, chunk_size, max_parallel, audio_filepath):
+        """
+        Split payload["text"] at sentence boundaries, synthesize the pieces
+        concurrently and join their MP3 frames (into audio_filepath when given).
+        Returns {"subtitles": merged list} (None when subtitles are off) and the
+        joined audio.
+        """
+        chunks = split_text(payload["text"], chunk_size)
+        log.info("✂️ Long text split into %d chunks of up to %d characters", len(chunks), chunk_size)
+        progress = Progress(len(chunks))
+        aio = client.aio
+
+        async def synthesize(semaphore, text):
+            async with semaphore:
+                chunk_payload = dict(payload, text=text, output_format="hex", stream=False)
+                resp_data, audio = await aio.post_json_audio("t2a_v2", chunk_payload, rate_tokens=len(text), node="tts")
+                check_base_resp(resp_data)
+                data = resp_data.get("data") or {}
+                if not audio:
+                    raise RuntimeError("No audio data returned for a text chunk")
+                subtitles = None
+                if payload.get("subtitle_enable") and data.get("subtitle_file"):
+                    response = await aio.request("GET", data["subtitle_file"])
+                    response.raise_for_status()
+                    subtitles = response.json()
+                progress.advance()
+                return audio, subtitles, resp_data.get("extra_info") or {}
+
+        async def synthesize_all():
+            semaphore = asyncio.Semaphore(max_parallel)
+            return await asyncio.gather(*(synthesize(semaphore, text) for _, text in chunks))
+
+        with tracing.span("chunked_synthesis", chunks=len(chunks)):
+            results = run_sync(synthesize_all())
+
+        with tracing.span("mp3_join"):
+            joined = io.BytesIO()
+            durations = mp3_utils.concat([audio for audio, _, _ in results], joined)
+            audio = joined.getbuffer()
+        if audio_filepath:
+            with tracing.span("file_write"), metrics.timer(metrics.FILE_WRITE_SECONDS, node="tts"):
+                with open(audio_filepath, "wb") as f:
+                    f.write(audio)
+
+        subtitles = None
+        if payload.get("subtitle_enable"):
+            subtitles = []
+            elapsed_ms = 0
+            for (offset, _), (_, chunk_subtitles, extra_info), duration in zip(chunks, results, durations):
+                if chunk_subtitles:
+                    subtitles.extend(shift_subtitles(chunk_subtitles, elapsed_ms, offset))
+                # Frame-accurate duration; fall back to the API's figure for unparseable audio
+                elapsed_ms += round(duration * 1000) if duration else extra_info.get("audio_length", 0)
+        log.info("Joined %d chunks into %.1fs of audio%s", len(chunks), sum(durations),
+                 f", saved to: {audio_filepath}" if audio_filepath else "")
+        return {"subtitles": subtitles}, audio
+
+    def _synthesize_session(self, api_key, payload, chunk_size, audio_filepath):
+        """
+        Synthesize payload["text"] over the shared WebSocket session for its
+        voice settings. Long texts are split as in _synthesize_chunked and
+        their pieces pipelined over the one connection, then joined.
+        Returns {} (sessions carry no subtitles) and the audio.
+        """
+        text = payload["text"]
+        texts = [text]
+        if chunk_size and len(text) > chunk_size:
+            texts = [chunk for _, chunk in split_text(text, chunk_size)]
+            log.info("✂️ Long text split into %d chunks of up to %d characters", len(texts), chunk_size)
+
+        results = tts_session.synthesize(api_key, self.base_url, payload, texts)
+        if any(not audio for audio, _ in results):
+            raise RuntimeError("No audio data returned from the TTS session")
+        if len(results) == 1:
+            audio = results[0][0]
         else:
-            actual_seed = seed
-            print(f"🎯 使用指定种子: {actual_seed}")
-
-        url = f"{self.api_base}?GroupId={group_id}"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "accept": "application/json, text/plain, */*"
-        }
+            with tracing.span("mp3_join"):
+                joined = io.BytesIO()
+                mp3_utils.concat([audio for audio, _ in results], joined)
+                audio = joined.getbuffer()
+        if audio_filepath:
+            with tracing.span("file_write"), metrics.timer(metrics.FILE_WRITE_SECONDS, node="tts"):
+                with open(audio_filepath, "wb") as f:
+                    f.write(audio)
+        log.info("Received %d bytes of audio over the TTS session%s", len(audio),
+                 f", saved to: {audio_filepath}" if audio_filepath else "")
+        return {}, audio
+
+    @tracing.traced("TextToSpeech")
+    def generate_speech(self, api_key, group_id, text, model, voice_id, speed, volume, pitch, emotion, subtitle_enable, filename_prefix, seed, custom_voice_id="", language_boost="auto", output_format="hex", use_cache=True, stream=False, long_text_chunk_size=0, max_parallel_chunks=4, save_to_disk=True, websocket_session=False, audio_output=True):
+        """
+        audio_output is not a node input: callers that only need the files
+        (BatchTextToSpeech) pass False to skip building the AUDIO tensor.
+        """
+        with tracing.span("validation"):
+            if not api_key or not group_id:
+                raise ValueError("API Key and Group ID must be provided")
+            if stream and output_format == "url":
+                raise ValueError("Streaming only supports the hex output format")
+            if websocket_session and (output_format == "url" or subtitle_enable):
+                raise ValueError("WebSocket sessions only support the hex output format without subtitles")
+        
+            # Handle seed parameter type conversion and validation
+            try:
+                if seed is None or seed == "" or seed == "":
+                    seed = 0  # Default to 0 for random seed
+                else:
+                    seed = int(seed)  # Ensure it's an integer
+            except (ValueError, TypeError):
+                log.warning("⚠️ 无效的seed值: %s，使用默认值 0", seed)
+                seed = 0
+        
+            # Log seed for execution tracking (seed is not sent to API, just for ComfyUI execution control)
+            log.debug("🎲 执行种子 (Seed): %s", seed)
+        
+            # Generate random seed if seed is 0
+            if seed == 0:
+                import random
+                actual_seed = random.randint(1, 0xffffffffffffffff)
+                log.debug("🎯 自动生成随机种子: %s", actual_seed)
+            else:
+                actual_seed = seed
+                log.debug("🎯 使用指定种子: %s", actual_seed)
 
-        # Use custom_voice_id if provided, otherwise use voice_id
-        selected_voice_id = custom_voice_id if custom_voice_id else voice_id
-        print(f"Using voice_id: {selected_voice_id} {'(custom)' if custom_voice_id else '(predefined)'}")
+        client = MiniMaxClient(api_key, base_url=self.base_url, group_id=group_id)
 
-        # Build voice_setting
-        voice_setting = {
-            "voice_id": selected_voice_id,
-            "speed": speed,
-            "vol": volume,
-            "pitch": pitch
-        }
+        with tracing.span("payload_build"):
+            # Use custom_voice_id if provided, otherwise use voice_id
+            selected_voice_id = custom_voice_id if custom_voice_id else voice_id
+            log.debug("Using voice_id: %s %s", selected_voice_id, "(custom)" if custom_voice_id else "(predefined)")
+
+            # Build voice_setting
+            voice_setting = {
+                "voice_id": selected_voice_id,
+                "speed": speed,
+                "vol": volume,
+                "pitch": pitch
+            }
         
-        # Only add emotion if it's not empty
-        if emotion and emotion.strip():
-            voice_setting["emotion"] = emotion
-            print(f"Adding emotion parameter: {emotion}")
-        else:
-            print("Emotion parameter not provided, using default voice emotion")
-
-        payload = {
-            "model": model,
-            "text": text,
-            "voice_setting": voice_setting,
-            "language_boost": language_boost,
-            "audio_setting": {
-                "sample_rate": 32000,
-                "bitrate": 128000,
-                "format": "mp3",
-                "channel": 1
-            },
-            "subtitle_enable": subtitle_enable,
-            "output_format": output_format
-        }
+            # Only add emotion if it's not empty
+            if emotion and emotion.strip():
+                voice_setting["emotion"] = emotion
+                log.debug("Adding emotion parameter: %s", emotion)
+            else:
+                log.debug("Emotion parameter not provided, using default voice emotion")
+
+            payload = {
+                "model": model,
+                "text": text,
+                "voice_setting": voice_setting,
+                "language_boost": language_boost,
+                "audio_setting": {
+                    "sample_rate": 32000,
+                    "bitrate": 128000,
+                    "format": "mp3",
+                    "channel": 1
+                },
+                "subtitle_enable": subtitle_enable,
+                "output_format": output_format
+            }
+
+        cache_key = tts_cache.request_key(payload) if use_cache else None
+        if cache_key:
+            with tracing.span("cache_lookup"):
+                cached = tts_cache.get_cache().get(cache_key)
+            metrics.TTS_CACHE.inc(result="hit" if cached else "miss")
+            if cached and output_format == "url" and not cached["audio_url"]:
+                # Stored from a hex request (or its URL has expired): a URL-mode caller needs a fresh URL
+                cached = None
+            if cached:
+                log.info("♻️ TTS cache hit %s: %s", cache_key[:12], cached["audio_path"])
+                return self._from_cache(cached, filename_prefix, save_to_disk, audio_output)
 
         try:
-            print(f"Sending request to {url}")
-            print(f"Output format: {output_format}")
-            print(f"Headers: {json.dumps(headers, indent=2)}")
-            print(f"Payload: {json.dumps(payload, indent=2)}")
-            
-            response = requests.post(url, headers=headers, json=payload)
-            print(f"Response status code: {response.status_code}")
-            print(f"Response headers: {json.dumps(dict(response.headers), indent=2)}")
-            
-            try:
-                resp_data = response.json()
-                print(f"Response data: {json.dumps(resp_data, indent=2)}")
-            except json.JSONDecodeError:
-                print(f"Raw response content: {response.content}")
-                raise RuntimeError("Failed to decode JSON response")
-            
-            # Check for API error response
-            base_resp = resp_data.get("base_resp", {})
-            status_code = base_resp.get("status_code")
-            status_msg = base_resp.get("status_msg", "Unknown error")
-            
-            if status_code is not None and status_code != 0:
-                raise RuntimeError(f"API Error {status_code}: {status_msg}")
-            
-            data = resp_data.get("data", {})
-            if not data:
-                print(f"Full response: {json.dumps(resp_data, indent=2)}")
-                raise RuntimeError("No data returned from API")
-            
-            # Create output directory
-            output_dir = folder_paths.get_output_directory()
-            os.makedirs(output_dir, exist_ok=True)
+            log.debug("Sending request to %s/t2a_v2 (output format: %s)", self.base_url, output_format)
+            log.debug("Payload: %s", lazy_json(payload))
             
-            # Generate timestamp for filenames
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            
-            # Clean filename prefix (remove any invalid characters)
-            clean_prefix = "".join(c for c in filename_prefix if c.isalnum() or c in ('-', '_'))
-            if not clean_prefix:
-                clean_prefix = "tts_output"
+            output_dir, clean_prefix, timestamp = self._output_names(filename_prefix)
             
             # Process audio based on output format
             audio_filename = f"{clean_prefix}_{timestamp}.mp3"
             audio_filepath = os.path.join(output_dir, audio_filename)
             processed_audio_url = ""  # Initialize audio_url variable
+            target_path = audio_filepath if save_to_disk else None
+            
+            chunked = long_text_chunk_size and len(text) > long_text_chunk_size
+            if websocket_session:
+                # Sent over the long-lived connection for this key and voice
+                data, audio_data = self._synthesize_session(api_key, payload, long_text_chunk_size, target_path)
+            elif chunked:
+                # Long text is synthesized in parallel pieces and joined
+                data, audio_data = self._synthesize_chunked(client, payload, long_text_chunk_size,
+                                                            max_parallel_chunks, target_path)
+            elif stream:
+                # Audio chunks are decoded (and written to disk) as they arrive
+                data, audio_data = self._stream_speech(client, payload, target_path, len(text))
+            else:
+                # TPM budget for t2a_v2 is counted in characters of input text
+                if output_format == "hex":
+                    # The hex audio is decoded (and written to disk) while the response streams in
+                    # Without an AUDIO output the bytes only need to reach the file
+                    resp_data, audio_data = client.post_json_audio("t2a_v2", payload, target_path,
+                                                                   rate_tokens=len(text), node="tts",
+                                                                   keep_audio=audio_output or not save_to_disk)
+                else:
+                    resp_data = client.post_json("t2a_v2", payload, rate_tokens=len(text))
+                log.debug("Response data: %s", lazy_json(resp_data))
+                
+                # Check for API error response
+                check_base_resp(resp_data)
+                
+                data = resp_data.get("data", {})
+                if not data:
+                    log.warning("Full response: %s", lazy_json(resp_data))
+                    raise RuntimeError("No data returned from API")
             
-            if output_format == "url":
+            # Secondary files (url-mode audio, subtitles) are streamed in concurrently
+            downloads = []
+            audio_buffer = None
+            url_mode = output_format == "url" and not chunked
+            if url_mode:
                 # Handle URL format response
                 audio_url = data.get("audio", "")
                 if not audio_url:
@@ -178,62 +422,79 @@ class TextToSpeech:
                 
                 # Decode Unicode escapes in the URL (\u0026 -> &)
                 processed_audio_url = audio_url.encode().decode('unicode_escape')
-                print(f"Audio download URL: {processed_audio_url}")
+                log.debug("Audio download URL: %s", processed_audio_url)
+                if not save_to_disk:
+                    audio_buffer = io.BytesIO()
+                downloads.append((processed_audio_url, target_path or audio_buffer))
                 
-                # Download audio from URL
-                print(f"Downloading audio from URL...")
-                audio_response = requests.get(processed_audio_url)
-                audio_response.raise_for_status()
-                
-                with open(audio_filepath, "wb") as f:
-                    f.write(audio_response.content)
-                print(f"Downloaded and saved audio file to: {audio_filepath}")
-                
-            else:
-                # Handle hex format response (original logic)
-                audio_hex = data.get("audio", "")
-                if not audio_hex:
+            elif not (stream or chunked or websocket_session):
+                # Handle hex format response (already decoded while it was received;
+                # None when it only went to the file)
+                if audio_data is not None and not audio_data:
                     raise RuntimeError("No audio data returned")
-                
-                print(f"Received audio hex data length: {len(audio_hex)}")
-                audio_data = binascii.unhexlify(audio_hex)
-                print(f"Decoded audio data length: {len(audio_data)}")
-                
-                with open(audio_filepath, "wb") as f:
-                    f.write(audio_data)
-                print(f"Saved audio file to: {audio_filepath}")
+                if audio_data is not None:
+                    log.debug("Decoded audio data length: %d", len(audio_data))
+                if save_to_disk:
+                    log.info("Saved audio file to: %s", audio_filepath)
             
             # Save subtitle file if available
             subtitle_filepath = ""
-            if subtitle_enable and data.get("subtitle_file"):
+            if subtitle_enable and (data.get("subtitles") is not None or data.get("subtitle_file")):
                 subtitle_filename = f"{clean_prefix}_subtitle_{timestamp}.json"
                 subtitle_filepath = os.path.join(output_dir, subtitle_filename)
-                subtitle_response = requests.get(data["subtitle_file"])
-                subtitle_response.raise_for_status()
-                with open(subtitle_filepath, "wb") as f:
-                    f.write(subtitle_response.content)
-                print(f"Saved subtitle file to: {subtitle_filepath}")
+                if data.get("subtitles") is not None:
+                    with open(subtitle_filepath, "w", encoding="utf-8") as f:
+                        json.dump(data["subtitles"], f, ensure_ascii=False)
+                    log.debug("Saved merged subtitle file to: %s", subtitle_filepath)
+                else:
+                    downloads.append((data["subtitle_file"], subtitle_filepath))
+            
+            if downloads:
+                with tracing.span("secondary_downloads", count=len(downloads)):
+                    client.download_many(downloads)
+                if url_mode:
+                    audio_data = audio_buffer.getbuffer() if audio_buffer is not None else None
+                    if save_to_disk:
+                        log.info("Downloaded and saved audio file to: %s", audio_filepath)
+                if subtitle_filepath and data.get("subtitles") is None:
+                    log.debug("Saved subtitle file to: %s", subtitle_filepath)
+            
+            if cache_key:
+                try:
+                    with tracing.span("cache_store"):
+                        tts_cache.get_cache().put(cache_key, target_path, subtitle_filepath, processed_audio_url,
+                                                  audio_data=None if save_to_disk else audio_data)
+                except OSError as e:
+                    log.warning("⚠️ Could not store TTS result in cache: %s", e)
+            
+            # Build the AUDIO output straight from the decoded bytes
+            audio = None
+            if audio_output:
+                with tracing.span("audio_tensor"):
+                    if audio_data is None:
+                        # url-mode audio went straight to disk
+                        audio_data = audio_tensor.read_file(audio_filepath)
+                    audio = audio_tensor.audio_output(audio_data, "mp3", required=not save_to_disk)
             
             return (
-                os.path.abspath(audio_filepath),
+                os.path.abspath(audio_filepath) if save_to_disk else "",
                 os.path.abspath(subtitle_filepath) if subtitle_filepath else "",
-                processed_audio_url
+                processed_audio_url,
+                audio
             )
 
         except requests.exceptions.RequestException as e:
-            print(f"Request error: {str(e)}")
+            log.error("Request error: %s", e)
             if hasattr(e, 'response') and e.response is not None:
-                print(f"Error response status code: {e.response.status_code}")
-                print(f"Error response headers: {json.dumps(dict(e.response.headers), indent=2)}")
+                log.debug("Error response status code: %s", e.response.status_code)
                 try:
-                    error_data = e.response.json()
-                    print(f"Error response data: {json.dumps(error_data, indent=2)}")
-                except:
-                    print(f"Error response content: {e.response.content}")
+                    log.debug("Error response data: %s", lazy_json(e.response.json()))
+                except ValueError:
+                    log.debug("Error response content: %r", e.response.content[:1024])
             raise RuntimeError(f"Error calling MiniMax API: {str(e)}")
         except (ValueError, binascii.Error) as e:
-            print(f"Data processing error: {str(e)}")
+            log.error("Data processing error: %s", e)
             raise RuntimeError(f"Error processing API response: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            log.error("Unexpected error: %s", e)
             raise RuntimeError(f"Unexpected error: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from .logger import get_logger, env_number
+
+log = get_logger("tracing")
+
+_current_span = contextvars.ContextVar("jm_minimax_span", default=None)
+
+# Node runs slower than this log their per-phase breakdown at INFO (always at DEBUG)
+SLOW_RUN_SECONDS = env_number("JM_MINIMAX_SLOW_RUN_SECONDS", 30.0)
+
+
+class Span:
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.children = []
+        self.lock = threading.Lock()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def breakdown(self):
+        """Total time per phase name over all finished descendants, in seconds"""
+        totals = {}
+        stack = list(self.children)
+        while stack:
+            child = stack.pop()
+            if child.duration is not None:
+                totals[child.name] = totals.get(child.name, 0.0) + child.duration
+            stack.extend(child.children)
+        return totals
+
+
+class JsonLinesSink:
+    """Append one JSON object per finished span to a file"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class OpenTelemetrySink:
+    """
+    Mirror spans into the OpenTelemetry API, so any configured OTel exporter
+    (OTLP, Jaeger, console ...) receives them. Requires opentelemetry-api.
+    """
+    def __init__(self, tracer_name="jm-minimax-api"):
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = trace.get_tracer(tracer_name)
+        self.live = {}
+        self.lock = threading.Lock()
+
+    def on_start(self, span):
+        context = None
+        if span.parent is not None:
+            with self.lock:
+                parent = self.live.get(span.parent.span_id)
+            if parent is not None:
+                context = self.trace.set_span_in_context(parent)
+        otel_span = self.tracer.start_span(span.name, context=context, start_time=int(span.start_time * 1e9))
+        with self.lock:
+            self.live[span.span_id] = otel_span
+
+    def on_end(self, span):
+        with self.lock:
+            otel_span = self.live.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        if span.error:
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+
+_sinks = []
+
+
+def add_sink(sink):
+    """Register a sink object with on_start(span) and on_end(span) methods"""
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def _configure_from_env():
+    # JM_MINIMAX_TRACE accepts a comma separated list of
+    #   jsonl:<path>  write spans as JSON lines
+    #   otel          forward spans to the OpenTelemetry API
+    for entry in filter(None, (e.strip() for e in os.environ.get("JM_MINIMAX_TRACE", "").split(","))):
+        try:
+            if entry.startswith("jsonl:"):
+                add_sink(JsonLinesSink(entry[len("jsonl:"):]))
+            elif entry == "otel":
+                add_sink(OpenTelemetrySink())
+            else:
+                log.warning("⚠️ Unknown JM_MINIMAX_TRACE sink: %s", entry)
+        except (ImportError, OSError) as e:
+            log.warning("⚠️ Could not enable trace sink %s: %s", entry, e)
+
+
+def _emit(method, span):
+    for sink in list(_sinks):
+        try:
+            getattr(sink, method)(span)
+        except Exception as e:
+            log.debug("Trace sink %s failed: %s", type(sink).__name__, e)
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a phase as a child of the current span"""
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    if parent is not None:
+        with parent.lock:
+            parent.children.append(current)
+    _emit("on_start", current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current._start
+        _emit("on_end", current)
+        if parent is None:
+            _log_breakdown(current)
+
+
+def _log_breakdown(root):
+    phases = sorted(root.breakdown().items(), key=lambda item: -item[1])
+    if not phases:
+        return
+    summary = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in phases)
+    message = "⏱️ %s took %.2fs: %s"
+    if root.duration >= SLOW_RUN_SECONDS:
+        log.info(message, root.name, root.duration, summary)
+    else:
+        log.debug(message, root.name, root.duration, summary)
+
+
+def traced(name):
+    """Decorator that runs the wrapped node function inside a root span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def bind(parent, coro):
+    """Run coro with parent as its current span (used when hopping threads/loops)"""
+    token = _current_span.set(parent)
+    try:
+        return await coro
+    finally:
+        _current_span.reset(token)
+
+
+_configure_from_env()
@@ -0,0 +1,150 @@
+import time
+import threading
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from . import rate_limiter
+from . import circuit_breaker
+from . import metrics
+from . import tracing
+from .logger import get_logger, format_bytes
+
+log = get_logger("transport")
+
+# Default (connect, read) timeouts in seconds. Connect failures should surface
+# quickly; reads are allowed to take longer because TTS / music generation
+# responses are only sent once synthesis has finished.
+DEFAULT_TIMEOUT = (10, 120)
+
+# Streaming downloads only need the read timeout to cover the gap between chunks
+DOWNLOAD_TIMEOUT = (10, 60)
+
+# Number of distinct hosts kept in the pool cache and the number of keep-alive
+# connections kept per host (api.minimaxi.chat, api.minimax.io and the CDN
+# hosts used for file downloads)
+POOL_HOSTS = 8
+POOL_MAXSIZE = 32
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide requests.Session shared by every MiniMax node.
+    The session keeps a keep-alive connection pool per host, so consecutive
+    calls skip the DNS lookup and TCP/TLS handshake.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """Close all pooled connections (the next request opens a new pool)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def endpoint_for(url):
+    """
+    Map a MiniMax API URL to its rate-limit endpoint name, e.g.
+    .../v1/query/video_generation -> "query", .../v1/files/retrieve -> "files".
+    Returns None for URLs that are not MiniMax API calls (CDN downloads etc).
+    """
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    if "v1" not in parts:
+        return None
+    index = parts.index("v1") + 1
+    if index >= len(parts):
+        return None
+    endpoint = parts[index]
+    return endpoint if endpoint in rate_limiter.ENDPOINTS else None
+
+
+def _bearer_token(headers):
+    for name, value in (headers or {}).items():
+        if name.lower() == "authorization" and value.startswith("Bearer "):
+            return value[len("Bearer "):]
+    return None
+
+
+def _send(method, url, timeout, kwargs):
+    """Send one request, recording its outcome with the host/endpoint circuit breaker"""
+    host = urlparse(url).netloc
+    endpoint = endpoint_for(url)
+    label = endpoint or "download"
+    breaker = circuit_breaker.get_breaker(host, endpoint)
+    probe = breaker.before_call()
+    start = time.monotonic()
+    try:
+        with tracing.span("http_send", endpoint=label, method=method) as span:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+            span.set(status=response.status_code)
+    except requests.exceptions.RequestException as e:
+        latency = time.monotonic() - start
+        breaker.record(True, latency, probe)
+        metrics.REQUEST_FAILURES.inc(endpoint=label, error=type(e).__name__)
+        log.warning("%s %s failed after %.2fs: %s", method, endpoint or host, latency, e)
+        raise
+    except BaseException:
+        if probe:
+            # Anything else leaves the probe without an outcome; free the slot
+            # so the circuit is not stuck half-open
+            breaker.release_probe()
+        raise
+    latency = time.monotonic() - start
+    breaker.record(response.status_code >= 500, latency, probe)
+    metrics.REQUEST_SECONDS.observe(latency, endpoint=label, method=method, status=response.status_code)
+    metrics.TTFB_SECONDS.observe(response.elapsed.total_seconds(), endpoint=label)
+    body = response.request.body
+    if body:
+        metrics.BYTES_UPLOADED.inc(len(body), endpoint=label)
+    if kwargs.get("stream"):
+        # Streamed bodies are counted by whoever consumes them
+        size = response.headers.get("content-length")
+        size = int(size) if size else None
+    else:
+        size = len(response.content)
+        metrics.BYTES_DOWNLOADED.inc(size, endpoint=label)
+    log.info("%s %s -> %s in %.2fs (%s)", method, endpoint or host, response.status_code, latency, format_bytes(size))
+    return response
+
+
+def request(method, url, timeout=None, rate_tokens=1, **kwargs):
+    """
+    Send a request through the shared pooled session.
+    Accepts the same keyword arguments as requests.request. Calls fail fast
+    with CircuitOpenError while the host/endpoint circuit is open.
+    Authenticated calls to MiniMax API endpoints wait for a slot from the
+    per-key rate limiter; rate_tokens is the request's cost against the
+    endpoint's TPM budget.
+    """
+    if timeout is None:
+        timeout = DOWNLOAD_TIMEOUT if kwargs.get("stream") else DEFAULT_TIMEOUT
+    endpoint = endpoint_for(url)
+    api_key = _bearer_token(kwargs.get("headers"))
+    if endpoint and api_key:
+        # Fail fast before queuing behind the rate limiter if the circuit is already open
+        circuit_breaker.get_breaker(urlparse(url).netloc, endpoint).check_open()
+        with rate_limiter.limit(api_key, endpoint, tokens=rate_tokens):
+            return _send(method, url, timeout, kwargs)
+    return _send(method, url, timeout, kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
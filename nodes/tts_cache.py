@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import folder_paths
+from .logger import get_logger, format_bytes, env_number
+
+log = get_logger("tts_cache")
+
+# Where synthesized audio is kept, and when entries are evicted. Least recently
+# used entries are removed first once the cache exceeds its size budget;
+# entries older than the age limit are removed regardless (0 disables).
+CACHE_DIR = os.environ.get("JM_MINIMAX_TTS_CACHE_DIR", "")
+MAX_BYTES = int(env_number("JM_MINIMAX_TTS_CACHE_MAX_MB", 1024.0) * 1024 * 1024)
+MAX_AGE = env_number("JM_MINIMAX_TTS_CACHE_MAX_AGE_DAYS", 30.0) * 86400
+
+# Cache hits are copied into the output folder. Hard links save the copy but
+# share the data, so editing the output file in place would change the cached
+# entry too; opt in only when outputs are never modified.
+LINK_OUTPUTS = os.environ.get("JM_MINIMAX_TTS_CACHE_LINK", "").strip().lower() in ("1", "true", "yes")
+
+# Seconds between full sweeps for expired entries while the cache is under its size budget
+SWEEP_INTERVAL = 3600
+
+# Audio URLs returned by the API expire after 24 hours
+AUDIO_URL_TTL = 24 * 3600
+
+# Payload fields that do not change the synthesized audio
+_IGNORED_FIELDS = {"output_format", "stream"}
+
+
+def request_key(payload):
+    """
+    Content hash of a t2a_v2 payload. Keys are sorted and the output_format /
+    stream transport options are dropped, so requests that produce the same
+    audio map to the same key.
+    """
+    canonical = {k: v for k, v in payload.items() if k not in _IGNORED_FIELDS}
+    encoded = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Disk cache of TTS results. Every entry is <key>.<ext> for the audio, an
+    optional <key>.subtitle.json, and a <key>.meta.json record. The audio
+    file's mtime is the entry's last-used time. Sizes and last-used times
+    are kept in an in-memory index, read from disk once, so lookups and
+    stores do not rescan the directory.
+    """
+    def __init__(self, directory, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.index = None
+        self.total = 0
+        self.next_sweep = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.meta.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _stat_entry(self, meta):
+        size = 0
+        last_used = 0.0
+        for file_name in (meta.get("audio"), meta.get("subtitle")):
+            if not file_name:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, file_name))
+            except OSError:
+                continue
+            size += stat.st_size
+            last_used = max(last_used, stat.st_mtime)
+        return {"size": size, "last_used": last_used, "created": meta.get("created", 0.0)}
+
+    def _load_index(self):
+        # Called with the lock held
+        if self.index is not None:
+            return self.index
+        self.index = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".meta.json"):
+                continue
+            key = name[:-len(".meta.json")]
+            meta = self._read_meta(key)
+            if meta is not None:
+                self.index[key] = self._stat_entry(meta)
+        self.total = sum(entry["size"] for entry in self.index.values())
+        return self.index
+
+    def get(self, key):
+        """Return {"audio_path", "subtitle_path", "audio_url"} for a cached entry, or None"""
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        audio_path = os.path.join(self.directory, meta["audio"])
+        subtitle_path = os.path.join(self.directory, meta["subtitle"]) if meta.get("subtitle") else ""
+        if not os.path.exists(audio_path) or (subtitle_path and not os.path.exists(subtitle_path)):
+            self.remove(key)
+            return None
+        if self.max_age and time.time() - meta["created"] > self.max_age:
+            self.remove(key)
+            return None
+        now = time.time()
+        os.utime(audio_path, (now, now))
+        with self.lock:
+            entry = self._load_index().get(key)
+            if entry is not None:
+                entry["last_used"] = now
+        audio_url = meta.get("audio_url", "")
+        if audio_url and now - meta["created"] > AUDIO_URL_TTL:
+            audio_url = ""
+        return {"audio_path": audio_path, "subtitle_path": subtitle_path, "audio_url": audio_url}
+
+    def put(self, key, audio_path, subtitle_path="", audio_url="", audio_data=None):
+        """
+        Copy finished output files into the cache and record the entry.
+        audio_data stores in-memory audio instead when nothing was written to
+        audio_path.
+        """
+        ext = os.path.splitext(audio_path or "")[1] or ".mp3"
+        audio_name = f"{key}{ext}"
+        subtitle_name = f"{key}.subtitle.json" if subtitle_path else ""
+        if audio_data is not None:
+            self._write(audio_data, audio_name)
+        else:
+            self._copy(audio_path, audio_name)
+        if subtitle_path:
+            self._copy(subtitle_path, subtitle_name)
+        meta = {"audio": audio_name, "subtitle": subtitle_name, "audio_url": audio_url, "created": time.time()}
+        tmp_path = self._meta_path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        # The meta file is written last so readers never see a partial entry
+        os.replace(tmp_path, self._meta_path(key))
+        with self.lock:
+            index = self._load_index()
+            previous = index.get(key)
+            entry = self._stat_entry(meta)
+            index[key] = entry
+            self.total += entry["size"] - (previous["size"] if previous else 0)
+            if self.total > self.max_bytes or (self.max_age and meta["created"] >= self.next_sweep):
+                self.evict()
+
+    def _copy(self, source, name):
+        target = os.path.join(self.directory, name)
+        tmp_path = target + ".tmp"
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    def _write(self, data, name):
+        target = os.path.join(self.directory, name)
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+
+    def remove(self, key):
+        meta = self._read_meta(key) or {}
+        for name in (f"{key}.meta.json", meta.get("audio"), meta.get("subtitle")):
+            if name:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        with self.lock:
+            entry = self._load_index().pop(key, None)
+            if entry is not None:
+                self.total -= entry["size"]
+
+    def entries(self):
+        """(key, last_used, created, size) for every entry, least recently used first"""
+        with self.lock:
+            result = [(key, entry["last_used"], entry["created"], entry["size"])
+                      for key, entry in self._load_index().items()]
+        result.sort(key=lambda entry: entry[1])
+        return result
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        with self.lock:
+            now = time.time()
+            # Expired entries are also dropped on lookup, so a full sweep is only needed now and then
+            self.next_sweep = now + SWEEP_INTERVAL
+            removed = 0
+            for key, last_used, created, size in self.entries():
+                expired = self.max_age and now - created > self.max_age
+                if not expired and self.total <= self.max_bytes:
+                    continue
+                self.remove(key)
+                removed += 1
+            if removed:
+                log.debug("🧹 TTS cache evicted %d entries, %s left", removed, format_bytes(self.total))
+
+    def clear(self):
+        for key, _, _, _ in self.entries():
+            self.remove(key)
+
+
+def place_file(source, target, link=None):
+    """
+    Place a cached file at target: a copy, or a hard link (where the
+    filesystem allows it) when link is set (LINK_OUTPUTS by default)
+    """
+    if LINK_OUTPUTS if link is None else link:
+        try:
+            os.link(source, target)
+            return target
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+    return target
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the shared TTS cache (in <output>/minimax_tts_cache unless JM_MINIMAX_TTS_CACHE_DIR is set)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                directory = CACHE_DIR or os.path.join(folder_paths.get_output_directory(), "minimax_tts_cache")
+                _cache = TTSCache(directory)
+    return _cache
@@ -0,0 +1,280 @@
+import json
+import asyncio
+import binascii
+import collections
+from urllib.parse import urlparse
+from . import metrics
+from . import tracing
+from . import rate_limiter
+from .errors import base_resp_code, error_message, MiniMaxAPIError
+from .minimax_client import submit
+from .progress import wait_future
+from .logger import get_logger, env_number
+
+# aiohttp ships with ComfyUI (its web server is built on it); it is only
+# needed for the WebSocket session mode, so the import is optional here.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+log = get_logger("tts_session")
+
+WS_PATH = "ws/v1/t2a_v2"
+
+# A session's connection is closed after this many seconds without utterances
+# and reopened by the next one
+IDLE_SECONDS = env_number("JM_MINIMAX_TTS_WS_IDLE_SECONDS", 60.0)
+
+# Utterances sent ahead on one connection before the audio of the first has
+# finished. The API answers them strictly in order; 1 sends the next text as
+# soon as the previous one's final chunk arrives.
+PIPELINE_DEPTH = max(1, env_number("JM_MINIMAX_TTS_WS_PIPELINE", 1, int))
+
+# Longest a node waits for the audio of one synthesize() call, in seconds
+SYNTHESIZE_TIMEOUT = env_number("JM_MINIMAX_TTS_WS_TIMEOUT", 300.0)
+
+# task_start fields taken from a t2a_v2 payload; they fix the voice for the
+# whole session, so sessions are keyed by them
+_START_FIELDS = ("model", "voice_setting", "audio_setting", "pronunciation_dict", "language_boost")
+
+_sessions = {}
+
+
+def ws_url(base_url):
+    """wss://host/ws/v1/t2a_v2 for an API base URL such as https://host/v1"""
+    parsed = urlparse(base_url)
+    scheme = "wss" if parsed.scheme == "https" else "ws"
+    return f"{scheme}://{parsed.netloc}/{WS_PATH}"
+
+
+def start_message(payload):
+    """The task_start event for a t2a_v2 payload (everything but the text)"""
+    message = {field: payload[field] for field in _START_FIELDS if payload.get(field) is not None}
+    message["event"] = "task_start"
+    return message
+
+
+class Utterance:
+    """One text queued on a session, resolved with (audio, extra_info)"""
+    def __init__(self, text, future):
+        self.text = text
+        self.future = future
+        self.audio = bytearray()
+        self.chunks = 0
+
+
+class TTSSession:
+    """
+    One long-lived WebSocket connection to the t2a_v2 endpoint for a single
+    API key and voice configuration. Utterances from any number of callers
+    are queued, sent over the connection as task_continue events and the
+    audio chunks coming back are handed to the caller of the utterance at
+    the head of the in-flight queue (the API answers in order). Runs on the
+    shared event loop; the connection is opened on demand, reopened after
+    failures and closed when idle, at which point the session is dropped
+    from the registry until the next utterance for it.
+    """
+    def __init__(self, api_key, url, start):
+        self.api_key = api_key
+        self.url = url
+        self.start = start
+        self.key = _session_key(api_key, url, start)
+        self.queue = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.in_flight = collections.deque()
+        self.task = None
+        self.connections = 0
+        self.utterances = 0
+
+    async def synthesize(self, text):
+        """Queue text and wait for its audio; returns (audio bytearray, extra_info)"""
+        utterance = Utterance(text, asyncio.get_running_loop().create_future())
+        self.queue.append(utterance)
+        self.wakeup.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+        return await utterance.future
+
+    async def _run(self):
+        failures = 0
+        try:
+            while self.queue:
+                try:
+                    await self._connect_and_serve()
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    # Audio for in-flight texts may already be billed, so they fail instead of being resent
+                    self._fail(self.in_flight, e)
+                    if isinstance(e, MiniMaxAPIError) or failures >= 3:
+                        self._fail(self.queue, e)
+                        return
+                    log.warning("🔁 TTS session connection lost (%s) - reconnecting", e)
+                    await asyncio.sleep(min(2 ** failures, 10))
+        finally:
+            # Idle (or given up) with its connection closed; the next utterance
+            # for this voice starts a new session
+            if not self.queue and _sessions.get(self.key) is self:
+                del _sessions[self.key]
+                log.debug("TTS session for voice %s closed", (self.start.get("voice_setting") or {}).get("voice_id"))
+
+    def _fail(self, utterances, error):
+        while utterances:
+            utterance = utterances.popleft()
+            if not utterance.future.done():
+                utterance.future.set_exception(error)
+
+    async def _connect_and_serve(self):
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with aiohttp.ClientSession() as http:
+            async with http.ws_connect(self.url, headers=headers, heartbeat=30, max_msg_size=0) as ws:
+                await self._expect(ws, "connected_success")
+                await ws.send_json(self.start)
+                await self._expect(ws, "task_started")
+                self.connections += 1
+                log.info("🔌 TTS session connected (%s, voice %s)", self.start.get("model"),
+                         (self.start.get("voice_setting") or {}).get("voice_id"))
+                slots = asyncio.Semaphore(PIPELINE_DEPTH)
+                sender = asyncio.ensure_future(self._send(ws, slots))
+                # A failed send closes the socket so the receive loop stops too
+                sender.add_done_callback(lambda task: task.cancelled() or task.exception() is None
+                                         or asyncio.ensure_future(ws.close()))
+                try:
+                    await self._receive(ws, slots)
+                finally:
+                    sender.cancel()
+                if sender.done() and not sender.cancelled() and sender.exception() is not None:
+                    raise sender.exception()
+                if self.in_flight:
+                    raise ConnectionError("WebSocket closed with utterances in flight")
+
+    async def _read_event(self, ws):
+        message = await ws.receive()
+        if message.type == aiohttp.WSMsgType.TEXT:
+            metrics.BYTES_DOWNLOADED.inc(len(message.data), endpoint="t2a_v2_ws")
+            event = json.loads(message.data)
+            status_code, status_msg = base_resp_code(event)
+            if event.get("event") == "task_failed" or status_code not in (None, 0):
+                metrics.API_ERRORS.inc(endpoint="t2a_v2_ws", code=status_code)
+                raise MiniMaxAPIError(status_code, status_msg, error_message(status_code, status_msg))
+            return event
+        if message.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED):
+            return None
+        if message.type == aiohttp.WSMsgType.ERROR:
+            raise ConnectionError(f"WebSocket error: {ws.exception()}")
+        return {}
+
+    async def _expect(self, ws, name):
+        event = await self._read_event(ws)
+        if event is None or event.get("event") != name:
+            raise ConnectionError(f"Expected {name} from the TTS WebSocket, got {event!r}")
+        return event
+
+    async def _send(self, ws, slots):
+        """Send queued texts while pipeline slots are free; finish the task once idle"""
+        governor = rate_limiter.get_governor(self.api_key, "t2a_v2")
+        while True:
+            await slots.acquire()
+            while not self.queue:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    if not self.in_flight and not self.queue:
+                        await ws.send_json({"event": "task_finish"})
+                        return
+            utterance = self.queue.popleft()
+            if utterance.future.done():
+                # The caller gave up while the text was queued
+                slots.release()
+                continue
+            # Session texts still count against the key's characters-per-minute budget
+            delay = governor.tpm.reserve(len(utterance.text)) if governor.tpm else 0.0
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.in_flight.append(utterance)
+            self.utterances += 1
+            await ws.send_json({"event": "task_continue", "text": utterance.text})
+
+    async def _receive(self, ws, slots):
+        while True:
+            event = await self._read_event(ws)
+            if event is None or event.get("event") == "task_finished":
+                return
+            if not event or not self.in_flight:
+                continue
+            utterance = self.in_flight[0]
+            audio_hex = (event.get("data") or {}).get("audio")
+            if audio_hex:
+                try:
+                    utterance.audio += binascii.unhexlify(audio_hex)
+                except binascii.Error as e:
+                    raise ValueError(f"Invalid hex audio data in TTS session: {e}")
+                utterance.chunks += 1
+            if event.get("is_final"):
+                self.in_flight.popleft()
+                slots.release()
+                if not utterance.future.done():
+                    utterance.future.set_result((utterance.audio, event.get("extra_info") or {}))
+
+    def snapshot(self):
+        return {
+            "model": self.start.get("model"),
+            "voice_id": (self.start.get("voice_setting") or {}).get("voice_id"),
+            "connected": self.task is not None and not self.task.done(),
+            "queued": len(self.queue),
+            "in_flight": len(self.in_flight),
+            "connections": self.connections,
+            "utterances": self.utterances,
+        }
+
+
+def _session_key(api_key, url, start):
+    settings = json.dumps(start, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return (rate_limiter.key_fingerprint(api_key), url, settings)
+
+
+async def _get_session(api_key, url, start):
+    # Only touched from the shared loop, so no lock is needed
+    key = _session_key(api_key, url, start)
+    session = _sessions.get(key)
+    if session is None:
+        session = TTSSession(api_key, url, start)
+        _sessions[key] = session
+    return session
+
+
+async def synthesize_many(api_key, base_url, payload, texts):
+    """
+    Synthesize texts with the voice configuration of a t2a_v2 payload over the
+    shared session for it. Returns a list of (audio, extra_info) in order.
+    """
+    if aiohttp is None:
+        raise RuntimeError("WebSocket session mode needs aiohttp (pip install aiohttp)")
+    session = await _get_session(api_key, ws_url(base_url), start_message(payload))
+    with tracing.span("tts_session", utterances=len(texts)):
+        return await asyncio.gather(*(session.synthesize(text) for text in texts))
+
+
+def synthesize(api_key, base_url, payload, texts, timeout=None):
+    """
+    Blocking wrapper around synthesize_many for node code. Gives up after
+    timeout seconds (SYNTHESIZE_TIMEOUT by default) and checks for a ComfyUI
+    interrupt while waiting; either way the texts not yet sent are withdrawn.
+    """
+    timeout = timeout or SYNTHESIZE_TIMEOUT
+    future = submit(synthesize_many(api_key, base_url, payload, texts))
+    try:
+        return wait_future(future, timeout, f"the TTS session after {timeout:.0f}s")
+    finally:
+        # Cancelling cancels the utterances, which the sender then skips
+        future.cancel()
+
+
+def snapshot():
+    """State of every session, keyed by API key fingerprint"""
+    result = {}
+    for (fingerprint, _, _), session in list(_sessions.items()):
+        result.setdefault(fingerprint, []).append(session.snapshot())
+    return result
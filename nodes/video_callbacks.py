@@ -0,0 +1,128 @@
+import os
+import hmac
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from . import metrics
+from . import poll_scheduler
+from .logger import get_logger
+
+log = get_logger("video_callbacks")
+
+# Path of the callback route, on the ComfyUI server and on the standalone listener
+CALLBACK_PATH = "/jm-minimax/callback"
+
+# Public URL of the route (as MiniMax must reach it); used for video submissions
+# that do not set callback_url themselves
+CALLBACK_URL = os.environ.get("JM_MINIMAX_CALLBACK_URL", "").strip()
+
+# Port of a standalone listener, for setups where the ComfyUI server is not
+# reachable from outside; empty to only use the ComfyUI route. It binds to
+# localhost unless JM_MINIMAX_CALLBACK_HOST says otherwise (e.g. 0.0.0.0
+# behind a reverse proxy).
+LISTENER_PORT = os.environ.get("JM_MINIMAX_CALLBACK_PORT", "").strip()
+LISTENER_HOST = os.environ.get("JM_MINIMAX_CALLBACK_HOST", "127.0.0.1")
+
+# Status pushes must carry ?token=<value> (add it to the callback URL) when
+# set; the standalone listener only starts with a token
+TOKEN = os.environ.get("JM_MINIMAX_CALLBACK_TOKEN", "")
+
+_listener = None
+_listener_lock = threading.Lock()
+_counts = {"challenges": 0, "pushes": 0, "rejected": 0}
+
+
+def _count(kind):
+    _counts[kind] += 1
+    metrics.VIDEO_CALLBACKS.inc(kind=kind)
+
+
+def handle(body, token=None):
+    """
+    Handle one callback request body and return (http_status, json_body).
+    MiniMax first verifies the URL by posting {"challenge": ...}, which is
+    echoed back; later requests push a task's status, which is handed to the
+    poll scheduler so waiting nodes wake up at once.
+    """
+    if not isinstance(body, dict):
+        _count("rejected")
+        return 400, {"error": "expected a JSON object"}
+    if "challenge" in body:
+        _count("challenges")
+        return 200, {"challenge": body["challenge"]}
+    if TOKEN and not hmac.compare_digest(token or "", TOKEN):
+        _count("rejected")
+        return 403, {"error": "invalid token"}
+    task_id = body.get("task_id")
+    status = body.get("status")
+    if not task_id or not isinstance(status, str) or not status:
+        _count("rejected")
+        return 400, {"error": "task_id and status are required"}
+    _count("pushes")
+    watchers = poll_scheduler.get_scheduler().push(str(task_id), body)
+    log.debug("Callback for task %s: %s (%d waiting)", task_id, status, watchers)
+    return 200, {"status": "ok"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        log.debug("Callback listener: " + format, *args)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        if parsed.path != CALLBACK_PATH:
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        token = (parse_qs(parsed.query).get("token") or [None])[0]
+        self._reply(*handle(body, token))
+
+
+def start_listener(port=None, host=None):
+    """
+    Start the standalone callback listener (once) on port, or on
+    JM_MINIMAX_CALLBACK_PORT. Returns its URL, or None when no port is set
+    or no JM_MINIMAX_CALLBACK_TOKEN is configured.
+    """
+    global _listener
+    port = port if port is not None else LISTENER_PORT
+    if port in (None, ""):
+        return None
+    if not TOKEN:
+        log.warning("⚠️ Video callback listener not started: set JM_MINIMAX_CALLBACK_TOKEN and add ?token=<value> to the callback URL")
+        return None
+    with _listener_lock:
+        if _listener is None:
+            try:
+                server = ThreadingHTTPServer((host or LISTENER_HOST, int(port)), _Handler)
+            except (OSError, ValueError) as e:
+                log.warning("⚠️ Could not start the video callback listener on port %s: %s", port, e)
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="jm-minimax-callbacks", daemon=True).start()
+            _listener = server
+            log.info("📮 Video callback listener on port %d (%s)", server.server_address[1], CALLBACK_PATH)
+    return listener_url()
+
+
+def listener_url():
+    if _listener is None:
+        return None
+    host, port = _listener.server_address[:2]
+    return f"http://{host}:{port}{CALLBACK_PATH}"
+
+
+def snapshot():
+    return dict(_counts, listener=listener_url(), callback_url=CALLBACK_URL or None)
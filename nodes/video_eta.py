@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import threading
+import folder_paths
+from .logger import get_logger
+
+log = get_logger("video_eta")
+
+# Where completion times are kept between runs (default <ComfyUI output>/minimax_video_stats.json)
+STATS_PATH = os.environ.get("JM_MINIMAX_VIDEO_STATS", "")
+
+# Completion times remembered per (model, resolution, duration); estimates
+# are only used once a profile has MIN_SAMPLES of them
+MAX_SAMPLES = 50
+MIN_SAMPLES = 3
+
+# Submissions whose completion has not been seen yet (oldest dropped first)
+MAX_SUBMISSIONS = 1000
+
+# Bounds for adaptive poll intervals, in seconds
+MIN_INTERVAL = 3.0
+MAX_INTERVAL = 300.0
+
+# Statuses of a task that has not started rendering yet
+WAITING_STATUSES = ("pending", "preparing", "queueing")
+
+
+def profile_key(model, resolution="", duration=""):
+    return f"{model}|{resolution}|{duration}"
+
+
+def quantile(ordered, fraction):
+    """Linear-interpolated quantile of a sorted list"""
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class VideoStats:
+    """
+    Completion-time history of video tasks, persisted as JSON. Submissions
+    are recorded with their profile (model, resolution, duration) and
+    submission time; when a task is seen finished, its time from submission
+    to success becomes a sample of that profile.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = {}
+        self.submissions = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.profiles = data.get("profiles") or {}
+            self.submissions = data.get("submissions") or {}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("⚠️ Ignoring unreadable video stats file %s: %s", path, e)
+
+    def _save(self):
+        data = {"profiles": self.profiles, "submissions": self.submissions}
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠️ Could not save video stats: %s", e)
+
+    def record_submission(self, task_id, model, resolution="", duration=""):
+        with self.lock:
+            self.submissions[str(task_id)] = {"profile": profile_key(model, resolution, duration),
+                                              "submitted": time.time()}
+            while len(self.submissions) > MAX_SUBMISSIONS:
+                del self.submissions[next(iter(self.submissions))]
+            self._save()
+
+    def submission(self, task_id):
+        with self.lock:
+            return self.submissions.get(str(task_id))
+
+    def record_completion(self, task_id):
+        """Turn a finished task's submission into a completion-time sample"""
+        with self.lock:
+            submission = self.submissions.pop(str(task_id), None)
+            if submission is None:
+                return None
+            seconds = round(time.time() - submission["submitted"], 1)
+            samples = self.profiles.setdefault(submission["profile"], [])
+            samples.append(seconds)
+            del samples[:-MAX_SAMPLES]
+            self._save()
+        log.debug("Recorded %.0fs completion for %s", seconds, submission["profile"])
+        return seconds
+
+    def estimate(self, profile):
+        """(early, typical, late) completion times: the 10th, 50th and 90th percentile"""
+        with self.lock:
+            samples = sorted(self.profiles.get(profile) or ())
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return quantile(samples, 0.1), quantile(samples, 0.5), quantile(samples, 0.9)
+
+    def summary(self):
+        result = {}
+        for profile in list(self.profiles):
+            estimate = self.estimate(profile)
+            result[profile] = {
+                "samples": len(self.profiles.get(profile) or ()),
+                "p10_seconds": round(estimate[0], 1) if estimate else None,
+                "p50_seconds": round(estimate[1], 1) if estimate else None,
+                "p90_seconds": round(estimate[2], 1) if estimate else None,
+            }
+        return result
+
+
+def next_interval(base, elapsed, status, estimate):
+    """
+    Seconds until the next status query of a task that is elapsed seconds
+    old. Without an estimate this is the fixed base interval. With one, the
+    task is left alone until its earliest typical finish, polled quickly
+    while a finish is likely, and backed off gradually once it is overdue.
+    Tasks still queued are polled at the base interval.
+    """
+    if estimate is None:
+        return base
+    early, _, late = estimate
+    fast = min(base, max(MIN_INTERVAL, base / 3))
+    if elapsed < early:
+        return min(MAX_INTERVAL, max(fast, early - elapsed))
+    if status.lower() in WAITING_STATUSES:
+        return base
+    if elapsed < late:
+        return fast
+    return min(MAX_INTERVAL, max(fast, base, (elapsed - late) / 4))
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """Return the shared completion-time history"""
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                path = STATS_PATH or os.path.join(folder_paths.get_output_directory(), "minimax_video_stats.json")
+                _stats = VideoStats(path)
+    return _stats
@@ -1,9 +1,20 @@
-import os
-import json
-import base64
+import sqlite3
 import requests
-from PIL import Image
-import folder_paths
+import contextvars
+import concurrent.futures
+from . import tracing
+from . import video_eta
+from . import task_journal
+from . import video_callbacks
+from . import image_encoding
+from .minimax_client import MiniMaxClient
+from .errors import base_resp_code, check_base_resp
+from .logger import get_logger, lazy_json
+
+log = get_logger("video")
+
+# Batch mode submits this many tasks at the same time (the rate limiter still applies)
+BATCH_SUBMIT_WORKERS = 8
 
 class MiniMaxVideoGeneration:
     """
@@ -16,7 +27,7 @@ class MiniMaxVideoGeneration:
     - Subject-referenced: Use S2V-01 model with subject_reference (future support)
     """
     def __init__(self):
-        self.api_url = "https://api.minimaxi.chat/v1/video_generation"
+        self.base_url = "https://api.minimaxi.chat/v1"
         
     @classmethod
     def INPUT_TYPES(cls):
@@ -51,7 +62,22 @@ class MiniMaxVideoGeneration:
                 "callback_url": ("STRING", {
                     "multiline": False, 
                     "default": "",
-                    "placeholder": "Optional: Callback URL for status updates"
+                    "placeholder": "Optional: Callback URL for status updates",
+                    "tooltip": "Public URL of the /jm-minimax/callback route; pushed statuses wake Check Video Status at once instead of waiting for the next poll. Defaults to JM_MINIMAX_CALLBACK_URL."
+                }),
+                "dedupe_key": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "Optional: key that identifies this submission",
+                    "tooltip": "Re-running with the same key, prompt, images, settings and API key reuses the task created earlier in this session instead of submitting again. Video submissions are billed, so timeouts and server errors are never retried; use reuse_existing_task to pick up a task after a restart."
+                }),
+                "reuse_existing_task": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Return the task of an identical earlier submission (same prompt, images and settings, from the task journal) instead of paying for a new one"
+                }),
+                "batch_mode": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Submit one video per image in the first/last frame batches (paired by position; a single image is used for every video) and return their task_ids one per line. Off uses only the first image of a batch."
                 }),
             }
         }
@@ -61,227 +87,213 @@ class MiniMaxVideoGeneration:
     FUNCTION = "generate_video"
     CATEGORY = "JM-MiniMax-API/Video"
 
-    def generate_video(self, api_key, model, prompt, prompt_optimizer, first_frame_image=None, last_frame_image=None, duration="6", resolution="768P", callback_url=""):
-        if not api_key:
-            raise ValueError("API Key must be provided")
+    @tracing.traced("MiniMaxVideoGeneration")
+    def generate_video(self, api_key, model, prompt, prompt_optimizer, first_frame_image=None, last_frame_image=None, duration="6", resolution="768P", callback_url="", dedupe_key="", reuse_existing_task=False, batch_mode=False):
+        if batch_mode:
+            batch_size = self._batch_size(first_frame_image, last_frame_image)
+            if batch_size > 1:
+                return self._generate_batch(batch_size, api_key, model, prompt, prompt_optimizer, first_frame_image,
+                                            last_frame_image, duration, resolution, callback_url, dedupe_key,
+                                            reuse_existing_task)
+        with tracing.span("validation"):
+            if not api_key:
+                raise ValueError("API Key must be provided")
 
-        # Check model requirements
-        i2v_models = ["I2V-01-Director", "I2V-01", "I2V-01-live"]
-        t2v_models = ["T2V-01-Director", "T2V-01"]
-        s2v_models = ["S2V-01"]
-        hailuo_models = ["MiniMax-Hailuo-02"]
+            # Check model requirements
+            i2v_models = ["I2V-01-Director", "I2V-01", "I2V-01-live"]
+            t2v_models = ["T2V-01-Director", "T2V-01"]
+            s2v_models = ["S2V-01"]
+            hailuo_models = ["MiniMax-Hailuo-02"]
         
-        # Determine if this is text-to-video or image-to-video mode
-        has_first_frame = first_frame_image is not None
-        has_last_frame = last_frame_image is not None
-        has_prompt = prompt.strip() != ""
+            # Determine if this is text-to-video or image-to-video mode
+            has_first_frame = first_frame_image is not None
+            has_last_frame = last_frame_image is not None
+            has_prompt = prompt.strip() != ""
         
-        # Mode detection
-        if not has_first_frame and not has_last_frame and has_prompt:
-            video_mode = "text-to-video"
-        elif has_first_frame or has_last_frame:
-            video_mode = "image-to-video"
-        else:
-            raise ValueError("Please provide either a text prompt (for text-to-video) or at least one image (for image-to-video).")
+            # Mode detection
+            if not has_first_frame and not has_last_frame and has_prompt:
+                video_mode = "text-to-video"
+            elif has_first_frame or has_last_frame:
+                video_mode = "image-to-video"
+            else:
+                raise ValueError("Please provide either a text prompt (for text-to-video) or at least one image (for image-to-video).")
         
-        print(f"📹 Video generation mode: {video_mode}")
+            log.debug("📹 Video generation mode: %s", video_mode)
         
-        # Validate model-specific requirements
-        if model in i2v_models and not has_first_frame:
-            raise ValueError(f"Model {model} requires a first frame image input. Please connect an image to the 'first_frame_image' input, or use a T2V model for text-to-video generation.")
+            # Validate model-specific requirements
+            if model in i2v_models and not has_first_frame:
+                raise ValueError(f"Model {model} requires a first frame image input. Please connect an image to the 'first_frame_image' input, or use a T2V model for text-to-video generation.")
         
-        if model in t2v_models and not has_prompt:
-            raise ValueError(f"Model {model} requires a text prompt. Please provide a description in the 'prompt' field.")
+            if model in t2v_models and not has_prompt:
+                raise ValueError(f"Model {model} requires a text prompt. Please provide a description in the 'prompt' field.")
 
-        # Validate MiniMax-Hailuo-02 specific requirements
-        if model in hailuo_models:
-            duration_int = int(duration)
+            # Validate MiniMax-Hailuo-02 specific requirements
+            if model in hailuo_models:
+                duration_int = int(duration)
             
-            # Check duration and resolution combinations
-            if duration_int == 10 and resolution == "1080P":
-                raise ValueError("MiniMax-Hailuo-02 model does not support 10s duration with 1080P resolution. Please use 512P or 768P for 10s duration or 6s for 1080P.")
+                # Check duration and resolution combinations
+                if duration_int == 10 and resolution == "1080P":
+                    raise ValueError("MiniMax-Hailuo-02 model does not support 10s duration with 1080P resolution. Please use 512P or 768P for 10s duration or 6s for 1080P.")
             
-            # For MiniMax-Hailuo-02, 512P resolution has special requirements
-            if resolution == "512P":
-                # 512P doesn't require first_frame_image for text-to-video mode
-                if video_mode == "image-to-video" and not has_first_frame:
-                    raise ValueError("MiniMax-Hailuo-02 model with 512P resolution in image-to-video mode requires a first frame image.")
+                # For MiniMax-Hailuo-02, 512P resolution has special requirements
+                if resolution == "512P":
+                    # 512P doesn't require first_frame_image for text-to-video mode
+                    if video_mode == "image-to-video" and not has_first_frame:
+                        raise ValueError("MiniMax-Hailuo-02 model with 512P resolution in image-to-video mode requires a first frame image.")
                 
-                # 512P doesn't support last_frame_image
-                if has_last_frame:
-                    raise ValueError("MiniMax-Hailuo-02 model does not support last_frame_image with 512P resolution. Please use 768P or 1080P resolution.")
+                    # 512P doesn't support last_frame_image
+                    if has_last_frame:
+                        raise ValueError("MiniMax-Hailuo-02 model does not support last_frame_image with 512P resolution. Please use 768P or 1080P resolution.")
         
-        # Validate last_frame_image is only used with MiniMax-Hailuo-02
-        if has_last_frame and model not in hailuo_models:
-            raise ValueError(f"last_frame_image is only supported by MiniMax-Hailuo-02 model, but current model is {model}.")
+            # Validate last_frame_image is only used with MiniMax-Hailuo-02
+            if has_last_frame and model not in hailuo_models:
+                raise ValueError(f"last_frame_image is only supported by MiniMax-Hailuo-02 model, but current model is {model}.")
         
-        # Validate duration for 01 series models
-        if model not in hailuo_models and duration != "6":
-            print(f"⚠️ Warning: Duration parameter is not applicable to {model}. Using default 6s duration.")
+            # Validate duration for 01 series models
+            if model not in hailuo_models and duration != "6":
+                log.warning("⚠️ Warning: Duration parameter is not applicable to %s. Using default 6s duration.", model)
             
-        # Validate resolution for 01 series models
-        if model not in hailuo_models and resolution != "768P":
-            print(f"⚠️ Warning: Resolution parameter is not applicable to {model}. 01 series models use fixed 720P resolution.")
+            # Validate resolution for 01 series models
+            if model not in hailuo_models and resolution != "768P":
+                log.warning("⚠️ Warning: Resolution parameter is not applicable to %s. 01 series models use fixed 720P resolution.", model)
 
         try:
-            # Prepare API request
-            headers = {
-                'authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            }
+            client = MiniMaxClient(api_key, base_url=self.base_url)
             
             # Build payload
-            payload = {
-                "model": model,
-                "prompt": prompt,
-                "prompt_optimizer": prompt_optimizer
-            }
-            
-            # Add duration and resolution for MiniMax-Hailuo-02
-            if model in hailuo_models:
-                payload["duration"] = int(duration)
-                payload["resolution"] = resolution
-            
-            # Helper function to convert ComfyUI image to base64
-            def convert_image_to_base64(image_tensor, image_name):
-                # Convert ComfyUI image tensor to PIL Image
-                if len(image_tensor.shape) == 4:  # Batch dimension
-                    # Take the first image from batch
-                    tensor = image_tensor[0]
-                else:
-                    tensor = image_tensor
-                
-                # Convert from tensor format (H, W, C) with values 0-1 to PIL Image
-                import torch
-                import numpy as np
-                
-                # Convert tensor to numpy array and scale to 0-255
-                if isinstance(tensor, torch.Tensor):
-                    image_np = tensor.cpu().numpy()
-                else:
-                    image_np = tensor
-                    
-                # Ensure values are in range 0-1, then scale to 0-255
-                image_np = np.clip(image_np, 0, 1)
-                image_np = (image_np * 255).astype(np.uint8)
-                
-                # Convert to PIL Image
-                pil_image = Image.fromarray(image_np)
-                
-                # Validate image dimensions
-                width, height = pil_image.size
-                aspect_ratio = width / height
-                
-                if aspect_ratio <= 2/5 or aspect_ratio >= 5/2:
-                    raise ValueError(f"{image_name} aspect ratio ({aspect_ratio:.2f}) must be between 2:5 and 5:2")
-                
-                min_dimension = min(width, height)
-                if min_dimension < 300:
-                    raise ValueError(f"{image_name} short side ({min_dimension}px) must be at least 300px")
-                
-                # Convert PIL Image to base64
-                import io
-                buffer = io.BytesIO()
-                
-                # Save as JPEG for API compatibility
-                if pil_image.mode in ('RGBA', 'LA', 'P'):
-                    # Convert to RGB for JPEG
-                    pil_image = pil_image.convert('RGB')
-                
-                pil_image.save(buffer, format='JPEG', quality=95)
-                buffer.seek(0)
-                
-                # Check file size (should be < 20MB)
-                file_size = buffer.getbuffer().nbytes
-                if file_size > 20 * 1024 * 1024:  # 20MB
-                    raise ValueError(f"{image_name} file size ({file_size/1024/1024:.1f}MB) exceeds 20MB limit")
-                
-                # Convert to base64
-                image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                
-                print(f"{image_name} converted to base64, size: {len(image_base64)} characters")
-                print(f"{image_name} dimensions: {width}x{height}, aspect ratio: {aspect_ratio:.2f}")
+            with tracing.span("payload_build"):
+                payload = {
+                    "model": model,
+                    "prompt": prompt,
+                    "prompt_optimizer": prompt_optimizer
+                }
                 
-                return f"data:image/jpeg;base64,{image_base64}"
+                # Add duration and resolution for MiniMax-Hailuo-02
+                if model in hailuo_models:
+                    payload["duration"] = int(duration)
+                    payload["resolution"] = resolution
             
-            # Handle first frame image
+            # Encode the frames concurrently, downscaled to the video's resolution
+            frames = []
             if first_frame_image is not None:
-                payload["first_frame_image"] = convert_image_to_base64(first_frame_image, "First frame image")
-            
-            # Handle last frame image (only for MiniMax-Hailuo-02)
+                frames.append((first_frame_image, "First frame image", "first_frame"))
+            # Last frame image is only for MiniMax-Hailuo-02
             if last_frame_image is not None:
-                payload["last_frame_image"] = convert_image_to_base64(last_frame_image, "Last frame image")
+                frames.append((last_frame_image, "Last frame image", "last_frame"))
+            encoded = image_encoding.encode_images(frames, resolution if model in hailuo_models else None)
+            for (_, _, label), data_url in zip(frames, encoded):
+                payload[f"{label}_image"] = data_url
             
             # Add optional callback URL if provided
-            if callback_url.strip():
-                payload["callback_url"] = callback_url.strip()
+            callback_url = callback_url.strip() or video_callbacks.CALLBACK_URL
+            if callback_url:
+                payload["callback_url"] = callback_url
             
-            print(f"Sending request to {self.api_url}")
-            print(f"Model: {model}")
-            print(f"Prompt: {prompt}")
-            print(f"Prompt optimizer: {prompt_optimizer}")
+            log.debug("Sending request to %s/video_generation", self.base_url)
+            log.debug("Model: %s", model)
+            log.debug("Prompt: %s", prompt)
+            log.debug("Prompt optimizer: %s", prompt_optimizer)
             if model in hailuo_models:
-                print(f"Duration: {duration}s")
-                print(f"Resolution: {resolution}")
+                log.debug("Duration: %ss", duration)
+                log.debug("Resolution: %s", resolution)
             if first_frame_image is not None:
-                print(f"First frame image: provided")
+                log.debug("First frame image: provided")
             if last_frame_image is not None:
-                print(f"Last frame image: provided")
+                log.debug("Last frame image: provided")
             if callback_url:
-                print(f"Callback URL: {callback_url}")
+                log.debug("Callback URL: %s", callback_url)
             
-            # Make API request
-            response = requests.post(
-                self.api_url,
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=30
-            )
+            digest = task_journal.payload_hash(payload)
+            if reuse_existing_task:
+                try:
+                    existing = task_journal.get_journal().find_reusable(digest, api_key)
+                except sqlite3.Error as e:
+                    log.warning("⚠️ Could not read the task journal: %s", e)
+                    existing = None
+                if existing:
+                    log.info("♻️ Reusing video task %s (%s) from an identical submission", existing["task_id"], existing["status"])
+                    task_journal.resume(api_key)
+                    return (existing["task_id"],)
             
-            print(f"Response status code: {response.status_code}")
-            
-            try:
-                response_data = response.json()
-                print(f"Response data: {json.dumps(response_data, indent=2)}")
-            except json.JSONDecodeError:
-                print(f"Raw response content: {response.content}")
-                raise RuntimeError("Failed to decode JSON response")
+            # Make API request
+            response_data = client.submit_video(payload, dedupe_key=dedupe_key.strip() or None)
+            log.debug("Response data: %s", lazy_json(response_data))
             
             # Check for API errors
-            base_resp = response_data.get("base_resp", {})
-            status_code = base_resp.get("status_code")
-            status_msg = base_resp.get("status_msg", "Unknown error")
+            status_code, status_msg = base_resp_code(response_data)
             
-            if status_code != 0:
-                error_messages = {
-                    1002: "Rate limit exceeded, please try again later",
-                    1004: "Authentication failed, please check your API key",
-                    1008: "Insufficient account balance",
-                    1026: "Video description contains sensitive content, please adjust",
-                    2013: "Invalid parameters, please check your input",
-                    2049: "Invalid API key, please check your API key"
-                }
-                
-                # Special handling for group_id access issues
-                if status_code == 2013 and "group_id can not access video 02" in status_msg:
-                    error_msg = "Your API key/account does not have access to MiniMax-Hailuo-02 model. Please check your account permissions or contact MiniMax support to enable access to the 02 series models."
-                else:
-                    error_msg = error_messages.get(status_code, f"API Error {status_code}: {status_msg}")
-                
-                raise RuntimeError(error_msg)
+            # Special handling for group_id access issues
+            if status_code == 2013 and "group_id can not access video 02" in status_msg:
+                raise RuntimeError("Your API key/account does not have access to MiniMax-Hailuo-02 model. Please check your account permissions or contact MiniMax support to enable access to the 02 series models.")
+            
+            check_base_resp(response_data, overrides={1026: "Video description contains sensitive content, please adjust"})
             
             # Extract task_id
             task_id = response_data.get("task_id")
             if not task_id:
                 raise RuntimeError("No task_id returned from API")
             
-            print(f"Video generation task created successfully, task_id: {task_id}")
+            log.info("Video generation task created successfully, task_id: %s", task_id)
+            
+            # Remembered so status polling can predict when this kind of video is usually ready
+            if model in hailuo_models:
+                video_eta.get_stats().record_submission(task_id, model, resolution, duration)
+            else:
+                video_eta.get_stats().record_submission(task_id, model)
+            
+            try:
+                task_journal.get_journal().record_submission(task_id, digest, api_key, self.base_url, model)
+            except sqlite3.Error as e:
+                log.warning("⚠️ Could not record task %s in the task journal: %s", task_id, e)
+            task_journal.resume(api_key)
             
             return (task_id,)
 
         except requests.exceptions.RequestException as e:
-            print(f"Request error: {str(e)}")
+            log.error("Request error: %s", e)
             raise RuntimeError(f"Failed to connect to MiniMax API: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
-            raise RuntimeError(f"Video generation failed: {str(e)}") 
\ No newline at end of file
+            log.error("Unexpected error: %s", e)
+            raise RuntimeError(f"Video generation failed: {str(e)}") 
+
+    @staticmethod
+    def _batch_size(first_frame_image, last_frame_image):
+        sizes = [image.shape[0] for image in (first_frame_image, last_frame_image)
+                 if image is not None and len(image.shape) == 4]
+        batched = [size for size in sizes if size > 1]
+        if len(set(batched)) > 1:
+            raise ValueError(f"first_frame_image and last_frame_image batches must be the same size (or a single image), got {sizes[0]} and {sizes[1]}")
+        return batched[0] if batched else 1
+
+    def _generate_batch(self, batch_size, api_key, model, prompt, prompt_optimizer, first_frame_image,
+                        last_frame_image, duration, resolution, callback_url, dedupe_key, reuse_existing_task):
+        """Submit one task per batch element concurrently; returns their task_ids newline-joined in batch order"""
+        def frame(image, index):
+            if image is None or len(image.shape) != 4 or image.shape[0] == 1:
+                return image
+            return image[index:index + 1]
+
+        def submit_one(index):
+            key = f"{dedupe_key.strip()}-{index}" if dedupe_key.strip() else ""
+            return self.generate_video(api_key, model, prompt, prompt_optimizer, frame(first_frame_image, index),
+                                       frame(last_frame_image, index), duration, resolution, callback_url, key,
+                                       reuse_existing_task)[0]
+
+        log.info("📹 Submitting %d videos from the image batch", batch_size)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(batch_size, BATCH_SUBMIT_WORKERS),
+                                                   thread_name_prefix="jm-minimax-video-batch") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, submit_one, index) for index in range(batch_size)]
+            concurrent.futures.wait(futures)
+
+        task_ids = [future.result() if future.exception() is None else "" for future in futures]
+        failed = [(index, future.exception()) for index, future in enumerate(futures) if future.exception() is not None]
+        if failed:
+            submitted = [task_id for task_id in task_ids if task_id]
+            if submitted:
+                # These tasks are already billed; a dedupe_key or reuse_existing_task picks them up on a re-run
+                log.warning("⚠️ %d of %d videos were submitted before the failure: %s", len(submitted), batch_size,
+                            ", ".join(submitted))
+            index, error = failed[0]
+            raise RuntimeError(f"{len(failed)} of {batch_size} video submissions failed (first: image {index + 1}: {error})")
+        log.info("Video generation tasks created successfully: %d", batch_size)
+        return ("\n".join(task_ids),)
@@ -0,0 +1,260 @@
+import json
+import time
+import contextvars
+import concurrent.futures
+from . import tracing
+from . import poll_scheduler
+from .progress import Progress
+from .video_generation import MiniMaxVideoGeneration
+from .download_video import fetch_video
+from .minimax_client import submit
+from .logger import get_logger
+
+log = get_logger("video_pipeline")
+
+_MODELS = ["T2V-01-Director", "T2V-01", "I2V-01-Director", "I2V-01", "I2V-01-live", "S2V-01", "MiniMax-Hailuo-02"]
+
+
+def _shared_inputs():
+    """Optional inputs common to the single and batch pipeline nodes"""
+    return {
+        "first_frame_image": ("IMAGE", {"tooltip": "Used for every video; see Video Generation"}),
+        "last_frame_image": ("IMAGE", {"tooltip": "Only supported by MiniMax-Hailuo-02; see Video Generation"}),
+        "duration": (["6", "10"], {"default": "6"}),
+        "resolution": (["512P", "768P", "1080P"], {"default": "768P"}),
+        "check_interval": ("INT", {"default": 30, "min": 10, "max": 300, "step": 5, "tooltip": "Check interval in seconds"}),
+        "max_wait_time": ("INT", {"default": 1800, "min": 300, "max": 7200, "step": 300, "tooltip": "Maximum render time per video in seconds"}),
+        "filename_prefix": ("STRING", {"default": "minimax_video", "multiline": False}),
+        "adaptive_polling": ("BOOLEAN", {"default": True}),
+        "reuse_existing_task": ("BOOLEAN", {
+            "default": False,
+            "tooltip": "Reuse the task of an identical earlier submission from the task journal instead of submitting again"
+        }),
+    }
+
+
+class VideoJob:
+    """One prompt on its way through submit, render and download"""
+    def __init__(self, index, prompt):
+        self.index = index
+        self.prompt = prompt
+        self.task_id = ""
+        self.status = "Pending"
+        self.file_id = ""
+        self.video_path = ""
+        self.error = ""
+        self.started = time.monotonic()
+        self.timings = {}
+        self.finished_at = None
+        self.future = concurrent.futures.Future()
+
+    def mark(self, stage):
+        self.timings[stage] = round(time.monotonic() - self.started, 2)
+
+    def finish(self, error=None):
+        if self.future.done():
+            return
+        if error is not None:
+            self.error = str(error)
+            if self.status.lower() not in poll_scheduler.TERMINAL_STATUSES:
+                self.status = "Error"
+        self.finished_at = time.monotonic()
+        self.future.set_result(self)
+
+    def entry(self):
+        return {"index": self.index, "prompt": self.prompt, "task_id": self.task_id, "status": self.status,
+                "file_id": self.file_id, "video_path": self.video_path, "error": self.error,
+                "seconds": self.timings}
+
+
+def run_pipeline(api_key, base_url, jobs, submit_job, check_interval=30, max_wait_time=1800,
+                 filename_prefix="minimax_video", adaptive_polling=True, max_parallel_submits=4):
+    """
+    Move every job through submit -> render -> download with the stages of
+    different jobs overlapping: submissions run in a small thread pool, each
+    task is handed to the poll scheduler as soon as it exists, and the
+    moment a task succeeds its file is retrieved and streamed to disk on the
+    shared event loop while the other tasks keep rendering. Yields the jobs
+    in the order they finish.
+    """
+    scheduler = poll_scheduler.get_scheduler()
+
+    def downloaded(job, future):
+        try:
+            error = future.exception()
+            if error is None:
+                job.video_path = future.result()
+                job.mark("downloaded")
+            else:
+                log.warning("⚠️ Download of task %s failed: %s", job.task_id, error)
+        except Exception as e:
+            error = e
+        job.finish(error)
+
+    def rendered(job, task):
+        try:
+            error = task.future.exception()
+            if error is not None:
+                job.status = task.status
+                log.warning("⚠️ Video task %s failed: %s", job.task_id, error)
+                return job.finish(error)
+            job.status = task.result.get("status", task.status)
+            job.file_id = str(task.result.get("file_id") or "")
+            job.mark("rendered")
+            if not job.file_id:
+                return job.finish(RuntimeError(f"Video task {job.task_id} finished without a file_id"))
+            # Retrieve and download right away, while the other tasks are still polled
+            prefix = f"{filename_prefix}_{job.task_id}" if len(jobs) > 1 else filename_prefix
+            fetch = submit(fetch_video(api_key, base_url, job.file_id, prefix, task_id=job.task_id))
+            fetch.add_done_callback(lambda future: downloaded(job, future))
+        except Exception as e:
+            # A done-callback that raises is only logged by the future, so the
+            # job must be finished here or the pipeline waits for it forever
+            log.warning("⚠️ Video task %s could not be downloaded: %s", job.task_id, e)
+            job.finish(e)
+
+    def start(job):
+        try:
+            job.task_id = submit_job(job)
+        except Exception as e:
+            log.warning("⚠️ Submission %d failed: %s", job.index + 1, e)
+            return job.finish(e)
+        job.mark("submitted")
+        task = scheduler.watch(api_key, base_url, job.task_id, interval=check_interval,
+                               max_wait=max_wait_time, adaptive=adaptive_polling)
+        task.future.add_done_callback(lambda _: rendered(job, task))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_parallel_submits, len(jobs))),
+                                               thread_name_prefix="jm-minimax-video-submit") as pool:
+        for job in jobs:
+            pool.submit(contextvars.copy_context().run, start, job)
+        # Submissions are cheap compared to rendering, so one render time plus
+        # a margin bounds the wait for all of them
+        yield from poll_scheduler.as_completed(jobs, timeout=max_wait_time + 60 * len(jobs))
+
+
+class MiniMaxVideoPipeline:
+    """
+    MiniMax video pipeline node for ComfyUI
+    Generates a video, waits for it and downloads it in one node; the file
+    is retrieved and streamed to disk the moment the task succeeds
+    """
+    def __init__(self):
+        self.base_url = "https://api.minimaxi.chat/v1"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "api_key": ("STRING", {"multiline": False}),
+                "model": (_MODELS, {"default": "MiniMax-Hailuo-02"}),
+                "prompt": ("STRING", {"multiline": True, "default": "", "placeholder": "Describe the video (max 2000 characters)"}),
+                "prompt_optimizer": ("BOOLEAN", {"default": True}),
+            },
+            "optional": _shared_inputs(),
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING")
+    RETURN_NAMES = ("video_path", "task_id", "file_id")
+    FUNCTION = "generate"
+    CATEGORY = "JM-MiniMax-API/Video"
+
+    def _submit_job(self, api_key, model, prompt_optimizer, first_frame_image, last_frame_image,
+                    duration, resolution, reuse_existing_task):
+        generator = MiniMaxVideoGeneration()
+        generator.base_url = self.base_url
+
+        def submit_job(job):
+            return generator.generate_video(api_key, model, job.prompt, prompt_optimizer, first_frame_image,
+                                            last_frame_image, duration, resolution,
+                                            reuse_existing_task=reuse_existing_task)[0]
+        return submit_job
+
+    @tracing.traced("MiniMaxVideoPipeline")
+    def generate(self, api_key, model, prompt, prompt_optimizer, first_frame_image=None, last_frame_image=None,
+                 duration="6", resolution="768P", check_interval=30, max_wait_time=1800,
+                 filename_prefix="minimax_video", adaptive_polling=True, reuse_existing_task=False):
+        if not api_key:
+            raise ValueError("API Key must be provided")
+        job = VideoJob(0, prompt)
+        submit_job = self._submit_job(api_key, model, prompt_optimizer, first_frame_image, last_frame_image,
+                                      duration, resolution, reuse_existing_task)
+        for _ in run_pipeline(api_key, self.base_url, [job], submit_job, check_interval, max_wait_time,
+                              filename_prefix, adaptive_polling):
+            pass
+        if job.error:
+            raise RuntimeError(f"Video pipeline failed: {job.error}")
+        log.info("🎬 Video ready in %.0fs: %s", job.timings.get("downloaded", 0), job.video_path)
+        return (job.video_path, job.task_id, job.file_id)
+
+
+class BatchVideoPipeline(MiniMaxVideoPipeline):
+    """
+    MiniMax batch video pipeline node for ComfyUI
+    Runs one generate -> wait -> download pipeline per prompt with the
+    stages overlapping across prompts: later prompts are submitted while
+    earlier ones render, and finished videos download while the rest are
+    still being polled
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        optional = _shared_inputs()
+        optional.update({
+            "max_parallel_submits": ("INT", {"default": 4, "min": 1, "max": 16, "step": 1,
+                                             "tooltip": "How many submissions (image encoding and upload) run at the same time"}),
+            "continue_on_error": ("BOOLEAN", {
+                "default": True,
+                "tooltip": "Report failed prompts in the results and keep going; off fails the node if any prompt fails"
+            }),
+        })
+        return {
+            "required": {
+                "api_key": ("STRING", {"multiline": False}),
+                "model": (_MODELS, {"default": "MiniMax-Hailuo-02"}),
+                "prompts": ("STRING", {"multiline": True, "default": "", "placeholder": "One video prompt per line"}),
+                "prompt_optimizer": ("BOOLEAN", {"default": True}),
+            },
+            "optional": optional,
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("video_paths", "task_ids", "statuses", "results_json")
+    FUNCTION = "generate_batch"
+
+    @tracing.traced("BatchVideoPipeline")
+    def generate_batch(self, api_key, model, prompts, prompt_optimizer, first_frame_image=None, last_frame_image=None,
+                       duration="6", resolution="768P", check_interval=30, max_wait_time=1800,
+                       filename_prefix="minimax_video", adaptive_polling=True, reuse_existing_task=False,
+                       max_parallel_submits=4, continue_on_error=True):
+        """
+        Generate one video per non-empty line of prompts. Outputs are
+        newline-joined in prompt order; results_json also records when each
+        video was submitted, rendered and downloaded.
+        """
+        lines = [line.strip() for line in prompts.splitlines() if line.strip()]
+        if not api_key or not lines:
+            raise ValueError("API Key and at least one prompt must be provided")
+        jobs = [VideoJob(index, line) for index, line in enumerate(lines)]
+        submit_job = self._submit_job(api_key, model, prompt_optimizer, first_frame_image, last_frame_image,
+                                      duration, resolution, reuse_existing_task)
+        log.info("🎬 Running %d video pipelines", len(jobs))
+        progress = Progress(len(jobs))
+        start = time.monotonic()
+        for job in run_pipeline(api_key, self.base_url, jobs, submit_job, check_interval, max_wait_time,
+                                filename_prefix, adaptive_polling, max_parallel_submits):
+            if not job.error:
+                log.info("✅ Video %d/%d ready: %s", job.index + 1, len(jobs), job.video_path)
+            progress.advance()
+
+        failed = [job for job in jobs if job.error]
+        if failed and (not continue_on_error or len(failed) == len(jobs)):
+            raise RuntimeError(f"{len(failed)} of {len(jobs)} video pipelines failed "
+                               f"(first: prompt {failed[0].index + 1}: {failed[0].error})")
+        log.info("🎬 Batch finished: %d/%d videos in %.0fs", len(jobs) - len(failed), len(jobs), time.monotonic() - start)
+
+        return (
+            "\n".join(job.video_path for job in jobs),
+            "\n".join(job.task_id for job in jobs),
+            "\n".join(job.status for job in jobs),
+            json.dumps([job.entry() for job in jobs], ensure_ascii=False, indent=2),
+        )
@@ -1,7 +1,10 @@
 import os
-import json
 import requests
-import folder_paths
+from . import tracing
+from .minimax_client import MiniMaxClient
+from .logger import get_logger, lazy_json
+
+log = get_logger("voice_clone")
 
 class VoiceCloning:
     """
@@ -46,48 +49,29 @@ class VoiceCloning:
     FUNCTION = "clone_voice"
     CATEGORY = "JM-MiniMax-API/Speech"
 
+    @tracing.traced("VoiceCloning")
     def clone_voice(self, api_key, group_id, audio_file, voice_id, need_noise_reduction, need_volume_normalization, 
                    preview_text, model, accuracy):
-        if not api_key:
-            raise ValueError("API Key must be provided")
+        with tracing.span("validation"):
+            if not api_key:
+                raise ValueError("API Key must be provided")
             
-        if not group_id:
-            raise ValueError("Group ID must be provided")
+            if not group_id:
+                raise ValueError("Group ID must be provided")
             
-        if not os.path.exists(audio_file):
-            raise ValueError(f"Audio file not found: {audio_file}")
+            if not os.path.exists(audio_file):
+                raise ValueError(f"Audio file not found: {audio_file}")
             
-        if len(voice_id) < 8 or not voice_id[0].isalpha() or not any(c.isdigit() for c in voice_id):
-            raise ValueError("Voice ID must be at least 8 characters, start with a letter, and include numbers")
+            if len(voice_id) < 8 or not voice_id[0].isalpha() or not any(c.isdigit() for c in voice_id):
+                raise ValueError("Voice ID must be at least 8 characters, start with a letter, and include numbers")
 
         try:
             # Step 1: Upload audio file
-            print(f"Uploading audio file: {audio_file}")
-            upload_url = f"{self.base_url}/files/upload?GroupId={group_id}"
-            
-            headers = {
-                'authority': 'api.minimaxi.chat',
-                'Authorization': f'Bearer {api_key}'
-            }
+            log.debug("Uploading audio file: %s", audio_file)
+            client = MiniMaxClient(api_key, base_url=self.base_url, group_id=group_id)
+            upload_data = client.upload_file(audio_file, purpose="voice_clone")
             
-            data = {
-                'purpose': 'voice_clone'
-            }
-            
-            files = {
-                'file': open(audio_file, 'rb')
-            }
-
-            upload_response = requests.post(
-                upload_url,
-                headers=headers,
-                data=data,
-                files=files
-            )
-            upload_response.raise_for_status()
-            upload_data = upload_response.json()
-            
-            print(f"Upload response: {json.dumps(upload_data, indent=2)}")
+            log.debug("Upload response: %s", lazy_json(upload_data))
             
             # Get file_id from the correct path in response
             file_id = upload_data.get("file", {}).get("file_id")
@@ -95,9 +79,7 @@ class VoiceCloning:
                 raise RuntimeError("No file_id returned from upload")
 
             # Step 2: Clone voice
-            print(f"Cloning voice with file_id: {file_id}")
-            clone_url = f"{self.base_url}/voice_clone?GroupId={group_id}"
-            
+            log.debug("Cloning voice with file_id: %s", file_id)
             clone_payload = {
                 "file_id": file_id,
                 "voice_id": voice_id,
@@ -109,43 +91,33 @@ class VoiceCloning:
             # Add optional preview text and model if preview text is provided
             if preview_text.strip():
                 if len(preview_text) > 300:
-                    print("Warning: Preview text exceeds 300 characters, it will be truncated")
+                    log.warning("Warning: Preview text exceeds 300 characters, it will be truncated")
                     preview_text = preview_text[:300]
                 clone_payload["text"] = preview_text
                 clone_payload["model"] = model
 
-            clone_headers = {
-                'authorization': f'Bearer {api_key}',
-                'content-type': 'application/json'
-            }
-
-            clone_response = requests.post(
-                clone_url,
-                headers=clone_headers,
-                data=json.dumps(clone_payload)
-            )
-            clone_response.raise_for_status()
-            clone_data = clone_response.json()
+            clone_data = client.post_json("voice_clone", clone_payload)
             
-            print(f"Clone response: {json.dumps(clone_data, indent=2)}")
+            log.debug("Clone response: %s", lazy_json(clone_data))
             
             if clone_data.get("base_resp", {}).get("status_code") != 0:
                 raise RuntimeError(f"Voice cloning failed: {clone_data.get('base_resp', {}).get('status_msg', 'Unknown error')}")
                 
             if clone_data.get("input_sensitive", False):
-                print(f"Warning: Input audio triggered sensitivity check (type: {clone_data.get('input_sensitive_type', 'unknown')})")
+                log.warning("Warning: Input audio triggered sensitivity check (type: %s)", clone_data.get('input_sensitive_type', 'unknown'))
 
+            log.info("Voice cloned successfully, voice_id: %s", voice_id)
             return (voice_id,)
 
         except requests.exceptions.RequestException as e:
-            print(f"API request failed: {str(e)}")
+            log.error("API request failed: %s", e)
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_data = e.response.json()
-                    print(f"Error response: {json.dumps(error_data, indent=2)}")
-                except:
-                    print(f"Error response content: {e.response.content}")
+                    log.debug("Error response: %s", lazy_json(error_data))
+                except ValueError:
+                    log.debug("Error response content: %r", e.response.content[:1024])
             raise RuntimeError(f"API request failed: {str(e)}")
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            log.error("Unexpected error: %s", e)
             raise RuntimeError(f"Voice cloning failed: {str(e)}") 
\ No newline at end of file
@@ -1,55 +1,24 @@
+import io
 import os
-import json
 import time
 import requests
 import folder_paths
+from . import metrics
+from . import tracing
+from . import audio_decoder
+from . import audio_tensor
+from .minimax_client import MiniMaxClient
+from .logger import get_logger, lazy_json
+
+log = get_logger("voice_design")
 
 class VoiceDesign:
     """
     MiniMax Voice Design node for ComfyUI - Generate custom voices from text descriptions
     """
     def __init__(self):
-        self.api_base = "https://api.minimax.io/v1/voice_design"
-        
-    def _detect_audio_format(self, audio_data):
-        """
-        检测音频数据的格式
-        通过文件头部的魔术字节来识别音频格式
-        """
-        if not audio_data or len(audio_data) < 12:
-            return "bin"  # 数据不足，使用通用二进制扩展名
-        
-        # 检查常见音频格式的文件头
-        header = audio_data[:12]
-        
-        # WAV 格式: RIFF....WAVE
-        if header.startswith(b'RIFF') and header[8:12] == b'WAVE':
-            return "wav"
-        
-        # MP3 格式: ID3 标签或 MPEG 帧头
-        if header.startswith(b'ID3') or header.startswith(b'\xff\xfb'):
-            return "mp3"
-        
-        # FLAC 格式: fLaC
-        if header.startswith(b'fLaC'):
-            return "flac"
-        
-        # OGG 格式: OggS
-        if header.startswith(b'OggS'):
-            return "ogg"
-        
-        # AAC 格式: ADTS 头部
-        if len(audio_data) >= 2 and (audio_data[0] == 0xff and (audio_data[1] & 0xf0) == 0xf0):
-            return "aac"
+        self.base_url = "https://api.minimax.io/v1"
         
-        # M4A/MP4 格式: ftyp
-        if b'ftyp' in header[:8]:
-            return "m4a"
-        
-        # 默认返回wav（最常见的格式）
-        print("⚠️ 无法识别音频格式，默认使用wav")
-        return "wav"
-
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -72,37 +41,43 @@ class VoiceDesign:
                     "default": "",
                     "placeholder": "自定义音色ID（可选）。如果为空，将自动生成唯一ID"
                 }),
+                "save_to_disk": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "是否将试听音频保存到输出目录。关闭后试听音频只通过AUDIO输出返回"
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING")
-    RETURN_NAMES = ("voice_id", "trial_audio")
+    RETURN_TYPES = ("STRING", "STRING", "AUDIO")
+    RETURN_NAMES = ("voice_id", "trial_audio", "trial_audio_waveform")
     FUNCTION = "design_voice"
     CATEGORY = "JM-MiniMax-API/Speech"
 
-    def design_voice(self, api_key, prompt, preview_text, custom_voice_id=""):
+    @tracing.traced("VoiceDesign")
+    def design_voice(self, api_key, prompt, preview_text, custom_voice_id="", save_to_disk=True, audio_output=True):
+        """
+        audio_output is not a node input: callers that only need the saved
+        trial file can pass False so the decoded audio is never held in memory.
+        """
         if not api_key:
             raise ValueError("API Key must be provided")
         
         if not prompt.strip():
             raise ValueError("音色描述不能为空")
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        }
+        client = MiniMaxClient(api_key, base_url=self.base_url)
 
         # 生成或使用自定义voice_id
         if custom_voice_id and custom_voice_id.strip():
             voice_id = custom_voice_id.strip()
-            print(f"🎯 使用自定义音色ID: {voice_id}")
+            log.debug("🎯 使用自定义音色ID: %s", voice_id)
         else:
             # 自动生成唯一的voice_id
             import uuid
             current_timestamp = int(time.time())
             unique_id = str(uuid.uuid4()).replace('-', '')[:8]
             voice_id = f"voice_{current_timestamp}_{unique_id}"
-            print(f"🔄 自动生成音色ID: {voice_id}")
+            log.debug("🔄 自动生成音色ID: %s", voice_id)
 
         # 构建请求数据
         payload = {
@@ -115,24 +90,13 @@ class VoiceDesign:
             payload["preview_text"] = preview_text.strip()
 
         try:
-            print(f"🎙️ Voice Design: 正在根据描述生成定制音色")
-            print(f"📝 音色描述: {prompt}")
+            log.debug("🎙️ Voice Design: 正在根据描述生成定制音色")
+            log.debug("📝 音色描述: %s", prompt)
             if preview_text:
-                print(f"🔊 预览文本: {preview_text}")
-            
-            response = requests.post(self.api_base, headers=headers, json=payload)
-            print(f"📡 API响应状态: {response.status_code}")
-            
-            # 检查HTTP状态码
-            response.raise_for_status()
+                log.debug("🔊 预览文本: %s", preview_text)
             
-            try:
-                resp_data = response.json()
-                print(f"📋 API响应: {json.dumps(resp_data, indent=2, ensure_ascii=False)}")
-            except json.JSONDecodeError:
-                print(f"❌ 无法解析JSON响应")
-                print(f"原始响应: {response.content}")
-                raise RuntimeError("无法解析API响应")
+            resp_data = client.post_json("voice_design", payload)
+            log.debug("📋 API响应: %s", lazy_json(resp_data))
             
             # 检查API错误响应
             if "base_resp" in resp_data:
@@ -146,21 +110,22 @@ class VoiceDesign:
             # 检查API返回的音色ID（应该与我们发送的一致）
             returned_voice_id = resp_data.get("voice_id")
             if returned_voice_id:
-                print(f"✅ API确认音色ID: {returned_voice_id}")
+                log.debug("✅ API确认音色ID: %s", returned_voice_id)
                 # 使用API返回的voice_id（可能与发送的稍有不同）
                 final_voice_id = returned_voice_id
             else:
                 # 如果API没有返回voice_id，使用我们发送的
-                print(f"ℹ️ API未返回voice_id，使用发送的ID")
+                log.debug("ℹ️ API未返回voice_id，使用发送的ID")
                 final_voice_id = voice_id
             
-            print(f"✅ 音色生成成功！最终音色ID: {final_voice_id}")
+            log.info("✅ 音色生成成功！最终音色ID: %s", final_voice_id)
             
             # 处理试听音频（如果有）
             trial_audio_path = ""
+            trial_audio_waveform = None
             trial_audio = resp_data.get("trial_audio")
             if trial_audio:
-                print(f"🎵 检测到试听音频")
+                log.debug("🎵 检测到试听音频")
                 
                 # 创建输出目录
                 output_dir = folder_paths.get_output_directory()
@@ -170,55 +135,69 @@ class VoiceDesign:
                 timestamp = time.strftime("%Y%m%d-%H%M%S")
                 
                 try:
+                    # 内存中的音频只在需要AUDIO输出（或不保存文件）时构建
+                    keep_audio = audio_output or not save_to_disk
+                    audio_data = None
                     # 根据官方文档，trial_audio是hex编码的音频数据
                     if trial_audio.startswith("http"):
                         # 如果是URL，下载文件
-                        print(f"📥 下载试听音频: {trial_audio}")
-                        audio_response = requests.get(trial_audio)
-                        audio_response.raise_for_status()
-                        audio_data = audio_response.content
+                        log.debug("📥 下载试听音频: %s", trial_audio)
+                        audio_buffer = io.BytesIO()
+                        with tracing.span("audio_download"):
+                            client.download(trial_audio, audio_buffer)
+                        audio_data = audio_buffer.getbuffer()
+                        audio_format = audio_decoder.detect_audio_format(audio_data)
                     else:
-                        # hex编码的音频数据，需要解码
-                        print(f"🔓 解码hex编码的音频数据")
-                        try:
-                            audio_data = bytes.fromhex(trial_audio)
-                        except ValueError as hex_error:
-                            print(f"⚠️ hex解码失败，尝试base64解码: {hex_error}")
-                            # 兼容性处理：如果hex解码失败，尝试base64
-                            import base64
-                            audio_data = base64.b64decode(trial_audio)
-                    
-                    # 检测音频格式
-                    audio_format = self._detect_audio_format(audio_data)
-                    print(f"🎼 检测到音频格式: {audio_format}")
-                    
-                    # 根据检测到的格式设置文件扩展名
-                    trial_filename = f"voice_design_trial_{final_voice_id}_{timestamp}.{audio_format}"
-                    trial_filepath = os.path.join(output_dir, trial_filename)
+                        # hex编码的音频数据（兼容base64），只解码开头来检测格式
+                        encoding = audio_decoder.detect_encoding(trial_audio)
+                        audio_format = audio_decoder.detect_audio_format(audio_decoder.decode_head(trial_audio, encoding))
+                    log.debug("🎼 检测到音频格式: %s", audio_format)
                     
-                    # 保存音频文件
-                    with open(trial_filepath, "wb") as f:
-                        f.write(audio_data)
+                    if save_to_disk:
+                        # 根据检测到的格式设置文件扩展名
+                        trial_filename = f"voice_design_trial_{final_voice_id}_{timestamp}.{audio_format}"
+                        trial_filepath = os.path.join(output_dir, trial_filename)
+                        
+                        # 保存音频文件：hex数据分片解码后直接写入文件
+                        if audio_data is None:
+                            log.debug("🔓 解码%s编码的音频数据到文件", encoding)
+                            audio_data = audio_decoder.decode_to_file(trial_audio, trial_filepath, encoding,
+                                                                      keep=keep_audio, node="voice_design")
+                        else:
+                            with tracing.span("file_write"), metrics.timer(metrics.FILE_WRITE_SECONDS, node="voice_design"):
+                                with open(trial_filepath, "wb") as f:
+                                    f.write(audio_data)
+                        
+                        trial_audio_path = os.path.abspath(trial_filepath)
+                        log.info("💾 试听音频保存至: %s", trial_audio_path)
+                    elif audio_data is None:
+                        log.debug("🔓 解码%s编码的音频数据", encoding)
+                        audio_data = audio_decoder.decode_bytes(trial_audio, encoding, node="voice_design")
                     
-                    trial_audio_path = os.path.abspath(trial_filepath)
-                    print(f"💾 试听音频保存至: {trial_audio_path}")
+                    # 直接从解码后的数据构建AUDIO输出
+                    if keep_audio:
+                        with tracing.span("audio_tensor"):
+                            trial_audio_waveform = audio_tensor.audio_output(audio_data, audio_format, required=not save_to_disk)
                     
                 except Exception as audio_error:
-                    print(f"⚠️ 保存试听音频时出错: {str(audio_error)}")
+                    if not save_to_disk:
+                        # 不保存文件时AUDIO是唯一的试听输出，失败必须报错
+                        raise
+                    log.warning("⚠️ 保存试听音频时出错: %s", audio_error)
                     # 不要因为试听音频保存失败而中断整个流程
             
-            return (final_voice_id, trial_audio_path)
+            return (final_voice_id, trial_audio_path, trial_audio_waveform)
 
         except requests.exceptions.RequestException as e:
-            print(f"❌ 网络请求错误: {str(e)}")
+            log.error("❌ 网络请求错误: %s", e)
             if hasattr(e, 'response') and e.response is not None:
-                print(f"HTTP状态码: {e.response.status_code}")
+                log.debug("HTTP状态码: %s", e.response.status_code)
                 try:
                     error_data = e.response.json()
-                    print(f"错误详情: {json.dumps(error_data, indent=2, ensure_ascii=False)}")
-                except:
-                    print(f"错误响应内容: {e.response.content}")
+                    log.debug("错误详情: %s", lazy_json(error_data))
+                except ValueError:
+                    log.debug("错误响应内容: %r", e.response.content[:1024])
             raise RuntimeError(f"调用MiniMax API失败: {str(e)}")
         except Exception as e:
-            print(f"❌ 未预期的错误: {str(e)}")
+            log.error("❌ 未预期的错误: %s", e)
             raise RuntimeError(f"音色设计失败: {str(e)}") 
\ No newline at end of file
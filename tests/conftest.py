@@ -0,0 +1,53 @@
+import os
+import sys
+import types
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Keep the node logs out of the test output
+os.environ.setdefault("JM_MINIMAX_LOG_LEVEL", "WARNING")
+
+# Outside ComfyUI, provide the folder_paths functions the nodes use; the
+# output_dir fixture points them at a per-test directory
+try:
+    import folder_paths  # noqa: F401
+except ImportError:
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.get_output_directory = tempfile.gettempdir
+    folder_paths.get_input_directory = tempfile.gettempdir
+    folder_paths.get_temp_directory = tempfile.gettempdir
+    sys.modules["folder_paths"] = folder_paths
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    """A fresh ComfyUI output directory for the test"""
+    monkeypatch.setattr(folder_paths, "get_output_directory", lambda: str(tmp_path))
+    return tmp_path
+
+
+class FakeClock:
+    """Stands in for the time module of a node module; time only moves when told to"""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,126 @@
+import os
+import json
+import base64
+
+import pytest
+
+from nodes.audio_decoder import HexFieldDecoder, decode_bytes, decode_head, decode_to_file
+
+AUDIO = bytes(range(256)) * 40 + b"\x00\x01\x02"
+
+
+def _body(audio=AUDIO, field="audio"):
+    return json.dumps({
+        "data": {field: audio.hex(), "status": 2},
+        "extra_info": {"audio_size": len(audio)},
+        "base_resp": {"status_code": 0, "status_msg": "success"},
+    }).encode()
+
+
+def _feed(decoder, body, size):
+    for start in range(0, len(body), size):
+        decoder.feed(body[start:start + size])
+    return decoder.finish()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000, 1 << 20])
+def test_chunk_boundaries(size):
+    decoder = HexFieldDecoder()
+    data = _feed(decoder, _body(), size)
+    assert bytes(decoder.audio) == AUDIO
+    assert decoder.size == len(AUDIO)
+    assert data["data"] == {"audio": "", "status": 2}
+    assert data["extra_info"]["audio_size"] == len(AUDIO)
+
+
+@pytest.mark.parametrize("size", [1, 5, 17])
+def test_key_split_across_chunks(size):
+    # The key straddles chunks and the value is preceded by an unrelated "audio" string
+    body = b'{"note": "audio", "data": {"audio" :  "' + AUDIO.hex().encode() + b'"}}'
+    decoder = HexFieldDecoder()
+    data = _feed(decoder, body, size)
+    assert bytes(decoder.audio) == AUDIO
+    assert data["note"] == "audio"
+
+
+def test_other_field():
+    decoder = HexFieldDecoder(field="trial_audio")
+    _feed(decoder, _body(field="trial_audio"), 33)
+    assert bytes(decoder.audio) == AUDIO
+
+
+def test_writes_file_without_keeping_bytes(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    decoder = HexFieldDecoder(path)
+    _feed(decoder, _body(), 999)
+    assert decoder.audio == bytearray()
+    assert decoder.size == len(AUDIO)
+    with open(path, "rb") as f:
+        assert f.read() == AUDIO
+    assert not os.path.exists(path + ".part")
+
+
+def test_keep_with_file(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    decoder = HexFieldDecoder(path, keep=True)
+    _feed(decoder, _body(), 999)
+    assert bytes(decoder.audio) == AUDIO
+    with open(path, "rb") as f:
+        assert f.read() == AUDIO
+
+
+def test_no_audio_leaves_no_file(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    decoder = HexFieldDecoder(path)
+    data = _feed(decoder, b'{"base_resp": {"status_code": 1004, "status_msg": "auth failed"}}', 10)
+    assert data["base_resp"]["status_code"] == 1004
+    assert decoder.size == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_truncated_value(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    decoder = HexFieldDecoder(path)
+    body = _body()
+    for start in range(0, len(body) // 2, 100):
+        decoder.feed(body[start:min(start + 100, len(body) // 2)])
+    with pytest.raises(ValueError):
+        decoder.finish()
+    decoder.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_odd_length():
+    decoder = HexFieldDecoder()
+    with pytest.raises(ValueError, match="odd length"):
+        _feed(decoder, b'{"audio": "abc"}', 4)
+
+
+def test_invalid_hex():
+    decoder = HexFieldDecoder()
+    with pytest.raises(ValueError, match="Invalid hex"):
+        _feed(decoder, b'{"audio": "00zz"}', 4)
+
+
+def test_decode_bytes():
+    assert bytes(decode_bytes(AUDIO.hex())) == AUDIO
+    assert bytes(decode_bytes(AUDIO.hex(), "auto")) == AUDIO
+
+
+def test_decode_head():
+    assert decode_head(AUDIO.hex()) == AUDIO[:16]
+    assert decode_head(base64.b64encode(AUDIO).decode(), "base64") == AUDIO[:16]
+
+
+@pytest.mark.parametrize("keep", [True, False])
+def test_decode_to_file(tmp_path, keep):
+    path = str(tmp_path / "trial.mp3")
+    audio = decode_to_file(AUDIO.hex(), path, "auto", keep=keep)
+    assert open(path, "rb").read() == AUDIO
+    assert (bytes(audio) if keep else audio) == (AUDIO if keep else None)
+
+
+def test_decode_to_file_leaves_nothing_on_error(tmp_path):
+    with pytest.raises(ValueError, match="Invalid hex"):
+        decode_to_file(AUDIO.hex()[:-2] + "zz", str(tmp_path / "trial.mp3"))
+    assert os.listdir(tmp_path) == []
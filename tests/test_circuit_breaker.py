@@ -0,0 +1,157 @@
+import pytest
+import requests
+
+from nodes import circuit_breaker, transport
+from nodes.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+
+
+def _breaker(**settings):
+    config = dict(window_seconds=60, min_calls=4, failure_rate=0.5, slow_call_seconds=5,
+                  slow_rate=0.8, open_seconds=30, max_open_seconds=100)
+    config.update(settings)
+    return CircuitBreaker("test", **config)
+
+
+def _trip(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.before_call() is False
+        breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_failure_rate():
+    breaker = _breaker()
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+
+def test_opens_on_slow_rate():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False, 6.0)
+    assert breaker.state == OPEN
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    clock.advance(61)
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_open_rejects_with_remaining_time(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(10)
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    assert info.value.retry_in == pytest.approx(20)
+    with pytest.raises(CircuitOpenError):
+        breaker.check_open()
+    assert breaker.rejected == 2
+
+
+def test_probe_success_closes(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(30)
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    breaker.record(False, 0.1, probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is False
+
+
+def test_single_probe_while_half_open(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(30)
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.before_call()
+    # Reports the wait a failed probe would cause, not zero
+    assert info.value.retry_in == 60
+    assert "probed" in str(info.value)
+
+
+def test_probe_failure_doubles_open_time(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    for open_seconds in (60, 100, 100):
+        clock.advance(breaker.current_open_seconds)
+        assert breaker.before_call() is True
+        breaker.record(True, 0.1, probe=True)
+        assert breaker.state == OPEN
+        assert breaker.current_open_seconds == open_seconds
+
+
+def test_slow_probe_counts_as_failure(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+    breaker.record(False, 6.0, probe=True)
+    assert breaker.state == OPEN
+
+
+def test_release_probe(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(30)
+    assert breaker.before_call() is True
+    breaker.release_probe()
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
+
+
+def test_late_results_ignored_while_open():
+    breaker = _breaker()
+    _trip(breaker)
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["calls_in_window"] == 0
+
+
+class _Interrupted(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error, state", [
+    (requests.exceptions.ConnectionError("refused"), OPEN),
+    (_Interrupted(), HALF_OPEN),
+])
+def test_transport_settles_the_probe(monkeypatch, clock, error, state):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.advance(30)
+    monkeypatch.setattr(circuit_breaker, "get_breaker", lambda host, endpoint: breaker)
+
+    def request(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(transport.get_session(), "request", request)
+
+    with pytest.raises(type(error)):
+        transport._send("GET", "https://api.example.com/v1/query/video_generation", 5, {})
+    assert breaker.state == state
+    # Either way the probe slot is free again once the circuit allows calls
+    clock.advance(breaker.current_open_seconds)
+    assert breaker.before_call() is True
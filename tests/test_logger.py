@@ -0,0 +1,19 @@
+import pytest
+
+from nodes.logger import env_number
+
+
+@pytest.mark.parametrize("value, cast, expected", [
+    (None, float, 30.0),
+    ("", float, 30.0),
+    ("12.5", float, 12.5),
+    (" 8 ", int, 8),
+    ("abc", float, 30.0),
+    ("1.5", int, 30.0),
+])
+def test_env_number(monkeypatch, value, cast, expected):
+    if value is None:
+        monkeypatch.delenv("JM_MINIMAX_TEST_SETTING", raising=False)
+    else:
+        monkeypatch.setenv("JM_MINIMAX_TEST_SETTING", value)
+    assert env_number("JM_MINIMAX_TEST_SETTING", 30.0 if cast is float else 30, cast) == expected
@@ -0,0 +1,247 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from nodes import poll_scheduler, progress, task_journal, video_eta
+from nodes.minimax_client import run_sync
+from nodes.poll_scheduler import PollScheduler, CALLBACK_FALLBACK_INTERVAL
+
+API_KEY = "test-key"
+BASE_URL = "https://api.example.com/v1"
+
+
+def _reply(status, **fields):
+    return dict(fields, status=status, base_resp={"status_code": 0, "status_msg": "success"})
+
+
+class FakeAPI:
+    """
+    Stands in for AsyncMiniMaxClient. Each task answers with its queued
+    replies in turn (the last one repeats); an Exception reply is raised.
+    A task whose gate is set holds its query until the gate opens.
+    """
+    def __init__(self):
+        self.replies = {}
+        self.gates = {}
+        self.queries = []
+
+    def __call__(self, api_key, base_url=None):
+        return self
+
+    async def query_video(self, task_id):
+        self.queries.append(task_id)
+        gate = self.gates.get(task_id)
+        while gate is not None and not gate.is_set():
+            await asyncio.sleep(0.01)
+        replies = self.replies[task_id]
+        reply = replies.pop(0) if len(replies) > 1 else replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def count(self, task_id):
+        return self.queries.count(task_id)
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    # Journal and completion history of this test only
+    monkeypatch.setattr(task_journal, "_journal", task_journal.TaskJournal(str(tmp_path / "journal.sqlite3")))
+    monkeypatch.setattr(video_eta, "_stats", video_eta.VideoStats(str(tmp_path / "stats.json")))
+    fake = FakeAPI()
+    monkeypatch.setattr(poll_scheduler, "AsyncMiniMaxClient", fake)
+    return fake
+
+
+@pytest.fixture
+def scheduler(api):
+    scheduler = PollScheduler()
+    yield scheduler
+
+    # Stop the tasks a test left running before the fake API goes away
+    async def stop():
+        for task in scheduler.tasks.values():
+            scheduler._finish(task, error=RuntimeError("test finished"))
+    for gate in api.gates.values():
+        gate.set()
+    run_sync(stop())
+
+
+def _watch(scheduler, task_id, interval=0.05, max_wait=30):
+    return scheduler.watch(API_KEY, BASE_URL, task_id, interval=interval, max_wait=max_wait, adaptive=False)
+
+
+def _until(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_polls_until_success(api, scheduler):
+    api.replies["t1"] = [_reply("Preparing"), _reply("Processing"), _reply("Success", file_id="f1")]
+    task_journal.get_journal().record_submission("t1", "digest", API_KEY, BASE_URL)
+    task = _watch(scheduler, "t1")
+    assert poll_scheduler.wait(task, timeout=5)["file_id"] == "f1"
+    assert task.polls == 3
+    task_journal.flush()
+    assert [status for status, _ in task_journal.get_journal().transitions("t1")][-3:] == \
+        ["Preparing", "Processing", "Success"]
+
+
+def test_journal_writes_leave_the_loop(api, scheduler, monkeypatch):
+    threads = []
+    monkeypatch.setattr(task_journal, "note_status",
+                        lambda *args, **kwargs: threads.append(threading.current_thread().name))
+    api.replies["t1"] = [_reply("Processing"), _reply("Success", file_id="f1")]
+    poll_scheduler.wait(_watch(scheduler, "t1"), timeout=5)
+    task_journal.flush()
+    assert threads and all(name.startswith("jm-minimax-journal") for name in threads)
+
+
+def test_waiters_share_one_poll_sequence(api, scheduler):
+    api.replies["t1"] = [_reply("Processing"), _reply("Success", file_id="f1")]
+    first = _watch(scheduler, "t1")
+    second = _watch(scheduler, "t1", interval=10)
+    assert first is second
+    poll_scheduler.wait(first, timeout=5)
+    assert api.count("t1") == 2
+
+
+def test_failed_status(api, scheduler):
+    api.replies["t1"] = [_reply("Fail")]
+    task = _watch(scheduler, "t1")
+    with pytest.raises(RuntimeError, match="failed with status: Fail"):
+        poll_scheduler.wait(task, timeout=5)
+
+
+def test_null_status_keeps_polling(api, scheduler):
+    api.replies["t1"] = [_reply(None), _reply("Success", file_id="f1")]
+    task = _watch(scheduler, "t1")
+    assert poll_scheduler.wait(task, timeout=5)["file_id"] == "f1"
+
+
+def test_deadline(api, scheduler):
+    api.replies["t1"] = [_reply("Processing")]
+    task = _watch(scheduler, "t1", max_wait=0.2)
+    with pytest.raises(RuntimeError, match="Maximum wait time exceeded"):
+        poll_scheduler.wait(task, timeout=5)
+
+
+def test_failing_task_does_not_stop_the_others(api, scheduler):
+    api.replies["bad"] = [ValueError("unexpected reply")]
+    api.replies["good"] = [_reply("Processing"), _reply("Processing"), _reply("Success", file_id="f1")]
+    bad = _watch(scheduler, "bad")
+    good = _watch(scheduler, "good")
+    with pytest.raises(ValueError):
+        poll_scheduler.wait(bad, timeout=5)
+    assert poll_scheduler.wait(good, timeout=5)["file_id"] == "f1"
+
+
+def test_failed_task_is_watched_afresh(api, scheduler):
+    api.replies["t1"] = [ValueError("flaky"), _reply("Success", file_id="f1")]
+    task = _watch(scheduler, "t1")
+    with pytest.raises(ValueError):
+        poll_scheduler.wait(task, timeout=5)
+    again = _watch(scheduler, "t1")
+    assert again is not task
+    assert poll_scheduler.wait(again, timeout=5)["file_id"] == "f1"
+
+
+def test_push_progress_slows_polling(api, scheduler):
+    api.replies["t1"] = [_reply("Processing")]
+    task = _watch(scheduler, "t1")
+    _until(lambda: task.polls >= 1)
+    assert scheduler.push("t1", {"task_id": "t1", "status": "processing"}) == 1
+    _until(lambda: task.pushes == 1)
+    assert task.status == "Processing"
+    assert task.next_poll - time.monotonic() > CALLBACK_FALLBACK_INTERVAL - 5
+
+
+def test_pushed_success_is_confirmed_by_a_query(api, scheduler):
+    api.replies["t1"] = [_reply("Processing")]
+    task = _watch(scheduler, "t1", interval=60)
+    _until(lambda: task.polls == 1)
+    # A forged success only triggers a query, whose reply still says Processing
+    scheduler.push("t1", {"task_id": "t1", "status": "success", "file_id": "forged"})
+    _until(lambda: task.polls == 2)
+    assert not task.done
+    api.replies["t1"] = [_reply("Success", file_id="f1")]
+    scheduler.push("t1", {"task_id": "t1", "status": "success"})
+    assert poll_scheduler.wait(task, timeout=5)["file_id"] == "f1"
+
+
+def test_push_before_watch(api, scheduler):
+    api.replies["t1"] = [_reply("Processing")]
+    assert scheduler.push("t1", {"task_id": "t1", "status": "processing"}) == 0
+    task = _watch(scheduler, "t1")
+    _until(lambda: task.pushes == 1)
+
+
+def test_push_during_a_poll(api, scheduler):
+    gate = threading.Event()
+    api.gates["t1"] = gate
+    api.replies["t1"] = [_reply("Success", file_id="f1")]
+    task = _watch(scheduler, "t1")
+    _until(lambda: api.count("t1") == 1)
+    # The push lands while the query is in flight; the query's reply still decides
+    scheduler.push("t1", {"task_id": "t1", "status": "processing"})
+    _until(lambda: task.pushes == 1)
+    gate.set()
+    assert poll_scheduler.wait(task, timeout=5)["file_id"] == "f1"
+    # Later pushes for the finished task reach nobody
+    assert scheduler.push("t1", {"task_id": "t1", "status": "failed"}) == 0
+    assert task.result["file_id"] == "f1"
+
+
+def test_bad_push_only_fails_its_task(api, scheduler, monkeypatch):
+    api.replies["t1"] = [_reply("Processing")]
+    api.replies["t2"] = [_reply("Processing"), _reply("Success", file_id="f2")]
+    task = _watch(scheduler, "t1", interval=60)
+    other = _watch(scheduler, "t2")
+    _until(lambda: task.polls == 1)
+
+    interval = scheduler._interval
+
+    def broken(task):
+        if task.task_id == "t1":
+            raise ValueError("bad interval")
+        return interval(task)
+    monkeypatch.setattr(scheduler, "_interval", broken)
+    scheduler.push("t1", {"task_id": "t1", "status": "queueing"})
+    with pytest.raises(ValueError):
+        poll_scheduler.wait(task, timeout=5)
+    assert poll_scheduler.wait(other, timeout=5)["file_id"] == "f2"
+
+
+def test_wait_stops_on_interrupt(api, scheduler, monkeypatch):
+    class Interrupted(Exception):
+        pass
+
+    def interrupted():
+        raise Interrupted()
+    api.replies["t1"] = [_reply("Processing")]
+    task = _watch(scheduler, "t1")
+    monkeypatch.setattr(progress, "check_interrupted", interrupted)
+    with pytest.raises(Interrupted):
+        poll_scheduler.wait(task)
+    # The task itself keeps being polled in the background
+    assert not task.done
+
+
+def test_as_completed_yields_in_completion_order(api, scheduler):
+    api.replies["slow"] = [_reply("Processing"), _reply("Processing"), _reply("Success", file_id="f1")]
+    api.replies["fast"] = [_reply("Success", file_id="f2")]
+    tasks = [_watch(scheduler, "slow"), _watch(scheduler, "fast")]
+    assert [task.task_id for task in poll_scheduler.as_completed(tasks, timeout=5)] == ["fast", "slow"]
+
+
+def test_parse_task_ids():
+    assert poll_scheduler.parse_task_ids("t1\nt2, t3 t1\n") == ["t1", "t2", "t3"]
+    assert poll_scheduler.single_task_id("  t1\n") == "t1"
+    assert poll_scheduler.single_task_id("") == ""
+    with pytest.raises(ValueError, match="Batch Check Video Status"):
+        poll_scheduler.single_task_id("t1\nt2")
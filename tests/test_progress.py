@@ -0,0 +1,20 @@
+import concurrent.futures
+
+import pytest
+
+from nodes import progress
+from nodes.progress import wait_future
+
+
+def test_wait_future_returns_the_result():
+    future = concurrent.futures.Future()
+    future.set_result("done")
+    assert wait_future(future, timeout=1) == "done"
+
+
+def test_wait_future_times_out(monkeypatch):
+    monkeypatch.setattr(progress, "WAIT_SLICE", 0.01)
+    future = concurrent.futures.Future()
+    with pytest.raises(RuntimeError, match="Timed out waiting for the audio"):
+        wait_future(future, timeout=0.05, what="the audio")
+    assert not future.done()
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from nodes import rate_limiter
+from nodes.rate_limiter import TokenBucket, EndpointGovernor
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, "time", clock)
+
+
+def test_bucket_starts_full(clock):
+    bucket = TokenBucket(60)
+    assert all(bucket.reserve() == 0.0 for _ in range(60))
+    assert bucket.available() == 0
+
+
+def test_bucket_queues_in_arrival_order(clock):
+    bucket = TokenBucket(60)
+    for _ in range(60):
+        bucket.reserve()
+    # One token per second; each caller waits one second longer than the one before
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([1.0, 2.0, 3.0])
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(60, capacity=10)
+    for _ in range(10):
+        bucket.reserve()
+    clock.advance(4)
+    assert bucket.available() == pytest.approx(4)
+    clock.advance(600)
+    assert bucket.available() == 10
+
+
+def test_bucket_large_reservation_is_capped(clock):
+    bucket = TokenBucket(600, capacity=100)
+    # More than the capacity can never be held, so it costs at most a full bucket
+    assert bucket.reserve(5000) == 0.0
+    assert bucket.reserve(50) == pytest.approx(5.0)
+
+
+def test_bucket_drain(clock):
+    bucket = TokenBucket(60)
+    bucket.drain(30)
+    assert bucket.reserve() == pytest.approx(31.0)
+    clock.advance(31)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_governor_waits_for_rate(clock):
+    governor = EndpointGovernor("query", rpm=2)
+    assert governor.acquire() == 0.0
+    governor.release()
+    assert governor.acquire() == 0.0
+    governor.release()
+    # The third request in the minute sleeps (on the fake clock) until a token is back
+    assert governor.acquire() == pytest.approx(30.0)
+    governor.release()
+    assert governor.requests == 3
+
+
+def test_governor_counts_text_tokens(clock):
+    governor = EndpointGovernor("t2a_v2", rpm=60, tpm=600)
+    governor.acquire(600)
+    governor.release()
+    assert governor.acquire(300) == pytest.approx(30.0)
+    governor.release()
+
+
+def test_governor_throttle(clock):
+    governor = EndpointGovernor("query", rpm=60)
+    governor.throttle(10)
+    assert governor.acquire() == pytest.approx(11.0)
+    governor.release()
+
+
+def test_governor_limits_in_flight():
+    governor = EndpointGovernor("music_generation", max_in_flight=1)
+    governor.acquire()
+    started = threading.Event()
+    acquired = threading.Event()
+
+    def second():
+        started.set()
+        governor.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    started.wait(1)
+    assert not acquired.wait(0.2)
+    governor.release()
+    assert acquired.wait(1)
+    thread.join(1)
+    governor.release()
+    assert governor.in_flight == 0
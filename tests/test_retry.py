@@ -0,0 +1,83 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from nodes import retry
+from nodes.retry import FATAL, RETRY_SAFE, RETRY_IDEMPOTENT, RetryPolicy
+
+
+def _response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+
+def _http_error(status):
+    return requests.exceptions.HTTPError(response=_response(status))
+
+
+@pytest.mark.parametrize("exc, decision", [
+    (_http_error(429), RETRY_SAFE),
+    (_http_error(500), RETRY_IDEMPOTENT),
+    (_http_error(503), RETRY_IDEMPOTENT),
+    (_http_error(400), FATAL),
+    (_http_error(401), FATAL),
+    (requests.exceptions.HTTPError(), FATAL),
+    (requests.exceptions.ConnectTimeout(), RETRY_SAFE),
+    (requests.exceptions.SSLError(), RETRY_SAFE),
+    (requests.exceptions.ReadTimeout(), RETRY_IDEMPOTENT),
+    (requests.exceptions.ConnectionError(), RETRY_IDEMPOTENT),
+    (requests.exceptions.ChunkedEncodingError(), RETRY_IDEMPOTENT),
+    (requests.exceptions.InvalidURL(), FATAL),
+])
+def test_classify_exception(exc, decision):
+    assert retry.classify_exception(exc) == decision
+
+
+@pytest.mark.parametrize("code, decision", [
+    (None, None),
+    (0, None),
+    (1002, RETRY_SAFE),
+    (1039, RETRY_SAFE),
+    (1000, RETRY_IDEMPOTENT),
+    (1013, RETRY_IDEMPOTENT),
+    (1004, FATAL),
+    (2013, FATAL),
+])
+def test_classify_code(code, decision):
+    assert retry.classify_code(code) == decision
+
+
+def test_retry_after():
+    assert retry.retry_after(None) is None
+    assert retry.retry_after(_response(429)) is None
+    assert retry.retry_after(_response(429, {"Retry-After": "7"})) == 7.0
+    assert retry.retry_after(_response(429, {"Retry-After": "-3"})) == 0.0
+    assert retry.retry_after(_response(429, {"Retry-After": "soon"})) is None
+    date = formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= retry.retry_after(_response(503, {"Retry-After": date})) <= 60
+
+
+def test_should_retry():
+    policy = RetryPolicy(max_attempts=3)
+    # Safe retries go out even for billed calls, idempotent ones only when resubmitting is allowed
+    assert policy.should_retry(RETRY_SAFE, 1, False)
+    assert not policy.should_retry(RETRY_IDEMPOTENT, 1, False)
+    assert policy.should_retry(RETRY_IDEMPOTENT, 1, True)
+    assert not policy.should_retry(FATAL, 1, True)
+    assert not policy.should_retry(None, 1, True)
+    assert policy.should_retry(RETRY_SAFE, 2, True)
+    assert not policy.should_retry(RETRY_SAFE, 3, True)
+
+
+def test_backoff_bounds():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)):
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+    # Retry-After raises the delay, capped at four times max_delay
+    assert policy.backoff(1, 3.0) >= 3.0
+    assert policy.backoff(1, 1000) == 20.0
@@ -0,0 +1,43 @@
+import pytest
+
+from nodes import minimax_client
+from nodes.minimax_client import AsyncMiniMaxClient, run_sync
+
+PAYLOAD = {"model": "MiniMax-Hailuo-02", "prompt": "A cat on a boat", "duration": 6}
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    monkeypatch.setattr(minimax_client, "_dedupe_results", {})
+    calls = []
+
+    async def post_json(self, endpoint, payload, timeout=None, idempotent=True):
+        calls.append((self.api_key, idempotent))
+        return {"task_id": "task-%d" % len(calls), "base_resp": {"status_code": 0}}
+    monkeypatch.setattr(AsyncMiniMaxClient, "post_json", post_json)
+    return calls
+
+
+def _submit(payload, dedupe_key, api_key="key-a"):
+    return run_sync(AsyncMiniMaxClient(api_key).submit_video(payload, dedupe_key))["task_id"]
+
+
+def test_same_key_payload_and_account_reuses_the_task(posts):
+    assert _submit(PAYLOAD, "run-1") == _submit(dict(reversed(list(PAYLOAD.items()))), "run-1")
+    assert len(posts) == 1
+
+
+@pytest.mark.parametrize("payload, api_key", [
+    (dict(PAYLOAD, prompt="A dog on a boat"), "key-a"),
+    (PAYLOAD, "key-b"),
+])
+def test_other_payload_or_account_submits_again(posts, payload, api_key):
+    first = _submit(PAYLOAD, "run-1")
+    assert _submit(payload, "run-1", api_key) != first
+    assert len(posts) == 2
+
+
+def test_submissions_are_never_sent_as_idempotent(posts):
+    _submit(PAYLOAD, "run-1")
+    _submit(PAYLOAD, None)
+    assert [idempotent for _, idempotent in posts] == [False, False]
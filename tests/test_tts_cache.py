@@ -0,0 +1,157 @@
+import os
+import time
+
+import pytest
+
+from nodes import tts_cache
+from nodes.tts_cache import TTSCache, request_key
+
+PAYLOAD = {
+    "model": "speech-02-hd",
+    "text": "Hello there.",
+    "voice_setting": {"voice_id": "male-qn-qingse", "speed": 1.0, "vol": 1.0, "pitch": 0},
+    "audio_setting": {"sample_rate": 32000, "bitrate": 128000, "format": "mp3", "channel": 1},
+    "output_format": "hex",
+    "stream": False,
+}
+
+
+@pytest.fixture
+def cache_time(monkeypatch, clock):
+    # Behind the wall clock, so entries touched by get() always look older than fresh files
+    clock.now = time.time() - 1000
+    monkeypatch.setattr(tts_cache, "time", clock)
+    return clock
+
+
+def test_request_key_is_canonical():
+    reordered = dict(reversed(list(PAYLOAD.items())))
+    assert request_key(reordered) == request_key(PAYLOAD)
+    assert len(request_key(PAYLOAD)) == 64
+
+
+def test_request_key_ignores_transport_options():
+    assert request_key(dict(PAYLOAD, output_format="url", stream=True)) == request_key(PAYLOAD)
+    assert request_key({k: v for k, v in PAYLOAD.items() if k != "stream"}) == request_key(PAYLOAD)
+
+
+@pytest.mark.parametrize("change", [
+    {"text": "Hello there!"},
+    {"model": "speech-02-turbo"},
+    {"voice_setting": dict(PAYLOAD["voice_setting"], speed=1.1)},
+    {"audio_setting": dict(PAYLOAD["audio_setting"], format="wav")},
+])
+def test_request_key_tracks_the_audio(change):
+    assert request_key(dict(PAYLOAD, **change)) != request_key(PAYLOAD)
+
+
+def test_put_and_get(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path / "cache"))
+    audio = tmp_path / "out.mp3"
+    audio.write_bytes(b"a" * 100)
+    subtitle = tmp_path / "out.json"
+    subtitle.write_text("[]")
+    cache.put("k1", str(audio), str(subtitle), "https://example.com/a.mp3")
+    cache.put("k2", "", audio_data=b"b" * 50)
+
+    hit = cache.get("k1")
+    assert open(hit["audio_path"], "rb").read() == b"a" * 100
+    assert open(hit["subtitle_path"]).read() == "[]"
+    assert hit["audio_url"] == "https://example.com/a.mp3"
+    assert cache.get("k2")["subtitle_path"] == ""
+    assert cache.get("missing") is None
+    assert cache.total == 152
+
+
+def test_audio_url_expires_before_entry(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path))
+    cache.put("k", "", "", "https://example.com/a.mp3", audio_data=b"a")
+    cache_time.advance(tts_cache.AUDIO_URL_TTL + 1)
+    hit = cache.get("k")
+    assert hit is not None
+    assert hit["audio_url"] == ""
+
+
+def test_evicts_least_recently_used(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path), max_bytes=250)
+    cache.put("a", "", audio_data=b"a" * 100)
+    cache.put("b", "", audio_data=b"b" * 100)
+    cache_time.advance(10)
+    cache.get("b")
+    cache_time.advance(10)
+    cache.get("a")
+    cache.put("c", "", audio_data=b"c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.total == 200
+    assert sorted(os.listdir(tmp_path)) == ["a.meta.json", "a.mp3", "c.meta.json", "c.mp3"]
+
+
+def test_replacing_an_entry_keeps_the_total(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path))
+    cache.put("a", "", audio_data=b"a" * 100)
+    cache.put("a", "", audio_data=b"a" * 40)
+    assert cache.total == 40
+    assert len(cache.entries()) == 1
+
+
+def test_expired_entries(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path), max_age=100)
+    cache.put("old", "", audio_data=b"o" * 10)
+    cache_time.advance(50)
+    cache.put("new", "", audio_data=b"n" * 10)
+    cache_time.advance(60)
+    # Expired entries are dropped on lookup ...
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+    # ... and by the periodic sweep, without a lookup
+    cache_time.advance(tts_cache.SWEEP_INTERVAL)
+    cache.put("newest", "", audio_data=b"x" * 10)
+    assert [entry[0] for entry in cache.entries()] == ["newest"]
+    assert cache.total == 10
+
+
+def test_index_is_rebuilt_from_disk(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path))
+    cache.put("a", "", audio_data=b"a" * 100)
+    cache.put("b", "", audio_data=b"b" * 30)
+    reopened = TTSCache(str(tmp_path))
+    assert sorted(entry[0] for entry in reopened.entries()) == ["a", "b"]
+    assert reopened.total == 130
+
+
+def test_missing_audio_file_drops_entry(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path))
+    cache.put("a", "", audio_data=b"a" * 100)
+    os.remove(tmp_path / "a.mp3")
+    assert cache.get("a") is None
+    assert cache.total == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_clear(tmp_path, cache_time):
+    cache = TTSCache(str(tmp_path))
+    cache.put("a", "", audio_data=b"a")
+    cache.put("b", "", audio_data=b"b")
+    cache.clear()
+    assert cache.entries() == []
+    assert cache.total == 0
+
+
+def test_place_file_copies_by_default(tmp_path):
+    source = tmp_path / "source.mp3"
+    source.write_bytes(b"audio")
+    target = tts_cache.place_file(str(source), str(tmp_path / "target.mp3"))
+    assert open(target, "rb").read() == b"audio"
+    # Editing the output leaves the cached file alone
+    with open(target, "r+b") as f:
+        f.write(b"AUDIO")
+    assert source.read_bytes() == b"audio"
+
+
+def test_place_file_links_when_asked(tmp_path):
+    source = tmp_path / "source.mp3"
+    source.write_bytes(b"audio")
+    target = tts_cache.place_file(str(source), str(tmp_path / "target.mp3"), link=True)
+    assert os.path.samefile(source, target)